@@ -3,9 +3,14 @@
 from jose import jwk, jwt
 from jose.utils import base64url_decode
 import requests
+import asyncio
+import hashlib
 import logging
-import json
+import threading
+import time
+import weakref
 from typing import Dict
+from backend.services.cache import TTLCache
 
 logger = logging.getLogger()
 
@@ -15,31 +20,95 @@ APP_CLIENT_ID = "5hh9g0pqhog16bkangcp4p26o2"
 
 JWKS_URL = f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}/.well-known/jwks.json"
 
-# Cache JWKs for reuse
-_jwks = None
+JWKS_TIMEOUT_SECONDS = 3
+# An unknown kid refetches the JWKS at most this often (bounds forged-kid traffic)
+JWKS_MIN_REFRESH_SECONDS = 30
 
-def verify_access_token(auth_header: str) -> Dict:
+# Verified tokens: sha256(token) → claims, served until the token's exp
+VERIFIED_TOKEN_CACHE_SIZE = 10000
+VERIFIED_TOKEN_MAX_TTL_SECONDS = 3600
+
+# Public keys constructed once per kid (rebuilt when Cognito rotates keys)
+_keys = {}
+_keys_fetched_at = 0.0
+_sync_refresh_lock = threading.Lock()
+_async_refresh_locks = weakref.WeakKeyDictionary()
+
+_verified = TTLCache(max_size=VERIFIED_TOKEN_CACHE_SIZE, ttl_seconds=VERIFIED_TOKEN_MAX_TTL_SECONDS)
+
+
+# -----------------------------------------------------------
+# JWKS
+# -----------------------------------------------------------
+def _fetch_jwks():
+    response = requests.get(JWKS_URL, timeout=JWKS_TIMEOUT_SECONDS)
+    if response.status_code != 200:
+        raise Exception("Failed to fetch JWKS from Cognito")
+    return response.json()["keys"]
+
+
+def _install_keys(jwks):
+    global _keys, _keys_fetched_at
+    _keys = {key["kid"]: jwk.construct(key) for key in jwks}
+    _keys_fetched_at = time.monotonic()
+
+
+def _needs_refresh(kid) -> bool:
+    if kid in _keys:
+        return False
+    # Keys we already have were fetched recently: an unknown kid is bogus
+    return not _keys or time.monotonic() - _keys_fetched_at >= JWKS_MIN_REFRESH_SECONDS
+
+
+def refresh_keys(kid=None):
+    """Blocking (single-flight) JWKS refresh, for synchronous callers."""
+    with _sync_refresh_lock:
+        if _needs_refresh(kid):
+            _install_keys(_fetch_jwks())
+
+
+async def refresh_keys_async(kid=None):
+    """
+    Non-blocking JWKS refresh: the HTTP call runs on the stage executor and
+    concurrent requests for the same unknown kid share one fetch.
+    """
+    from backend.services.concurrency import run_stage
+
+    loop = asyncio.get_running_loop()
+    lock = _async_refresh_locks.get(loop)
+    if lock is None:
+        lock = _async_refresh_locks[loop] = asyncio.Lock()
+    async with lock:
+        if _needs_refresh(kid):
+            jwks = await run_stage("jwks", _fetch_jwks, timeout=JWKS_TIMEOUT_SECONDS, record=False)
+            _install_keys(jwks)
+
+
+# -----------------------------------------------------------
+# VERIFICATION
+# -----------------------------------------------------------
+def _bearer_token(auth_header: str) -> str:
     if not auth_header or not auth_header.startswith("Bearer "):
         raise Exception("Missing or invalid Authorization header")
+    return auth_header.split(" ")[1]
 
-    token = auth_header.split(" ")[1]
 
-    global _jwks
-    if _jwks is None:
-        response = requests.get(JWKS_URL)
-        if response.status_code != 200:
-            raise Exception("Failed to fetch JWKS from Cognito")
-        _jwks = response.json()["keys"]
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
-    headers = jwt.get_unverified_headers(token)
-    kid = headers["kid"]
 
-    # Find the correct public key
-    key = next((k for k in _jwks if k["kid"] == kid), None)
-    if not key:
-        raise Exception("Public key not found in JWKS")
+def _cached_claims(token_hash: str):
+    claims = _verified.get(token_hash)
+    if claims is not None and claims["exp"] >= int(time.time()):
+        return claims
+    return None
 
-    public_key = jwk.construct(key)
+
+def _verify_with_keys(token: str, token_hash: str) -> Dict:
+    kid = jwt.get_unverified_headers(token)["kid"]
+    public_key = _keys.get(kid)
+    if public_key is None:
+        raise Exception("Public key not found in JWKS")
 
     message, encoded_signature = token.rsplit(".", 1)
     decoded_signature = base64url_decode(encoded_signature.encode("utf-8"))
@@ -50,11 +119,41 @@ def verify_access_token(auth_header: str) -> Dict:
     claims = jwt.get_unverified_claims(token)
 
     # Validate standard claims
-    if claims["exp"] < int(__import__("time").time()):
+    if claims["exp"] < int(time.time()):
         raise Exception("Token has expired")
 
     if claims["aud"] != APP_CLIENT_ID:
         raise Exception("Token was not issued for this audience")
 
+    _verified.set(token_hash, claims)
     logger.info(f"Token verified: {claims}")
     return claims
+
+
+def verify_access_token(auth_header: str) -> Dict:
+    token = _bearer_token(auth_header)
+    token_hash = _token_hash(token)
+
+    claims = _cached_claims(token_hash)
+    if claims is not None:
+        return claims
+
+    kid = jwt.get_unverified_headers(token)["kid"]
+    if kid not in _keys:
+        refresh_keys(kid)
+    return _verify_with_keys(token, token_hash)
+
+
+async def verify_access_token_async(auth_header: str) -> Dict:
+    """verify_access_token() for async routes: never blocks the event loop."""
+    token = _bearer_token(auth_header)
+    token_hash = _token_hash(token)
+
+    claims = _cached_claims(token_hash)
+    if claims is not None:
+        return claims
+
+    kid = jwt.get_unverified_headers(token)["kid"]
+    if kid not in _keys:
+        await refresh_keys_async(kid)
+    return _verify_with_keys(token, token_hash)
@@ -11,9 +11,59 @@ AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 BEDROCK_REGION = os.getenv("BEDROCK_REGION") or os.getenv("AWS_REGION", "us-east-1")
 
+# boto3 client tuning (backend/services/aws_clients.py). The pool must be
+# at least STAGE_EXECUTOR_WORKERS, or concurrent calls queue for a
+# connection; retry mode "adaptive" also rate-limits the client on throttling
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_RETRY_MODE = os.getenv("AWS_RETRY_MODE", "adaptive")
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "3"))
+AWS_CONNECT_TIMEOUT_SECONDS = float(os.getenv("AWS_CONNECT_TIMEOUT_SECONDS", "3"))
+AWS_READ_TIMEOUT_SECONDS = float(os.getenv("AWS_READ_TIMEOUT_SECONDS", "30"))
+AWS_TCP_KEEPALIVE = os.getenv("AWS_TCP_KEEPALIVE", "true").lower() == "true"
+# Point bedrock-runtime at another endpoint (VPC endpoint, or the fake
+# server used by scripts/load_test.py)
+BEDROCK_ENDPOINT_URL = os.getenv("BEDROCK_ENDPOINT_URL", "")
+
 # Pinecone
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "bmw-rag")
+# Index host (e.g. https://bmw-rag-xxxx.svc.pinecone.io): connects to the
+# data plane directly instead of looking the host up via describe_index
+PINECONE_HOST = os.getenv("PINECONE_HOST", "")
+# HTTP connections to the index host; the SDK defaults to 5 per CPU, fewer
+# than the stage executor's threads
+PINECONE_POOL_CONNECTIONS = int(os.getenv("PINECONE_POOL_CONNECTIONS", "50"))
+
+# Vector search backend:
+#   "pinecone" (remote), "local" (exact in-process NumPy index),
+#   "ivf" (approximate in-process index, see scripts/build_ivf_index.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+# Embeddings JSONL file or binary store directory (scripts/convert_embeddings_to_store.py)
+LOCAL_EMBEDDINGS_PATH = os.getenv("LOCAL_EMBEDDINGS_PATH", "data/processed/bmw_embeddings.jsonl")
+
+# IVF index: higher nprobe → better recall, slower queries
+IVF_INDEX_PATH = os.getenv("IVF_INDEX_PATH", "data/processed/bmw_ivf.npz")
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+
+# Retrieval mode:
+#   "vector" (embeddings only), "hybrid" (BM25 + vector fused with
+#   reciprocal-rank fusion), "lexical" (BM25 only, no embedding call)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector").lower()
+LEXICAL_CHUNKS_PATH = os.getenv("LEXICAL_CHUNKS_PATH", "data/processed/bmw_chunks.jsonl")
+# Hybrid mode: answer keyword queries fully matched by BM25 without embedding
+LEXICAL_FAST_PATH = os.getenv("LEXICAL_FAST_PATH", "true").lower() == "true"
+LEXICAL_MIN_TERMS = int(os.getenv("LEXICAL_MIN_TERMS", "2"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "4"))    # per-retriever depth = k * this
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Constraints named in a question (model, year, region, fuel type, ...)
+# are pushed down to vector / BM25 search as metadata filters
+METADATA_FILTERS_ENABLED = os.getenv("METADATA_FILTERS_ENABLED", "true").lower() == "true"
+
+# Aggregate questions ("average Price_USD by Region") are answered from a
+# columnar copy of the raw CSV instead of vector search
+ANALYTICS_ENABLED = os.getenv("ANALYTICS_ENABLED", "true").lower() == "true"
+ANALYTICS_CSV_PATH = os.getenv("ANALYTICS_CSV_PATH", "data/raw/bmw_sales_data.csv")
 
 # -----------------------------------------------------------
 # MODEL MAP (Front-end dropdown → Bedrock modelId)
@@ -26,12 +76,113 @@ MODEL_MAP = {
     "mistral":       "mistral.mistral-7b-instruct-v0:1"
 }
 
+# Used (with a warning) when a request names a model not in MODEL_MAP
+DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "mistral")
+
+# Generation dispatcher: once the requested model has been slower than
+# its rolling HEDGE_PERCENTILE latency, the same prompt is also sent to
+# FALLBACK_MODEL and the first answer wins. Until HEDGE_MIN_SAMPLES calls
+# are seen, HEDGE_DEFAULT_MS is the deadline.
+FALLBACK_MODEL = os.getenv("FALLBACK_MODEL", "claude-haiku")
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_MS = float(os.getenv("HEDGE_MIN_MS", "1000"))
+HEDGE_DEFAULT_MS = float(os.getenv("HEDGE_DEFAULT_MS", "8000"))
+MODEL_LATENCY_WINDOW = int(os.getenv("MODEL_LATENCY_WINDOW", "200"))
+
+# Circuit breaker per model: opens when at least BREAKER_MIN_CALLS of the
+# last BREAKER_WINDOW calls exist and BREAKER_ERROR_RATE of them failed;
+# after BREAKER_COOLDOWN_SECONDS one probe call is let through
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30"))
+# A probe that never reports back (cancelled, client gone) is given up
+# after this long so the breaker cannot stay half-open forever
+BREAKER_PROBE_TIMEOUT_SECONDS = float(os.getenv("BREAKER_PROBE_TIMEOUT_SECONDS", "120"))
+
+# Context window (tokens) per Bedrock modelId; prompts are trimmed to fit
+# min(window - MAX_TOKENS, PROMPT_TOKEN_BUDGET)
+MODEL_CONTEXT_TOKENS = {
+    "anthropic.claude-3-sonnet-20240229-v1:0": 200000,
+    "anthropic.claude-3-haiku-20240307-v1:0":  200000,
+    "amazon.titan-text-lite-v1":               4096,
+    "mistral.mistral-7b-instruct-v0:1":        32000
+}
+DEFAULT_CONTEXT_TOKENS = 4096
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+
 # -----------------------------------------------------------
 # APPLICATION CONSTANTS
 # -----------------------------------------------------------
-LOG_FILE = "backend/logs/requests.jsonl"
 PROMPT_TEMPLATE_PATH = "backend/prompts/rag_template.txt"
 
+# Request log (backend/services/log_sink.py): entries are queued and a
+# background thread appends them to LOG_FILE in batches. The package
+# directory is read-only on Lambda, so there the default is "" (entries are
+# only echoed to stdout / CloudWatch); point LOG_FILE at /tmp to keep a file.
+LOG_FILE = os.getenv("LOG_FILE", "" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "backend/logs/requests.jsonl")
+LOG_ECHO_STDOUT = os.getenv("LOG_ECHO_STDOUT", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))         # entries beyond this are dropped
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+LOG_FLUSH_SECONDS = float(os.getenv("LOG_FLUSH_SECONDS", "1"))
+# Rotate to requests.<UTC timestamp>.jsonl by size and/or age (0 = never)
+LOG_ROTATE_BYTES = int(os.getenv("LOG_ROTATE_BYTES", str(64 * 1024 * 1024)))
+LOG_ROTATE_SECONDS = float(os.getenv("LOG_ROTATE_SECONDS", "86400"))
+
+# Query embedding cache (in-memory LRU + optional SQLite tier, e.g. /tmp/embedding_cache.sqlite3)
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+EMBED_CACHE_TTL_SECONDS = float(os.getenv("EMBED_CACHE_TTL_SECONDS", "86400"))
+EMBED_CACHE_DB = os.getenv("EMBED_CACHE_DB", "")
+
+# Semantic answer cache (cosine similarity on query embeddings)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+# Bump after re-ingesting the Pinecone index so cached answers are dropped
+INDEX_VERSION = os.getenv("INDEX_VERSION", "")
+
+# Concurrency: blocking SDK calls run on a bounded thread pool
+STAGE_EXECUTOR_WORKERS = int(os.getenv("STAGE_EXECUTOR_WORKERS", "32"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "16"))
+ADMISSION_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_TIMEOUT_SECONDS", "5"))
+
+# Per-stage timeouts (seconds)
+EMBED_TIMEOUT_SECONDS = float(os.getenv("EMBED_TIMEOUT_SECONDS", "10"))
+RETRIEVE_TIMEOUT_SECONDS = float(os.getenv("RETRIEVE_TIMEOUT_SECONDS", "5"))
+GENERATE_TIMEOUT_SECONDS = float(os.getenv("GENERATE_TIMEOUT_SECONDS", "60"))
+
+# Batch endpoint (/api/ask/batch)
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "500"))
+BATCH_GENERATE_CONCURRENCY = int(os.getenv("BATCH_GENERATE_CONCURRENCY", "8"))
+PINECONE_QUERY_CONCURRENCY = int(os.getenv("PINECONE_QUERY_CONCURRENCY", "8"))
+
+# Cognito JWT verification (backend/auth_verify.py) for the /api/ask
+# routes. Off by default, like the stubbed verifier it replaces; when on,
+# requests need "Authorization: Bearer <access token>"
+AUTH_ENABLED = os.getenv("AUTH_ENABLED", "false").lower() == "true"
+
+# Rate limiting (per client IP, sliding-window counter). "redis" shares
+# counts across Lambda containers / uvicorn workers (pip install redis)
+RATE_LIMIT_MAX_REQUESTS = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "20"))
+RATE_LIMIT_WINDOW_SECONDS = float(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60"))
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Metrics: CloudWatch Embedded Metric Format lines on stdout (no API calls),
+# aggregated in-process and flushed every METRICS_FLUSH_SECONDS
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "RAGSearch")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "10"))
+
+# Build AWS/Pinecone clients and load the vector index during Lambda init
+# instead of on the first request
+WARM_UP_ON_INIT = os.getenv("WARM_UP_ON_INIT", "false").lower() == "true"
+
 # Safety defaults
 DEFAULT_TOP_K = 5
 MAX_TOKENS = 512
@@ -44,4 +195,5 @@ if __name__ == "__main__":
     print("✅ Settings loaded:")
     print(f" - Bedrock region: {BEDROCK_REGION}")
     print(f" - Pinecone index: {PINECONE_INDEX_NAME}")
+    print(f" - Vector backend: {VECTOR_BACKEND}")
     print(f" - Models: {list(MODEL_MAP.keys())}")
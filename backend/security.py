@@ -1,16 +1,154 @@
+import math
 import time
+import threading
+from collections import OrderedDict
 from fastapi import Request
 from fastapi.responses import JSONResponse
+from backend.config.settings import (
+    RATE_LIMIT_MAX_REQUESTS,
+    RATE_LIMIT_WINDOW_SECONDS,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_MAX_KEYS,
+    REDIS_URL,
+)
+from backend.services.concurrency import run_stage
 
-# Simple in-memory per-IP rate limiter.
-# Good enough for development and overnight safety.
-
-# { ip_address: [timestamps] }
-REQUEST_COUNTS = {}
+# Per-IP rate limiter (sliding-window counter).
+#
+# Each key keeps two counters: requests in the current fixed window and in
+# the previous one. The rate is estimated as
+#     previous * (fraction of the previous window still in range) + current
+# which is O(1) per check and close to a true sliding log without storing
+# timestamps.
 
 # Allowed requests per time window
-MAX_REQUESTS = 20          # adjust as needed
-WINDOW_SECONDS = 60        # 1 minute
+MAX_REQUESTS = RATE_LIMIT_MAX_REQUESTS
+WINDOW_SECONDS = RATE_LIMIT_WINDOW_SECONDS
+
+# Redis round trips run on the stage executor; give up (and fail open)
+# after this long
+REDIS_SOCKET_TIMEOUT_SECONDS = 0.2
+STORE_TIMEOUT_SECONDS = 0.5
+
+
+# -----------------------------------------------------------
+# STORES: hit(key, window_id) → (current count incl. this hit, previous count)
+# -----------------------------------------------------------
+class MemoryStore:
+    """
+    In-process counters. Keys are kept in least-recently-seen order, so
+    keys idle for two windows are evicted from the front in O(1) amortized
+    time; `max_keys` caps memory under IP scans.
+    """
+
+    def __init__(self, window_seconds: float = WINDOW_SECONDS, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._keys = OrderedDict()    # key → [window_id, current, previous, last_seen]
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, window_id: int, now: float):
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is None:
+                entry = self._keys[key] = [window_id, 0, 0, now]
+            else:
+                self._keys.move_to_end(key)
+                if entry[0] != window_id:
+                    # Roll over: previous window only counts if it is adjacent
+                    entry[2] = entry[1] if entry[0] == window_id - 1 else 0
+                    entry[1] = 0
+                    entry[0] = window_id
+            entry[1] += 1
+            entry[3] = now
+            self._evict(now)
+            return entry[1], entry[2]
+
+    def undo(self, key: str, window_id: int):
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is not None and entry[0] == window_id and entry[1] > 0:
+                entry[1] -= 1
+
+    def _evict(self, now: float):
+        idle_after = 2 * self.window_seconds
+        while self._keys:
+            key, entry = next(iter(self._keys.items()))
+            if now - entry[3] < idle_after and len(self._keys) <= self.max_keys:
+                break
+            del self._keys[key]
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class RedisStore:
+    """
+    Shared counters in Redis (or anything speaking its INCR/EXPIRE/GET
+    commands). One key per (client, window), expiring after two windows.
+    """
+
+    def __init__(self, client, window_seconds: float = WINDOW_SECONDS, prefix: str = "rl"):
+        self.client = client
+        self.window_seconds = window_seconds
+        self.prefix = prefix
+
+    def _key(self, key, window_id):
+        return f"{self.prefix}:{key}:{window_id}"
+
+    def hit(self, key: str, window_id: int, now: float):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.incr(self._key(key, window_id))
+        pipe.expire(self._key(key, window_id), int(math.ceil(2 * self.window_seconds)))
+        pipe.get(self._key(key, window_id - 1))
+        current, _, previous = pipe.execute()
+        return int(current), int(previous or 0)
+
+    def undo(self, key: str, window_id: int):
+        self.client.decr(self._key(key, window_id))
+
+
+# -----------------------------------------------------------
+# LIMITER
+# -----------------------------------------------------------
+class SlidingWindowLimiter:
+    def __init__(self, store, max_requests: int = MAX_REQUESTS, window_seconds: float = WINDOW_SECONDS):
+        self.store = store
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+
+    def check(self, key: str, now: float = None):
+        """
+        Count one request for `key`. Returns (allowed, retry_after_seconds);
+        denied requests are not counted against the client.
+        """
+        now = time.time() if now is None else now
+        window_id = int(now // self.window_seconds)
+        elapsed = (now % self.window_seconds) / self.window_seconds
+
+        current, previous = self.store.hit(key, window_id, now)
+        estimate = previous * (1.0 - elapsed) + current
+        if estimate <= self.max_requests:
+            return True, 0
+
+        self.store.undo(key, window_id)
+        retry_after = int(math.ceil(self.window_seconds * (1.0 - elapsed))) or 1
+        return False, retry_after
+
+
+def _make_limiter(backend: str = RATE_LIMIT_BACKEND) -> SlidingWindowLimiter:
+    if backend == "redis":
+        import redis    # optional dependency, only needed for the shared backend
+        store = RedisStore(redis.Redis.from_url(REDIS_URL, socket_timeout=REDIS_SOCKET_TIMEOUT_SECONDS))
+    elif backend == "memory":
+        store = MemoryStore()
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+    return SlidingWindowLimiter(store)
+
+
+limiter = _make_limiter()
+
 
 def _client_ip(request: Request) -> str:
     """Extract client IP from headers (API Gateway uses X-Forwarded-For)."""
@@ -25,17 +163,26 @@ async def enforce_rate_limit(request: Request):
     Returns JSONResponse(429) if over limit, else None.
     """
     ip = _client_ip(request)
-    now = time.time()
 
-    # Keep only timestamps within the active window
-    REQUEST_COUNTS.setdefault(ip, [])
-    REQUEST_COUNTS[ip] = [t for t in REQUEST_COUNTS[ip] if now - t < WINDOW_SECONDS]
+    try:
+        if isinstance(limiter.store, MemoryStore):
+            # A dict update under a lock: cheaper inline than an executor hop
+            allowed, retry_after = limiter.check(ip)
+        else:
+            # Network round trip (Redis): keep it off the event loop
+            allowed, retry_after = await run_stage(
+                "rate_limit", limiter.check, ip, timeout=STORE_TIMEOUT_SECONDS, record=False,
+            )
+    except Exception as e:
+        # Shared store unreachable: fail open rather than reject all traffic
+        print(f"[ERROR] Rate limit store unavailable: {e}")
+        return None
 
-    if len(REQUEST_COUNTS[ip]) >= MAX_REQUESTS:
+    if not allowed:
         return JSONResponse(
             {"error": "Rate limit exceeded. Try again later."},
-            status_code=429
+            status_code=429,
+            headers={"Retry-After": str(retry_after)},
         )
 
-    REQUEST_COUNTS[ip].append(now)
     return None
@@ -0,0 +1,350 @@
+import re
+import csv
+import threading
+import numpy as np
+from backend.services.filters import MetadataMasks, parse_filters, describe_filter, YEAR_FIELD
+
+# -----------------------------------------------------------
+# COLUMNAR AGGREGATE ENGINE
+# -----------------------------------------------------------
+# Questions like "which model had the highest Sales_Volume in 2022" or
+# "average Price_USD by Region" need every row, not the top-k chunks of a
+# vector search. The raw CSV is held as one NumPy array per column
+# (categoricals dictionary-encoded), unfiltered group-by rollups are
+# precomputed once per column, and the router below turns aggregate-shaped
+# questions into a plan whose compact result becomes the LLM context.
+
+# Integer columns with at most this many distinct values (Year) are also
+# treated as categorical (filterable / groupable)
+MAX_CATEGORIES = 32
+
+# Groups listed in a generated context
+MAX_GROUPS_SHOWN = 12
+
+# Metrics where a per-group total is the natural "most/least" ranking;
+# others (price, mileage, engine size) rank by average
+ADDITIVE_METRICS = {"Sales_Volume"}
+
+METRIC_SYNONYMS = {
+    "Sales_Volume": ["sales volume", "sales", "sold", "units", "volume", "sell", "sells", "selling", "popular"],
+    "Price_USD": ["price usd", "price", "prices", "cost", "expensive", "cheapest", "cheaper", "priced"],
+    "Mileage_KM": ["mileage km", "mileage", "km", "kilometres", "kilometers"],
+    "Engine_Size_L": ["engine size l", "engine size", "engine"],
+}
+
+# Synonyms too loose to mark a question as aggregate on their own ("top
+# features of the X5 engine", "most popular colour options"): they only
+# pick the metric when the question also asks for a breakdown
+LOOSE_METRIC_SYNONYMS = {"engine", "popular", "volume", "cost"}
+
+# Nouns that make a bare "how many" a row count ("how many records in Asia")
+ROW_NOUNS = ["rows", "records", "entries", "listings", "cars", "vehicles"]
+
+GROUP_SYNONYMS = {
+    # "which BMW sold most" ranks models, not single rows
+    "Model": ["model", "models", "car", "cars", "bmw", "bmws"],
+    "Year": ["year", "years"],
+    "Region": ["region", "regions", "market", "markets"],
+    "Color": ["color", "colour", "colors", "colours"],
+    "Fuel_Type": ["fuel type", "fuel types", "fuel"],
+    "Transmission": ["transmission", "transmissions", "gearbox"],
+    "Sales_Classification": ["sales classification", "classification"],
+}
+
+OP_PATTERNS = [
+    ("count", r"how many|number of|count"),
+    ("mean", r"average|avg|mean|typical"),
+    ("sum", r"total|sum|overall|combined|altogether"),
+    ("max", r"highest|most|top|maximum|max|largest|biggest|best"),
+    ("min", r"lowest|least|fewest|minimum|min|smallest|worst|cheapest"),
+]
+
+# Word in front of a group column that asks for a breakdown
+_GROUP_CUE = r"(?:by|per|each|every|which|what|across|among|for all|compare)"
+
+
+def _normalize(text: str) -> str:
+    return " " + re.sub(r"[^a-z0-9.]+", " ", text.lower().replace("_", " ")) + " "
+
+
+def _contains(norm: str, phrase: str) -> bool:
+    return f" {phrase} " in norm
+
+
+def _encode(values):
+    """Dictionary-encode strings: (int32 codes, sorted category values)."""
+    categories = sorted(set(values), key=lambda v: (len(v), v) if v.isdigit() else (0, v))
+    lookup = {v: i for i, v in enumerate(categories)}
+    codes = np.fromiter((lookup[v] for v in values), dtype=np.int32, count=len(values))
+    return codes, categories
+
+
+# -----------------------------------------------------------
+# STORE
+# -----------------------------------------------------------
+class ColumnStore:
+    def __init__(self, numeric: dict, categorical: dict, n_rows: int, columns: list = None):
+        self.numeric = numeric              # column → float64 array
+        self.categorical = categorical      # column → (int32 codes, [category values])
+        self.n_rows = n_rows
+        # Column order for rendering rows (the CSV header)
+        self.columns = columns or list(categorical) + [c for c in numeric if c not in categorical]
+        self._rollups = {}
+        self._lock = threading.Lock()
+
+        # Filter evaluation shares services/filters.py with vector search:
+        # numeric columns as floats (Year ranges work), the rest as strings
+        columns = dict(numeric)
+        for name, (codes, categories) in categorical.items():
+            if name not in numeric:
+                columns[name] = np.array(categories, dtype=object)[codes]
+        self.masks = MetadataMasks(columns, n_rows)
+        # Question vocabulary: the string categories actually in the data
+        self.vocabulary = {c: cats for c, (_, cats) in categorical.items() if c not in numeric}
+
+    @classmethod
+    def from_csv(cls, path: str):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            raw = list(zip(*reader)) or [()] * len(header)
+
+        numeric, categorical = {}, {}
+        for name, values in zip(header, raw):
+            try:
+                array = np.array(values, dtype=np.float64)
+            except ValueError:
+                array = None
+            if array is not None:
+                numeric[name] = array
+                is_int = array.size and np.all(array == np.round(array))
+                if not (is_int and len(np.unique(array)) <= MAX_CATEGORIES):
+                    continue
+            categorical[name] = _encode(values)
+        return cls(numeric, categorical, len(raw[0]) if raw else 0, columns=header)
+
+    def __len__(self):
+        return self.n_rows
+
+    def describe_row(self, row: int) -> str:
+        """Every column of one row, e.g. 'Model: X5, Year: 2022, ..., Mileage_KM: 1,000'."""
+        parts = []
+        for column in self.columns:
+            # Numbers formatted as numbers; years and strings as their category
+            if column in self.numeric and column != YEAR_FIELD:
+                parts.append(f"{column}: {_fmt(self.numeric[column][row])}")
+            elif column in self.categorical:
+                codes, categories = self.categorical[column]
+                parts.append(f"{column}: {categories[codes[row]]}")
+        return ", ".join(parts)
+
+    # -------------------------------------------------------
+    # FILTERS + ROLLUPS
+    # -------------------------------------------------------
+    def mask(self, flt: dict):
+        """Boolean row mask for a metadata filter (None = all rows)."""
+        return self.masks.mask(flt)
+
+    def group_stats(self, group: str, metric: str, mask=None):
+        """
+        Per-category {count, sum, mean, min, max} arrays for `metric`
+        grouped by `group`. Unfiltered results are computed once and cached.
+        """
+        if mask is None:
+            key = (group, metric)
+            with self._lock:
+                cached = self._rollups.get(key)
+            if cached is None:
+                cached = self._group_stats(group, metric, None)
+                with self._lock:
+                    self._rollups[key] = cached
+            return cached
+        return self._group_stats(group, metric, mask)
+
+    def _group_stats(self, group, metric, mask):
+        codes, categories = self.categorical[group]
+        values = self.numeric[metric] if metric else np.zeros(self.n_rows)
+        if mask is not None:
+            codes, values = codes[mask], values[mask]
+        n = len(categories)
+        count = np.bincount(codes, minlength=n).astype(np.float64)
+        total = np.bincount(codes, weights=values, minlength=n)
+        low = np.full(n, np.inf)
+        high = np.full(n, -np.inf)
+        np.minimum.at(low, codes, values)
+        np.maximum.at(high, codes, values)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+        return {"categories": categories, "count": count, "sum": total, "mean": mean, "min": low, "max": high}
+
+    def preload_rollups(self):
+        """Precompute every unfiltered (group column, metric) rollup."""
+        for group in self.categorical:
+            for metric in self.numeric:
+                if metric != group:
+                    self.group_stats(group, metric)
+
+
+# -----------------------------------------------------------
+# ROUTER: question → aggregate plan (or None)
+# -----------------------------------------------------------
+def plan_question(store: ColumnStore, question: str):
+    """
+    Parse an aggregate-shaped question into
+        {'op', 'metric', 'group', 'filters'}
+    or return None if it does not look like an aggregation (those go to
+    normal retrieval).
+    """
+    norm = _normalize(question)
+
+    op = None
+    for name, pattern in OP_PATTERNS:
+        if re.search(rf" (?:{pattern}) ", norm):
+            op = name
+            break
+    if op is None:
+        return None
+
+    metric, explicit = None, False
+    for column, synonyms in METRIC_SYNONYMS.items():
+        matched = [s for s in synonyms if _contains(norm, s)] if column in store.numeric else []
+        if matched:
+            metric, explicit = column, any(s not in LOOSE_METRIC_SYNONYMS for s in matched)
+            break
+    if metric is None and op != "count":
+        return None
+
+    # "How many X5 were sold" means units, not rows
+    if op == "count" and metric in ADDITIVE_METRICS:
+        op = "sum"
+
+    # Breakdown column: "by region", "which model"; for rankings also a
+    # bare "most expensive model" (a loose metric word must sit right in
+    # front: "most popular model"). The earliest mention wins.
+    ranking_cue = "[a-z]+" if explicit else "|".join(re.escape(s) for s in matched)
+    group, position = None, len(norm)
+    for column, synonyms in GROUP_SYNONYMS.items():
+        if column not in store.categorical:
+            continue
+        alternatives = "|".join(re.escape(s) for s in synonyms)
+        cue = rf"{_GROUP_CUE}|{ranking_cue}" if op in ("max", "min") and ranking_cue else _GROUP_CUE
+        found = re.search(rf" (?:{cue}) (?:[a-z0-9]+ )?(?:{alternatives}) ", norm)
+        if found and found.start() < position:
+            group, position = column, found.start()
+
+    # Generic top/most/how many words need an explicit metric column or a
+    # breakdown; otherwise the question is descriptive and goes to retrieval
+    if metric is None:
+        rows = "|".join(ROW_NOUNS)
+        if group is None and not re.search(rf" (?:{OP_PATTERNS[0][1]}) (?:[a-z0-9]+ )?(?:{rows}) ", norm):
+            return None
+    elif not explicit and group is None:
+        return None
+
+    return {
+        "op": op,
+        "metric": metric,
+        "group": group,
+        "filters": parse_filters(question, store.vocabulary),
+    }
+
+
+# -----------------------------------------------------------
+# EXECUTION → compact context text
+# -----------------------------------------------------------
+def _fmt(value: float) -> str:
+    if not np.isfinite(value):
+        return "n/a"
+    return f"{value:,.0f}" if abs(value) >= 100 or float(value).is_integer() else f"{value:,.2f}"
+
+
+def execute(store: ColumnStore, plan: dict) -> str:
+    """Run a plan and render the result as a few lines of plain text."""
+    mask = store.mask(plan["filters"])
+    rows = store.n_rows if mask is None else int(mask.sum())
+    op, metric, group = plan["op"], plan["metric"], plan["group"]
+    lines = [f"Computed over the full BMW sales dataset ({describe_filter(plan['filters']) or 'all rows'}; {rows:,} rows)."]
+
+    if rows == 0:
+        lines.append("No rows match these conditions.")
+        return "\n".join(lines)
+
+    if group is None:
+        if op == "count":
+            lines.append(f"Number of rows: {rows:,}")
+            return "\n".join(lines)
+        values = store.numeric[metric] if mask is None else store.numeric[metric][mask]
+        if op in ("max", "min"):
+            i = int(np.argmax(values) if op == "max" else np.argmin(values))
+            row = np.flatnonzero(mask)[i] if mask is not None else i
+            lines.append(f"{'Highest' if op == 'max' else 'Lowest'} {metric}: {_fmt(values[i])} "
+                         f"({store.describe_row(row)})")
+        if metric in ADDITIVE_METRICS:
+            lines.append(f"Total {metric}: {_fmt(values.sum())}; average per row: {_fmt(values.mean())}")
+        else:
+            lines.append(f"Average {metric}: {_fmt(values.mean())}")
+        return "\n".join(lines)
+
+    stats = store.group_stats(group, metric if metric else next(iter(store.numeric)), mask)
+    present = stats["count"] > 0
+    if op == "count":
+        key, label = "count", "Row count"
+    elif op in ("sum", "mean"):
+        key, label = op, ("Total " if op == "sum" else "Average ") + metric
+    else:
+        key = "sum" if metric in ADDITIVE_METRICS else "mean"
+        label = ("Total " if key == "sum" else "Average ") + metric
+
+    order = [i for i in np.argsort(-stats[key], kind="stable") if present[i]]
+    if op == "min":
+        order = order[::-1]
+    ranking = {"max": ", highest first", "min": ", lowest first"}.get(op, ", highest first")
+    lines.append(f"{label} by {group}{ranking}:")
+    for rank, i in enumerate(order[:MAX_GROUPS_SHOWN], start=1):
+        extra = f" (rows: {int(stats['count'][i]):,})" if key != "count" else ""
+        lines.append(f"{rank}. {stats['categories'][i]}: {_fmt(stats[key][i])}{extra}")
+    if len(order) > MAX_GROUPS_SHOWN:
+        lines.append(f"... {len(order) - MAX_GROUPS_SHOWN} more groups")
+    return "\n".join(lines)
+
+
+# -----------------------------------------------------------
+# ENTRY POINT
+# -----------------------------------------------------------
+_store = None
+_store_missing = False
+_store_lock = threading.Lock()
+
+
+def get_store(path: str = None):
+    """Shared ColumnStore, loaded on first use; None if the CSV is not deployed."""
+    global _store, _store_missing
+    if _store is None and not _store_missing:
+        with _store_lock:
+            if _store is None and not _store_missing:
+                from backend.config.settings import ANALYTICS_CSV_PATH
+                from backend.services.prompts import resolve_path
+                csv_path = resolve_path(path or ANALYTICS_CSV_PATH)
+                try:
+                    store = ColumnStore.from_csv(csv_path)
+                except FileNotFoundError:
+                    print(f"[WARN] Analytics CSV not found at {csv_path}; aggregate routing disabled")
+                    _store_missing = True
+                    return None
+                store.preload_rollups()
+                _store = store
+    return _store
+
+
+def answer_aggregate(question: str):
+    """
+    For an aggregate question, return a single match dict whose text is
+    the computed result (used as the whole LLM context); else None.
+    """
+    store = get_store()
+    if store is None:
+        return None
+    plan = plan_question(store, question)
+    if plan is None:
+        return None
+    return {"id": "aggregate", "score": 1.0, "text": execute(store, plan), "plan": plan}
@@ -0,0 +1,292 @@
+import time
+import json
+import numpy as np
+from backend.services.filters import LazyMetadataMasks
+from backend.services.local_index import (
+    LocalVectorIndex,
+    load_embeddings,
+    normalize_rows,
+    top_k_indices,
+)
+
+# -----------------------------------------------------------
+# APPROXIMATE NEAREST-NEIGHBOUR INDEX (IVF-Flat)
+# -----------------------------------------------------------
+# Vectors are clustered with spherical k-means into `nlist` inverted
+# lists. A query is compared to the centroids first and only the
+# `nprobe` closest lists are scanned exhaustively, so query cost grows
+# with nprobe * (N / nlist) instead of N.
+#
+#   nprobe = 1       → fastest, lowest recall
+#   nprobe = nlist   → identical to exact search
+#
+# Use recall_at_k() to measure the recall actually bought at a given
+# nprobe before changing IVF_NPROBE in settings.
+
+
+def _encode_strings(values):
+    """Pack a list of str into (uint8 utf-8 blob, int64 offsets) for np.savez."""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def _decode_strings(blob: np.ndarray, offsets: np.ndarray):
+    raw = blob.tobytes()
+    return [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def train_centroids(matrix: np.ndarray, nlist: int, iterations: int = 10,
+                    sample_size: int = None, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means over unit vectors (cosine distance).
+    Trains on a random sample of at most `sample_size` rows (default
+    64 per list), which is plenty for stable centroids.
+    """
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[0]
+    nlist = max(1, min(nlist, n))
+    sample_size = sample_size or nlist * 64
+
+    if n > sample_size:
+        sample = matrix[rng.choice(n, size=sample_size, replace=False)]
+    else:
+        sample = matrix
+
+    centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        counts = np.bincount(assign, minlength=nlist)
+
+        # Per-cluster sums via sort + reduceat (much faster than np.add.at)
+        order = np.argsort(assign, kind="stable")
+        present = np.where(counts > 0)[0]
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[present]
+        sums = np.zeros_like(centroids)
+        sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+
+        # Re-seed empty clusters from random points so no list stays empty
+        empty = np.where(counts == 0)[0]
+        if len(empty):
+            sums[empty] = sample[rng.choice(sample.shape[0], size=len(empty), replace=False)]
+
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index over L2-normalised vectors.
+
+    Rows are stored grouped by list, so list `l` is the contiguous slice
+    matrix[offsets[l]:offsets[l + 1]] and scanning a list is a single matmul.
+    """
+
+    def __init__(self, centroids, matrix, list_offsets, ids, texts, nprobe: int = 8, metadata=None):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.list_offsets = np.asarray(list_offsets, dtype=np.int64)
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.nprobe = nprobe
+        self.metadata = list(metadata) if metadata is not None else [{}] * len(self.ids)
+        self.masks = LazyMetadataMasks(self.metadata, len(self.ids))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    # -------------------------------------------------------
+    # BUILD
+    # -------------------------------------------------------
+    @classmethod
+    def build(cls, ids, vectors, texts, nlist: int = None, nprobe: int = 8,
+              iterations: int = 10, seed: int = 0, metadata=None) -> "IVFIndex":
+        """
+        Cluster the vectors and lay them out list by list.
+        Default nlist is ~4 * sqrt(N), the usual IVF starting point.
+        """
+        matrix = normalize_rows(vectors)
+        n = matrix.shape[0]
+        if nlist is None:
+            nlist = max(1, int(4 * np.sqrt(n)))
+
+        centroids = train_centroids(matrix, nlist, iterations=iterations, seed=seed)
+        assign = np.argmax(matrix @ centroids.T, axis=1)
+
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=centroids.shape[0])
+        offsets = np.zeros(centroids.shape[0] + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(counts)
+
+        return cls(
+            centroids,
+            matrix[order],
+            offsets,
+            [ids[i] for i in order],
+            [texts[i] for i in order],
+            nprobe=nprobe,
+            metadata=[metadata[i] for i in order] if metadata is not None else None,
+        )
+
+    @classmethod
+    def from_path(cls, path: str, **kwargs) -> "IVFIndex":
+        """Build from an embeddings JSONL file or a binary embedding store."""
+        ids, matrix, texts, metadatas = load_embeddings(path, with_metadata=True)
+        return cls.build(ids, matrix, texts, metadata=metadatas, **kwargs)
+
+    # -------------------------------------------------------
+    # PERSISTENCE
+    # -------------------------------------------------------
+    def save(self, path: str):
+        """Write the index to a single .npz file (no pickled objects)."""
+        id_blob, id_offsets = _encode_strings(self.ids)
+        text_blob, text_offsets = _encode_strings(self.texts)
+        meta_blob, meta_offsets = _encode_strings([json.dumps(m) if m else "" for m in self.metadata])
+        np.savez(
+            path,
+            centroids=self.centroids,
+            matrix=self.matrix,
+            list_offsets=self.list_offsets,
+            id_blob=id_blob,
+            id_offsets=id_offsets,
+            text_blob=text_blob,
+            text_offsets=text_offsets,
+            meta_blob=meta_blob,
+            meta_offsets=meta_offsets,
+        )
+
+    @classmethod
+    def load(cls, path: str, nprobe: int = 8) -> "IVFIndex":
+        with np.load(path, allow_pickle=False) as data:
+            metadata = None
+            if "meta_blob" in data.files:     # indexes saved before metadata filters have none
+                metadata = [json.loads(m) if m else {} for m in _decode_strings(data["meta_blob"], data["meta_offsets"])]
+            return cls(
+                data["centroids"],
+                data["matrix"],
+                data["list_offsets"],
+                _decode_strings(data["id_blob"], data["id_offsets"]),
+                _decode_strings(data["text_blob"], data["text_offsets"]),
+                nprobe=nprobe,
+                metadata=metadata,
+            )
+
+    # -------------------------------------------------------
+    # SEARCH
+    # -------------------------------------------------------
+    def _search_arrays(self, queries: np.ndarray, top_k: int, nprobe: int, mask: np.ndarray = None):
+        """
+        Return per-query (row indices, scores) arrays, best first. With a
+        metadata `mask`, probed lists are restricted to matching rows; if
+        that leaves fewer than top_k, every matching row is scanned (a
+        selective filter makes the exact scan cheap).
+        """
+        nprobe = max(1, min(nprobe, self.nlist))
+        probe = top_k_indices(queries @ self.centroids.T, nprobe)
+        matching = np.flatnonzero(mask) if mask is not None else None
+
+        all_idx, all_scores = [], []
+        for q, lists in zip(queries, probe):
+            candidates = np.concatenate([
+                np.arange(self.list_offsets[l], self.list_offsets[l + 1]) for l in lists
+            ])
+            if mask is not None:
+                candidates = candidates[mask[candidates]]
+                if len(candidates) < top_k:
+                    candidates = matching
+            if len(candidates) == 0:
+                all_idx.append(np.empty(0, dtype=np.int64))
+                all_scores.append(np.empty(0, dtype=np.float32))
+                continue
+
+            scores = self.matrix[candidates] @ q
+            best = top_k_indices(scores.reshape(1, -1), top_k)[0]
+            all_idx.append(candidates[best])
+            all_scores.append(scores[best])
+
+        return all_idx, all_scores
+
+    def search(self, query_vectors, top_k: int = 5, nprobe: int = None, metadata_filter: dict = None):
+        """
+        Approximate top-k for a batch of queries, optionally restricted to
+        rows matching `metadata_filter` (Pinecone syntax).
+
+        Returns:
+            One list per query of {'id', 'score', 'text'} dicts, best first.
+        """
+        queries = normalize_rows(query_vectors)
+        if queries.shape[1] != self.dim:
+            raise ValueError(
+                f"Query dimension {queries.shape[1]} does not match index dimension {self.dim}"
+            )
+
+        idx, scores = self._search_arrays(queries, top_k, nprobe or self.nprobe,
+                                          self.masks.mask(metadata_filter))
+        return [
+            [
+                {"id": self.ids[i], "score": round(float(s), 4), "text": self.texts[i]}
+                for i, s in zip(row_idx, row_scores)
+            ]
+            for row_idx, row_scores in zip(idx, scores)
+        ]
+
+    def query(self, query_vector, top_k: int = 5, nprobe: int = None, metadata_filter: dict = None):
+        """Single-query convenience wrapper around search()."""
+        return self.search([query_vector], top_k=top_k, nprobe=nprobe, metadata_filter=metadata_filter)[0]
+
+    def to_exact(self) -> LocalVectorIndex:
+        """Exact index over the same vectors, used as recall ground truth."""
+        return LocalVectorIndex(self.ids, self.matrix, self.texts, metadata=self.metadata)
+
+
+# -----------------------------------------------------------
+# FUNCTION: Recall@k against exact search
+# -----------------------------------------------------------
+def recall_at_k(ann: IVFIndex, queries, top_k: int = 10, nprobe: int = None,
+                exact: LocalVectorIndex = None) -> dict:
+    """
+    Measure how many of the exact top-k ids the IVF index returns.
+
+    Returns:
+        {'recall', 'nprobe', 'k', 'queries', 'ann_ms_per_query', 'exact_ms_per_query'}
+    """
+    exact = exact or ann.to_exact()
+    nprobe = nprobe or ann.nprobe
+    queries = normalize_rows(queries)
+
+    start = time.perf_counter()
+    truth = exact.search(queries, top_k=top_k)
+    exact_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    approx = ann.search(queries, top_k=top_k, nprobe=nprobe)
+    ann_ms = (time.perf_counter() - start) * 1000
+
+    hits = 0
+    total = 0
+    for t, a in zip(truth, approx):
+        expected = {m["id"] for m in t}
+        hits += len(expected & {m["id"] for m in a})
+        total += len(expected)
+
+    n = max(len(queries), 1)
+    return {
+        "recall": round(hits / total, 4) if total else 1.0,
+        "nprobe": nprobe,
+        "k": top_k,
+        "queries": len(queries),
+        "ann_ms_per_query": round(ann_ms / n, 3),
+        "exact_ms_per_query": round(exact_ms / n, 3),
+    }
@@ -0,0 +1,166 @@
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# -----------------------------------------------------------
+# SEMANTIC ANSWER CACHE
+# -----------------------------------------------------------
+# Sits in front of retrieval + generation in /api/ask. Entries are
+# bucketed by (model_id, k, scope); inside a bucket a lookup returns the
+# most similar previous question if its cosine similarity to the new
+# query embedding is at or above `threshold`. The scope is the query's
+# metadata filter, so "X5 in 2020" never answers "X5 in 2021" however
+# close the two embeddings are.
+#
+# Entries expire after `ttl_seconds`, the least recently used entry is
+# evicted once `max_entries` is reached, and everything is dropped when
+# the vector index version changes (re-ingestion).
+
+
+class SemanticAnswerCache:
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()   # entry_id -> entry dict (LRU order)
+        self._buckets = {}              # (model_id, k, scope) -> {"ids": [...], "matrix": ndarray | None}
+        self._next_id = 0
+        self._index_version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    # -------------------------------------------------------
+    # INTERNALS
+    # -------------------------------------------------------
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _bucket_matrix(self, bucket: dict):
+        """Stacked unit vectors for a bucket, rebuilt only after a change."""
+        if bucket["matrix"] is None and bucket["ids"]:
+            bucket["matrix"] = np.stack([self._entries[i]["vector"] for i in bucket["ids"]])
+        return bucket["matrix"]
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        bucket = self._buckets[entry["bucket"]]
+        bucket["ids"].remove(entry_id)
+        bucket["matrix"] = None
+
+    def _check_version(self, index_version):
+        if index_version is not None and index_version != self._index_version:
+            if self._index_version is not None:
+                self._clear()
+                self.invalidations += 1
+            self._index_version = index_version
+
+    def _clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+
+    # -------------------------------------------------------
+    # PUBLIC API
+    # -------------------------------------------------------
+    def lookup(self, model_id: str, k: int, embedding, index_version=None, scope: str = ""):
+        """
+        Return the cached entry {'query', 'answer', 'matches', 'answered_by',
+        'similarity'} for the most similar previous question, or None.
+        """
+        query_vec = self._unit(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            self._check_version(index_version)
+            bucket = self._buckets.get((model_id, k, scope))
+            matrix = self._bucket_matrix(bucket) if bucket else None
+            if matrix is None or matrix.shape[1] != query_vec.shape[0]:
+                self.misses += 1
+                return None
+
+            sims = matrix @ query_vec
+            for pos in np.argsort(-sims):
+                if sims[pos] < self.threshold:
+                    break
+                entry_id = bucket["ids"][pos]
+                entry = self._entries[entry_id]
+                if entry["expires_at"] <= now:
+                    continue
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                return {
+                    "query": entry["query"],
+                    "answer": entry["answer"],
+                    "matches": entry["matches"],
+                    "answered_by": entry["answered_by"],
+                    "similarity": round(float(sims[pos]), 4),
+                }
+
+            self.misses += 1
+            return None
+
+    def store(self, model_id: str, k: int, embedding, query: str, answer: str,
+              matches: list, index_version=None, scope: str = "", answered_by: str = None):
+        """
+        Cache an answer. `answered_by` is the model that actually produced
+        it (a hedge / failover may answer for the bucket's model).
+        """
+        if self.max_entries <= 0:
+            return
+        key = (model_id, k, scope)
+        now = time.monotonic()
+
+        with self._lock:
+            self._check_version(index_version)
+
+            # Drop expired entries first, then LRU entries over capacity
+            for entry_id in [i for i, e in self._entries.items() if e["expires_at"] <= now]:
+                self._remove(entry_id)
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "bucket": key,
+                "vector": self._unit(embedding),
+                "query": query,
+                "answer": answer,
+                "matches": matches,
+                "answered_by": answered_by,
+                "expires_at": now + self.ttl_seconds,
+            }
+            bucket = self._buckets.setdefault(key, {"ids": [], "matrix": None})
+            bucket["ids"].append(entry_id)
+            bucket["matrix"] = None
+
+    def invalidate(self):
+        """Drop every entry (call after re-ingesting the index)."""
+        with self._lock:
+            self._clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,87 @@
+import threading
+from backend.config.settings import (
+    BEDROCK_REGION,
+    AWS_MAX_POOL_CONNECTIONS,
+    AWS_RETRY_MODE,
+    AWS_MAX_ATTEMPTS,
+    AWS_CONNECT_TIMEOUT_SECONDS,
+    AWS_READ_TIMEOUT_SECONDS,
+    AWS_TCP_KEEPALIVE,
+    BEDROCK_ENDPOINT_URL,
+)
+
+# -----------------------------------------------------------
+# SHARED AWS CLIENTS (created lazily, one per service/region)
+# -----------------------------------------------------------
+# boto3 is imported and clients are built on first use rather than at
+# import time, so a Lambda cold start only pays for the clients a request
+# actually needs. boto3 clients are thread-safe and shared process-wide.
+#
+# Every client gets the same tuned botocore Config: a connection pool
+# sized for the stage executor (botocore's default is 10), adaptive
+# retries, short connect / bounded read timeouts and TCP keepalive so
+# idle pooled connections are not silently dropped.
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def client_config(**overrides):
+    """
+    botocore Config used for every client. Keyword overrides:
+    max_pool_connections, retry_mode, max_attempts (total, including the
+    first call), connect_timeout, read_timeout, tcp_keepalive.
+    """
+    from botocore.config import Config
+
+    options = {
+        "max_pool_connections": AWS_MAX_POOL_CONNECTIONS,
+        "retry_mode": AWS_RETRY_MODE,
+        "max_attempts": AWS_MAX_ATTEMPTS,
+        "connect_timeout": AWS_CONNECT_TIMEOUT_SECONDS,
+        "read_timeout": AWS_READ_TIMEOUT_SECONDS,
+        "tcp_keepalive": AWS_TCP_KEEPALIVE,
+    }
+    unknown = set(overrides) - set(options)
+    if unknown:
+        raise ValueError(f"Unknown client option(s): {', '.join(sorted(unknown))}")
+    options.update(overrides)
+
+    return Config(
+        max_pool_connections=options["max_pool_connections"],
+        # total_max_attempts counts the first call ("max_attempts" here would mean retries)
+        retries={"mode": options["retry_mode"], "total_max_attempts": options["max_attempts"]},
+        connect_timeout=options["connect_timeout"],
+        read_timeout=options["read_timeout"],
+        tcp_keepalive=options["tcp_keepalive"],
+    )
+
+
+def get_client(service_name: str, region_name: str = None, **overrides):
+    """
+    Process-wide boto3 client for `service_name` (built on first call).
+    Callers passing the same overrides (see client_config) share a client.
+    """
+    key = (service_name, region_name or BEDROCK_REGION, tuple(sorted(overrides.items())))
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                import boto3
+                options = {}
+                if service_name == "bedrock-runtime" and BEDROCK_ENDPOINT_URL:
+                    options["endpoint_url"] = BEDROCK_ENDPOINT_URL
+                client = boto3.client(service_name, region_name=key[1], config=client_config(**overrides), **options)
+                _clients[key] = client
+    return client
+
+
+def bedrock_runtime():
+    return get_client("bedrock-runtime")
+
+
+def reset_clients():
+    """Drop cached clients (tests, or after credentials change)."""
+    with _lock:
+        _clients.clear()
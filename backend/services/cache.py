@@ -0,0 +1,148 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# -----------------------------------------------------------
+# IN-MEMORY CACHE: bounded LRU with per-entry TTL
+# -----------------------------------------------------------
+class TTLCache:
+    """
+    Thread-safe LRU cache with a time-to-live on every entry.
+
+    - get() moves a hit to the most-recently-used end
+    - set() evicts from the least-recently-used end once max_size is reached
+    - expired entries are dropped lazily when they are looked up
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# -----------------------------------------------------------
+# PERSISTENT CACHE: SQLite key/value store with TTL
+# -----------------------------------------------------------
+class SqliteCache:
+    """
+    Small persistent key -> bytes cache backed by SQLite.
+
+    Meant for a file under /tmp so entries survive warm Lambda
+    invocations and local restarts. Values are raw bytes; callers
+    decide the encoding.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 86400):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._conn = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] <= now:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                conn.commit()
+                self.misses += 1
+                return None
+            self.hits += 1
+            return bytes(row[0])
+
+    def set(self, key: str, value: bytes):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), expires_at),
+            )
+            conn.commit()
+
+    def purge_expired(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM cache")
+            conn.commit()
+
+    def stats(self) -> dict:
+        return {"path": self.path, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,152 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from backend.config.settings import (
+    STAGE_EXECUTOR_WORKERS,
+    MAX_CONCURRENT_REQUESTS,
+    ADMISSION_TIMEOUT_SECONDS,
+)
+from backend.services.metrics import record_latency, record_error
+from backend.services.tracing import add_span
+
+# -----------------------------------------------------------
+# NON-BLOCKING PIPELINE STAGES
+# -----------------------------------------------------------
+# boto3 and the Pinecone SDK are synchronous. Calling them directly from
+# an async route blocks the event loop, so every other in-flight request
+# in the worker stalls behind a slow generation. Stages are instead run
+# on a bounded thread pool and awaited with a per-stage timeout.
+
+
+class StageTimeoutError(Exception):
+    """A pipeline stage did not finish within its timeout."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"{stage} timed out after {timeout}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class OverloadedError(Exception):
+    """No request slot became free within ADMISSION_TIMEOUT_SECONDS."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide pool used for all blocking SDK calls."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=STAGE_EXECUTOR_WORKERS,
+                    thread_name_prefix="rag-stage",
+                )
+    return _executor
+
+
+async def run_stage(stage: str, func, *args, timeout: float = None, record: bool = True, **kwargs):
+    """
+    Run a blocking function on the stage executor without blocking the loop.
+
+    The caller's contextvars are copied into the worker thread. On timeout
+    StageTimeoutError is raised; the worker thread itself cannot be
+    interrupted and finishes in the background (SDK read timeouts bound it).
+    Latency (`<stage>_ms`, plus a span on the request trace) and failures
+    (`<stage>_errors`) are recorded unless record=False.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    future = loop.run_in_executor(get_executor(), call)
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        if record:
+            record_error(stage)
+        raise StageTimeoutError(stage, timeout) from None
+    except Exception:
+        if record:
+            record_error(stage)
+        raise
+    if record:
+        ms = round((time.perf_counter() - start) * 1000, 2)
+        record_latency(stage, ms)
+        add_span(stage, ms)
+    return result
+
+
+# -----------------------------------------------------------
+# CONCURRENCY CEILING (per event loop)
+# -----------------------------------------------------------
+# asyncio primitives are bound to the loop they first wait on, so keep
+# one semaphore per running loop.
+_slots = weakref.WeakKeyDictionary()
+
+
+def _semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _slots.get(loop)
+    if sem is None:
+        sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        _slots[loop] = sem
+    return sem
+
+
+class RequestSlot:
+    """One held pipeline slot; release() is idempotent."""
+
+    def __init__(self, sem: asyncio.Semaphore):
+        self._sem = sem
+        self.held = True
+        self.detached = False
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self._sem.release()
+
+    def detach(self):
+        """Keep the slot past the `async with` block; the caller releases it."""
+        self.detached = True
+
+    async def hold_during(self, events):
+        """Wrap an async generator (a streamed response) and release when it ends."""
+        try:
+            async for event in events:
+                yield event
+        finally:
+            self.release()
+
+
+@asynccontextmanager
+async def request_slot(timeout: float = None):
+    """
+    Hold one of MAX_CONCURRENT_REQUESTS pipeline slots for the duration of
+    the block. Waits up to `timeout` (ADMISSION_TIMEOUT_SECONDS by default)
+    and raises OverloadedError if no slot frees up.
+
+    Streaming endpoints call slot.detach() and release the slot once the
+    response body has been sent (see RequestSlot.hold_during).
+    """
+    sem = _semaphore()
+    wait = ADMISSION_TIMEOUT_SECONDS if timeout is None else timeout
+    try:
+        await asyncio.wait_for(sem.acquire(), wait)
+    except asyncio.TimeoutError:
+        raise OverloadedError(f"Server busy: {MAX_CONCURRENT_REQUESTS} requests in flight") from None
+    slot = RequestSlot(sem)
+    try:
+        yield slot
+    finally:
+        if not slot.detached:
+            slot.release()
@@ -0,0 +1,311 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+import numpy as np
+from backend.config.settings import (
+    MODEL_MAP,
+    DEFAULT_MODEL,
+    FALLBACK_MODEL,
+    HEDGE_ENABLED,
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_MIN_MS,
+    HEDGE_DEFAULT_MS,
+    MODEL_LATENCY_WINDOW,
+    BREAKER_WINDOW,
+    BREAKER_MIN_CALLS,
+    BREAKER_ERROR_RATE,
+    BREAKER_COOLDOWN_SECONDS,
+    BREAKER_PROBE_TIMEOUT_SECONDS,
+    GENERATE_TIMEOUT_SECONDS,
+)
+from backend.services.concurrency import run_stage
+from backend.services.metrics import metrics, record_latency, record_error
+from backend.services.prompts import build_context
+from backend.services.tracing import add_span, span
+
+logger = logging.getLogger("rag.dispatcher")
+
+# -----------------------------------------------------------
+# GENERATION DISPATCHER
+# -----------------------------------------------------------
+# One slow or throttled Bedrock call used to hold a request for its full
+# duration. The dispatcher keeps rolling latency / error stats per model:
+#
+#   - circuit breaker: a model failing most of its recent calls is skipped
+#     (requests go to the fallback) until a probe call succeeds again
+#   - hedging: if the model has not answered by its own p95 latency, the
+#     same question is also sent to FALLBACK_MODEL; the first answer wins
+#
+# and reports which model actually answered.
+
+
+class ModelUnavailableError(Exception):
+    """The requested model and the fallback both have open circuit breakers."""
+
+
+class ModelHealth:
+    """Rolling latency window and circuit breaker for one Bedrock model."""
+
+    def __init__(self, name: str, window: int = MODEL_LATENCY_WINDOW, breaker_window: int = BREAKER_WINDOW,
+                 min_calls: int = BREAKER_MIN_CALLS, error_rate: float = BREAKER_ERROR_RATE,
+                 cooldown: float = BREAKER_COOLDOWN_SECONDS, probe_timeout: float = BREAKER_PROBE_TIMEOUT_SECONDS):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate_limit = error_rate
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self.latencies = deque(maxlen=window)       # successful calls, ms
+        self.outcomes = deque(maxlen=breaker_window)
+        self.opened_at = None
+        self.probing = False
+        self.probe_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.probing else "open"
+
+    def record(self, ms: float, ok: bool, now: float = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if ok:
+                self.latencies.append(ms)
+            self.outcomes.append(ok)
+
+            if self.opened_at is not None:
+                # Any success while open means the upstream is back
+                if ok:
+                    print(f"[INFO] Circuit closed for {self.name}")
+                    self.opened_at = None
+                    self.outcomes.clear()
+                elif self.probing:
+                    self.opened_at = now
+                self.probing = False
+                return
+
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.error_rate_limit:
+                print(f"[WARN] Circuit opened for {self.name}: {failures}/{len(self.outcomes)} recent calls failed")
+                self.opened_at = now
+
+    def allow(self, now: float = None) -> bool:
+        """
+        May a call be sent? When open, lets one probe through per cooldown;
+        a probe unanswered after probe_timeout is abandoned.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.probing and now - self.probe_started >= self.probe_timeout:
+                print(f"[WARN] Probe for {self.name} never reported back; allowing another")
+                self.probing = False
+            if not self.probing and now - self.opened_at >= self.cooldown:
+                self.probing, self.probe_started = True, now
+                return True
+            return False
+
+    def release(self):
+        """A granted call was never sent (cancelled, or failed before Bedrock): free the probe."""
+        with self._lock:
+            self.probing = False
+
+    def percentile(self, q: float, min_samples: int = HEDGE_MIN_SAMPLES):
+        with self._lock:
+            if len(self.latencies) < min_samples:
+                return None
+            return float(np.percentile(np.fromiter(self.latencies, dtype=np.float64), q))
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class Dispatcher:
+    def __init__(self, fallback: str = FALLBACK_MODEL, hedge: bool = HEDGE_ENABLED):
+        self.fallback = fallback if fallback in MODEL_MAP else None
+        self.hedge = hedge
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def health(self, name: str) -> ModelHealth:
+        with self._lock:
+            if name not in self._health:
+                self._health[name] = ModelHealth(name)
+            return self._health[name]
+
+    # -------------------------------------------------------
+    # MODEL SELECTION
+    # -------------------------------------------------------
+    def resolve(self, model: str):
+        """
+        (name, Bedrock modelId); unknown names fall back to DEFAULT_MODEL
+        with a logged warning. The resolved name is what metrics, traces
+        and answered_by report, never the caller's raw string.
+        """
+        if model in MODEL_MAP:
+            return model, MODEL_MAP[model]
+        logger.warning(f"Unknown model '{model}', using {DEFAULT_MODEL} (available: {', '.join(MODEL_MAP)})")
+        return DEFAULT_MODEL, MODEL_MAP[DEFAULT_MODEL]
+
+    def _candidates(self, model: str):
+        primary = self.resolve(model)
+        if self.fallback and self.fallback != primary[0]:
+            return [primary, (self.fallback, MODEL_MAP[self.fallback])]
+        return [primary]
+
+    def choose(self, model: str):
+        """
+        First candidate (requested model, then fallback) whose breaker
+        allows a call. Raises ModelUnavailableError if none does.
+        """
+        return self._first_allowed(self._candidates(model))
+
+    def _first_allowed(self, candidates):
+        for name, model_id in candidates:
+            if self.health(name).allow():
+                return name, model_id
+        raise ModelUnavailableError(f"Circuit open for {' and '.join(n for n, _ in candidates)}")
+
+    def hedge_delay(self, name: str) -> float:
+        """Seconds to wait for `name` before hedging: its rolling p95, floored at HEDGE_MIN_MS."""
+        p = self.health(name).percentile(HEDGE_PERCENTILE)
+        return (HEDGE_DEFAULT_MS if p is None else max(p, HEDGE_MIN_MS)) / 1000
+
+    def record(self, name: str, ms: float, ok: bool):
+        self.health(name).record(ms, ok)
+
+    def release(self, name: str):
+        self.health(name).release()
+
+    # -------------------------------------------------------
+    # GENERATION
+    # -------------------------------------------------------
+    def _timed_call(self, generate, name, model_id, question, context, begun):
+        # Runs on the stage executor; records even if the caller gave up on it
+        begun.append(True)
+        start = time.perf_counter()
+        try:
+            answer = generate(model_id=model_id, question=question, context=context)
+        except Exception:
+            self.record(name, (time.perf_counter() - start) * 1000, ok=False)
+            raise
+        self.record(name, (time.perf_counter() - start) * 1000, ok=True)
+        return answer
+
+    async def _attempt(self, generate, name, model_id, question, matches, begun):
+        with span("prompt"):
+            context = build_context(model_id, matches, question)
+        return await run_stage(
+            "generation", self._timed_call, generate, name, model_id, question, context, begun,
+            timeout=GENERATE_TIMEOUT_SECONDS, record=False,
+        )
+
+    async def generate(self, model: str, question: str, matches: list, generate, hedge: bool = None):
+        """
+        Answer with the requested model, hedging to / failing over to the
+        fallback as described above. `generate(model_id, question, context)`
+        is the blocking Bedrock call (generate.generate_answer).
+
+        Returns:
+            {'answer', 'model', 'model_id', 'hedged'} — 'model' is the
+            MODEL_MAP name of the model that actually answered.
+        """
+        hedge = self.hedge if hedge is None else hedge
+        candidates = self._candidates(model)
+        first = self._first_allowed(candidates)
+        backup = [c for c in candidates if c != first]
+        backup = backup[0] if backup else None
+
+        start = time.perf_counter()
+        tasks, begun = {}, {}
+
+        def launch(candidate):
+            # begun[name] fills once the call reaches Bedrock (and will record)
+            begun[candidate[0]] = []
+            task = asyncio.ensure_future(self._attempt(generate, *candidate, question, matches, begun[candidate[0]]))
+            tasks[task] = candidate
+
+        launch(first)
+        deadline = self.hedge_delay(first[0]) if hedge and backup else None
+        launched_backup = hedged = False
+        winner, errors = None, []
+        try:
+            while tasks and winner is None:
+                wait = deadline if backup and not launched_backup else None
+                done, _ = await asyncio.wait(tasks, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    candidate = tasks.pop(task)
+                    if task.exception() is None:
+                        winner = (candidate, task.result())
+                        break
+                    errors.append(task.exception())
+
+                # Hedge deadline passed, or the first model failed outright
+                if winner is None and backup and not launched_backup and (not done or errors):
+                    launched_backup = True
+                    if self.health(backup[0]).allow():
+                        if not done:
+                            hedged = True
+                            metrics.increment("generation_hedged")
+                        launch(backup)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Calls that never reached Bedrock will never record: release
+            # their breaker probe rather than leaving it half-open
+            for name, started in begun.items():
+                if not started:
+                    self.release(name)
+
+        if winner is None:
+            record_error("generation")
+            raise errors[-1]
+
+        ms = round((time.perf_counter() - start) * 1000, 2)
+        record_latency("generation", ms)
+        add_span("generation", ms)
+        (name, model_id), answer = winner
+        if name != first[0] or errors:
+            metrics.increment("generation_fallback")
+        return {"answer": answer, "model": name, "model_id": model_id, "hedged": hedged}
+
+    # -------------------------------------------------------
+    # REPORTING
+    # -------------------------------------------------------
+    def snapshot(self) -> dict:
+        with self._lock:
+            names = sorted(self._health)
+        return {
+            name: {
+                "state": self.health(name).state,
+                "p95_ms": self.health(name).percentile(95, min_samples=1),
+                "error_rate": round(self.health(name).error_rate(), 4),
+            }
+            for name in names
+        }
+
+    def render(self) -> str:
+        """Prometheus gauges: per-model p95 latency, error rate, breaker state."""
+        lines = [
+            "# HELP rag_model_latency_p95_ms Rolling p95 generation latency per model.",
+            "# TYPE rag_model_latency_p95_ms gauge",
+            "# HELP rag_model_error_rate Failed fraction of recent generation calls per model.",
+            "# TYPE rag_model_error_rate gauge",
+            "# HELP rag_model_circuit_open 1 if the model's circuit breaker is open.",
+            "# TYPE rag_model_circuit_open gauge",
+        ]
+        for name, stats in self.snapshot().items():
+            if stats["p95_ms"] is not None:
+                lines.append(f'rag_model_latency_p95_ms{{model="{name}"}} {stats["p95_ms"]:.2f}')
+            lines.append(f'rag_model_error_rate{{model="{name}"}} {stats["error_rate"]}')
+            lines.append(f'rag_model_circuit_open{{model="{name}"}} {int(stats["state"] != "closed")}')
+        return "\n".join(lines) + "\n"
+
+
+dispatcher = Dispatcher()
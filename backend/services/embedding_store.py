@@ -0,0 +1,233 @@
+import os
+import json
+import shutil
+import numpy as np
+
+# -----------------------------------------------------------
+# BINARY EMBEDDING STORE
+# -----------------------------------------------------------
+# A directory replacing bmw_embeddings.jsonl:
+#
+#   manifest.json       {"format": 1, "count": N, "dim": D, "dtype": "float32", "normalized": bool}
+#   vectors.f32         raw row-major float32 matrix (N x D), memory-mapped on read
+#   ids.bin / ids.idx   utf-8 blob + int64 offsets (N + 1)
+#   texts.bin / .idx    same layout for chunk texts
+#   meta.bin / .idx     same layout, one JSON object per row
+#
+# Opening a store reads only the manifest and offset arrays; vectors and
+# strings are paged in by the OS on first touch, so loading is zero-copy
+# and cheap enough for Lambda cold starts.
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+VECTORS = "vectors.f32"
+COLUMNS = ("ids", "texts", "meta")
+
+
+def is_store(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST))
+
+
+class StringColumn:
+    """Read-only sequence of str backed by a memory-mapped blob + offsets."""
+
+    def __init__(self, blob_path: str, offsets_path: str):
+        self._offsets = np.fromfile(offsets_path, dtype=np.int64)
+        size = os.path.getsize(blob_path)
+        self._blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if size else np.empty(0, np.uint8)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def tolist(self):
+        return list(self)
+
+
+# -----------------------------------------------------------
+# READER
+# -----------------------------------------------------------
+class EmbeddingStore:
+    """
+    Reader for a binary embedding store.
+
+    Attributes:
+        vectors  — read-only np.memmap of shape (count, dim)
+        ids      — StringColumn of chunk ids
+        texts    — StringColumn of chunk texts
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported embedding store format in {path}: {self.manifest.get('format')}")
+
+        count, dim = self.manifest["count"], self.manifest["dim"]
+        if count:
+            self.vectors = np.memmap(os.path.join(path, VECTORS), dtype=np.float32, mode="r", shape=(count, dim))
+        else:
+            self.vectors = np.empty((0, dim), dtype=np.float32)
+
+        self.ids = StringColumn(os.path.join(path, "ids.bin"), os.path.join(path, "ids.idx"))
+        self.texts = StringColumn(os.path.join(path, "texts.bin"), os.path.join(path, "texts.idx"))
+        self._meta = StringColumn(os.path.join(path, "meta.bin"), os.path.join(path, "meta.idx"))
+
+    @classmethod
+    def open(cls, path: str) -> "EmbeddingStore":
+        return cls(path)
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    @property
+    def dim(self) -> int:
+        return self.manifest["dim"]
+
+    @property
+    def normalized(self) -> bool:
+        return bool(self.manifest.get("normalized"))
+
+    def metadata(self, i: int) -> dict:
+        raw = self._meta[i]
+        return json.loads(raw) if raw else {}
+
+    def iter_records(self):
+        """Yield {id, embedding, text, metadata} dicts, like the JSONL format."""
+        for i in range(len(self)):
+            yield {
+                "id": self.ids[i],
+                "embedding": self.vectors[i].tolist(),
+                "text": self.texts[i],
+                "metadata": self.metadata(i),
+            }
+
+
+# -----------------------------------------------------------
+# WRITER
+# -----------------------------------------------------------
+class EmbeddingStoreWriter:
+    """
+    Streaming writer. Records are appended to a sibling "<path>.tmp"
+    directory which atomically replaces `path` on close(), so readers
+    never see a half-written store.
+
+        with EmbeddingStoreWriter("data/processed/bmw_store") as w:
+            w.append(id, embedding, text, metadata)
+    """
+
+    def __init__(self, path: str, normalize: bool = False):
+        self.path = path
+        self.tmp_path = path.rstrip("/") + ".tmp"
+        self.normalize = normalize
+        self.count = 0
+        self.dim = None
+
+        if os.path.exists(self.tmp_path):
+            shutil.rmtree(self.tmp_path)
+        os.makedirs(self.tmp_path)
+
+        self._vectors = open(os.path.join(self.tmp_path, VECTORS), "wb")
+        self._blobs = {c: open(os.path.join(self.tmp_path, f"{c}.bin"), "wb") for c in COLUMNS}
+        self._offsets = {c: [0] for c in COLUMNS}
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write_string(self, column: str, value: str):
+        data = value.encode("utf-8")
+        self._blobs[column].write(data)
+        self._offsets[column].append(self._offsets[column][-1] + len(data))
+
+    def append(self, id: str, embedding, text: str = "", metadata: dict = None):
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        if self.dim is None:
+            self.dim = vec.shape[0]
+        elif vec.shape[0] != self.dim:
+            raise ValueError(f"Embedding for {id} has dim {vec.shape[0]}, expected {self.dim}")
+        if self.normalize:
+            norm = np.linalg.norm(vec)
+            if norm:
+                vec = vec / norm
+
+        self._vectors.write(vec.tobytes())
+        self._write_string("ids", id)
+        self._write_string("texts", text or "")
+        self._write_string("meta", json.dumps(metadata) if metadata else "")
+        self.count += 1
+
+    def append_record(self, record: dict):
+        """Append one JSONL-style {id, embedding, text, metadata} record."""
+        self.append(record["id"], record["embedding"], record.get("text", ""), record.get("metadata"))
+
+    def close(self):
+        if self._closed:
+            return
+        self._vectors.close()
+        for column in COLUMNS:
+            self._blobs[column].close()
+            np.asarray(self._offsets[column], dtype=np.int64).tofile(
+                os.path.join(self.tmp_path, f"{column}.idx")
+            )
+
+        manifest = {
+            "format": FORMAT_VERSION,
+            "count": self.count,
+            "dim": self.dim or 0,
+            "dtype": "float32",
+            "normalized": self.normalize,
+        }
+        with open(os.path.join(self.tmp_path, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.replace(self.tmp_path, self.path)
+        self._closed = True
+
+    def abort(self):
+        """Discard everything written so far."""
+        if self._closed:
+            return
+        self._vectors.close()
+        for blob in self._blobs.values():
+            blob.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        self._closed = True
+
+
+# -----------------------------------------------------------
+# FUNCTION: Convert JSONL → binary store
+# -----------------------------------------------------------
+def convert_jsonl(jsonl_path: str, store_path: str, normalize: bool = False) -> int:
+    """
+    Convert an embeddings JSONL file (scripts/embed_chunks_bedrock.py
+    output) into a binary store. Streams line by line; returns the
+    number of records written.
+    """
+    with EmbeddingStoreWriter(store_path, normalize=normalize) as writer, \
+         open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                writer.append_record(json.loads(line))
+    return writer.count
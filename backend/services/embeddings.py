@@ -1,23 +1,49 @@
-import os
 import json                     # <-- make sure this is imported here, at the top
-import boto3
-from botocore.exceptions import ClientError
-from dotenv import load_dotenv
+from array import array
+from backend.config.settings import (
+    EMBED_CACHE_SIZE,
+    EMBED_CACHE_TTL_SECONDS,
+    EMBED_CACHE_DB,
+)
+from backend.services.cache import TTLCache, SqliteCache
+from backend.services.aws_clients import bedrock_runtime
+
+EMBED_MODEL_ID = "amazon.titan-embed-text-v1"
 
 # -----------------------------------------------------------
-# LOAD ENVIRONMENT VARIABLES
+# BEDROCK CLIENT (shared, created on first use; tests may assign a fake)
 # -----------------------------------------------------------
-load_dotenv()
+bedrock = None
+
 
-BEDROCK_REGION = os.getenv("BEDROCK_REGION", "us-east-1")
+def _bedrock():
+    return bedrock if bedrock is not None else bedrock_runtime()
 
 # -----------------------------------------------------------
-# CREATE BEDROCK CLIENT
+# QUERY EMBEDDING CACHE
 # -----------------------------------------------------------
-bedrock = boto3.client(
-    service_name="bedrock-runtime",
-    region_name=BEDROCK_REGION
-)
+# Memory tier: bounded LRU with TTL, per process.
+# Disk tier (optional): SQLite file, survives warm Lambda invocations
+# and local restarts. Vectors are stored as packed float32.
+_query_cache = TTLCache(max_size=EMBED_CACHE_SIZE, ttl_seconds=EMBED_CACHE_TTL_SECONDS)
+_disk_cache = SqliteCache(EMBED_CACHE_DB, ttl_seconds=EMBED_CACHE_TTL_SECONDS) if EMBED_CACHE_DB else None
+
+
+def normalize_query(query_text: str) -> str:
+    """Cache key normalisation: lowercase and collapse whitespace."""
+    return " ".join(query_text.lower().split())
+
+
+def _cache_key(query_text: str) -> str:
+    return f"{EMBED_MODEL_ID}:{normalize_query(query_text)}"
+
+
+def embedding_cache_stats() -> dict:
+    """Hit/miss counters for both cache tiers."""
+    return {
+        "memory": _query_cache.stats(),
+        "disk": _disk_cache.stats() if _disk_cache else None,
+    }
 
 # -----------------------------------------------------------
 # FUNCTION: Get Titan Embedding Vector
@@ -26,11 +52,40 @@ def get_query_embedding(query_text: str):
     """
     Generate an embedding vector for a query using the
     Amazon Titan Embeddings model (via Bedrock Runtime).
+    Repeated queries are served from the embedding cache.
     Returns a list of floats.
     """
+    key = _cache_key(query_text)
+
+    cached = _query_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    if _disk_cache is not None:
+        packed = _disk_cache.get(key)
+        if packed is not None:
+            embedding = array("f", packed).tolist()
+            _query_cache.set(key, tuple(embedding))
+            return embedding
+
+    embedding = _invoke_embedding_model(query_text)
+
+    if embedding:
+        _query_cache.set(key, tuple(embedding))
+        if _disk_cache is not None:
+            try:
+                _disk_cache.set(key, array("f", embedding).tobytes())
+            except Exception as e:
+                print(f"[WARN] Could not write embedding to disk cache: {e}")
+
+    return embedding
+
+
+def _invoke_embedding_model(query_text: str):
+    """Call Titan Embeddings on Bedrock (no caching)."""
     try:
-        response = bedrock.invoke_model(
-            modelId="amazon.titan-embed-text-v1",
+        response = _bedrock().invoke_model(
+            modelId=EMBED_MODEL_ID,
             body=json.dumps({"inputText": query_text}),  # uses the imported json
             accept="application/json",
             contentType="application/json"
@@ -42,9 +97,10 @@ def get_query_embedding(query_text: str):
 
         return embedding
 
-    except ClientError as e:
-        print(f"[ERROR] AWS Client error while generating embedding: {e}")
-        raise
     except Exception as e:
-        print(f"[ERROR] Unexpected error in get_query_embedding(): {e}")
+        # botocore is not imported here: match ClientError by name
+        if type(e).__name__ == "ClientError":
+            print(f"[ERROR] AWS Client error while generating embedding: {e}")
+        else:
+            print(f"[ERROR] Unexpected error in get_query_embedding(): {e}")
         raise
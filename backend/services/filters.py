@@ -0,0 +1,271 @@
+import re
+import json
+import threading
+import numpy as np
+
+# -----------------------------------------------------------
+# METADATA FILTERS
+# -----------------------------------------------------------
+# Chunk metadata carries the CSV columns (Model, Year, Region, ...), so
+# constraints spelled out in a question — "hybrid BMWs in Europe in
+# 2020" — can shrink the search space before anything is scored.
+#
+# Filters use Pinecone's metadata filter syntax, so the same dict is
+# passed straight to index.query(filter=...) or evaluated locally:
+#
+#     {"Fuel_Type": {"$eq": "Hybrid"}, "Region": {"$eq": "Europe"}, "Year": {"$eq": 2020}}
+#
+# Locally, MetadataMasks precomputes one boolean bitmap per value of each
+# low-cardinality field; a filter is a few ANDs / ORs of those bitmaps.
+
+# Values recognised in questions (the BMW sales dataset's categories)
+FILTER_VALUES = {
+    "Model": ["3 Series", "5 Series", "7 Series", "M3", "M5", "X1", "X3", "X5", "X6", "i3", "i8"],
+    "Region": ["Africa", "Asia", "Europe", "Middle East", "North America", "South America"],
+    "Fuel_Type": ["Diesel", "Electric", "Hybrid", "Petrol"],
+    "Color": ["Black", "Blue", "Grey", "Red", "Silver", "White"],
+    "Transmission": ["Automatic", "Manual"],
+    "Sales_Classification": ["High", "Low"],
+}
+
+# Fields only filtered on when the question names them ("High" alone is
+# too common a word)
+EXPLICIT_FIELDS = {"Sales_Classification": ("classification", "classified")}
+
+YEAR_FIELD = "Year"
+
+# Fields with at most this many distinct values get precomputed bitmaps
+MAX_BITMAP_VALUES = 64
+
+_YEAR = r"(19[89]\d|20[0-4]\d)"
+_YEAR_RANGE = [
+    (re.compile(rf"\b(?:between|from) {_YEAR} (?:and|to|until|-) {_YEAR}\b"), "range"),
+    (re.compile(rf"\b{_YEAR} ?(?:-|to|through) ?{_YEAR}\b"), "range"),
+    (re.compile(rf"\b(?:after|later than|newer than) {_YEAR}\b"), "$gt"),
+    (re.compile(rf"\b(?:since|from|starting) {_YEAR}\b"), "$gte"),
+    (re.compile(rf"\b(?:before|earlier than|older than|prior to) {_YEAR}\b"), "$lt"),
+    (re.compile(rf"\b(?:until|through|up to) {_YEAR}\b"), "$lte"),
+]
+
+
+# -----------------------------------------------------------
+# PARSING: question → filter dict
+# -----------------------------------------------------------
+def _value_pattern(value: str):
+    # Case-insensitive, whole words, optional plural ("hybrids", "X5s")
+    words = r"[\s_-]+".join(re.escape(w) for w in value.lower().split())
+    return re.compile(rf"(?<![a-z0-9.]){words}s?(?![a-z0-9])")
+
+
+_PATTERNS = {}
+
+
+def _patterns(vocabulary):
+    key = id(vocabulary)
+    if key not in _PATTERNS:
+        # Longest values first so "North America" wins over a shorter overlap
+        pairs = [(f, v) for f, values in vocabulary.items() for v in values]
+        pairs.sort(key=lambda p: -len(p[1]))
+        _PATTERNS[key] = (vocabulary, [(f, v, _value_pattern(v)) for f, v in pairs])
+    return _PATTERNS[key][1]
+
+
+def _parse_years(text: str):
+    for pattern, op in _YEAR_RANGE:
+        found = pattern.search(text)
+        if found:
+            if op == "range":
+                low, high = sorted(int(y) for y in found.groups())
+                return {"$gte": low, "$lte": high}
+            return {op: int(found.group(1))}
+    years = sorted({int(y) for y in re.findall(rf"\b{_YEAR}\b", text)})
+    if len(years) == 1:
+        return {"$eq": years[0]}
+    if years:
+        return {"$in": years}
+    return None
+
+
+def parse_filters(query: str, vocabulary: dict = None) -> dict:
+    """
+    Metadata filter for the constraints named in `query`, or {} if there
+    are none. Several values of one field become "$in" (X5 or X6), a
+    single value "$eq"; years also understand ranges ("since 2018",
+    "2015-2018", "before 2015").
+    """
+    vocabulary = FILTER_VALUES if vocabulary is None else vocabulary
+    text = query.lower()
+    found = {}
+    for field, value, pattern in _patterns(vocabulary):
+        required = EXPLICIT_FIELDS.get(field)
+        if required and not any(word in text for word in required):
+            continue
+        if pattern.search(text):
+            found.setdefault(field, []).append(value)
+            text = pattern.sub(" ", text)
+
+    flt = {}
+    for field, values in found.items():
+        flt[field] = {"$eq": values[0]} if len(values) == 1 else {"$in": sorted(values)}
+    years = _parse_years(text)
+    if years:
+        flt[YEAR_FIELD] = years
+    return flt
+
+
+def filter_key(flt: dict) -> str:
+    """Stable string form of a filter (cache keys, logs)."""
+    return json.dumps(flt, sort_keys=True) if flt else ""
+
+
+def describe_filter(flt: dict) -> str:
+    """Human-readable form, e.g. 'Region = Europe; Year >= 2018'."""
+    symbols = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+    parts = []
+    for field, condition in flt.items():
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, value in condition.items():
+            if op in ("$in", "$nin"):
+                joined = " or ".join(str(v) for v in value)
+                parts.append(f"{field} {'in' if op == '$in' else 'not in'} {joined}")
+            else:
+                parts.append(f"{field} {symbols.get(op, op)} {value}")
+    return "; ".join(parts)
+
+
+# -----------------------------------------------------------
+# LOCAL EVALUATION: precomputed bitmaps per field value
+# -----------------------------------------------------------
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool)
+
+
+class MetadataMasks:
+    """
+    Column-wise copy of per-row metadata for evaluating filters as
+    boolean masks. Numeric fields are float arrays (NaN = missing),
+    everything else object arrays of str.
+    """
+
+    def __init__(self, columns: dict, n_rows: int):
+        self.columns = columns
+        self.n_rows = n_rows
+        self.bitmaps = {}
+        for field, column in columns.items():
+            values = np.unique(column[column == column]) if column.dtype != object else set(column)
+            if len(values) <= MAX_BITMAP_VALUES:
+                self.bitmaps[field] = {v: column == v for v in values}
+
+    def __len__(self):
+        return self.n_rows
+
+    @classmethod
+    def from_records(cls, metadatas):
+        """Build from a list of metadata dicts (missing fields allowed)."""
+        metadatas = [m or {} for m in metadatas]
+        fields = sorted({f for m in metadatas for f in m})
+        columns = {}
+        for field in fields:
+            values = [m.get(field) for m in metadatas]
+            if all(v is None or _is_number(v) for v in values):
+                columns[field] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+            elif all(v is None or isinstance(v, str) for v in values):
+                columns[field] = np.array(["" if v is None else v for v in values], dtype=object)
+        return cls(columns, len(metadatas))
+
+    def _equals(self, field, value):
+        column = self.columns[field]
+        if column.dtype == object:
+            value = str(int(value)) if _is_number(value) and float(value).is_integer() else str(value)
+        elif not _is_number(value):
+            try:
+                value = float(value)
+            except ValueError:
+                return np.zeros(self.n_rows, dtype=bool)
+        bitmap = self.bitmaps.get(field, {}).get(value)
+        return bitmap if bitmap is not None else column == value
+
+    def _condition(self, field, condition):
+        if field not in self.columns:
+            return np.zeros(self.n_rows, dtype=bool)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        column = self.columns[field]
+        mask = np.ones(self.n_rows, dtype=bool)
+        for op, value in condition.items():
+            if op == "$eq":
+                mask &= self._equals(field, value)
+            elif op == "$ne":
+                mask &= ~self._equals(field, value)
+            elif op in ("$in", "$nin"):
+                hit = np.zeros(self.n_rows, dtype=bool)
+                for v in value:
+                    hit |= self._equals(field, v)
+                mask &= hit if op == "$in" else ~hit
+            elif op in ("$gt", "$gte", "$lt", "$lte") and column.dtype != object:
+                compare = {"$gt": np.greater, "$gte": np.greater_equal,
+                           "$lt": np.less, "$lte": np.less_equal}[op]
+                mask &= compare(column, value)
+            else:
+                raise ValueError(f"Unsupported filter operator {op} on {field}")
+        return mask
+
+    def mask(self, flt: dict):
+        """Boolean row mask for a Pinecone-style filter (None for no filter)."""
+        if not flt:
+            return None
+        mask = np.ones(self.n_rows, dtype=bool)
+        for field, condition in flt.items():
+            if field == "$and":
+                for sub in condition:
+                    mask &= self.mask(sub)
+            elif field == "$or":
+                hit = np.zeros(self.n_rows, dtype=bool)
+                for sub in condition:
+                    hit |= self.mask(sub)
+                mask &= hit
+            else:
+                mask &= self._condition(field, condition)
+        return mask
+
+
+class LazyMetadataMasks:
+    """
+    MetadataMasks built on the first filtered query. Decoding per-row
+    metadata and building bitmaps costs far more than opening a
+    memory-mapped store, and unfiltered searches never need them.
+
+    `metadata` is a list of dicts, a zero-argument callable returning
+    one (e.g. decoding a store's metadata column), or None.
+    """
+
+    def __init__(self, metadata, n_rows: int):
+        self._metadata = metadata
+        self.n_rows = n_rows
+        self._masks = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def built(self) -> bool:
+        return self._masks is not None
+
+    def get(self) -> MetadataMasks:
+        if self._masks is None:
+            with self._lock:
+                if self._masks is None:
+                    metadata = self._metadata() if callable(self._metadata) else self._metadata
+                    self._masks = MetadataMasks.from_records(
+                        metadata if metadata is not None else [{}] * self.n_rows
+                    )
+                    self._metadata = None
+        return self._masks
+
+    def mask(self, flt: dict):
+        """Boolean row mask for a Pinecone-style filter (None for no filter)."""
+        if not flt:
+            return None
+        return self.get().mask(flt)
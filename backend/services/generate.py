@@ -1,19 +1,25 @@
-import os
 import json
-import boto3
-from dotenv import load_dotenv
-from backend.config.settings import BEDROCK_REGION
+from backend.services.prompts import render_prompt
+from backend.services.aws_clients import bedrock_runtime
 
 
 
 
 # -----------------------------------------------------------
-# INITIALIZE BEDROCK CLIENT
+# BEDROCK CLIENT (shared with embeddings.py, created on first use)
 # -----------------------------------------------------------
-bedrock = boto3.client(
-    service_name="bedrock-runtime",
-    region_name=BEDROCK_REGION
-)
+bedrock = None
+
+
+def _bedrock():
+    return bedrock if bedrock is not None else bedrock_runtime()
+
+# -----------------------------------------------------------
+# FUNCTION: Build RAG Prompt
+# -----------------------------------------------------------
+def build_prompt(question: str, context: str, model_id: str = None) -> str:
+    """Inject context and question into the (cached) RAG prompt template."""
+    return render_prompt(question, context, model_id=model_id)
 
 # -----------------------------------------------------------
 # FUNCTION: Generate Grounded Answer
@@ -24,23 +30,13 @@ def generate_answer(model_id: str, question: str, context: str) -> str:
     to generate a grounded answer based on retrieved context.
     """
 
-    # Load RAG prompt template
-    template_path = os.path.join("backend", "prompts", "rag_template.txt")
-    with open(template_path, "r") as f:
-        prompt_template = f.read()
-
-    # Inject context and question into the template
-    prompt = (
-        prompt_template
-        .replace("{{CONTEXT}}", context)
-        .replace("{{QUESTION}}", question)
-    )
+    prompt = build_prompt(question, context, model_id=model_id)
 
     # Prepare model-specific payload
     body = build_request_body(model_id, prompt)
 
     try:
-        response = bedrock.invoke_model(
+        response = _bedrock().invoke_model(
             modelId=model_id,
             body=json.dumps(body),
             accept="application/json",
@@ -105,6 +101,77 @@ def generate_answer(model_id: str, question: str, context: str) -> str:
         raise
 
 
+# -----------------------------------------------------------
+# FUNCTION: Stream Grounded Answer (Bedrock response streaming)
+# -----------------------------------------------------------
+def stream_answer(model_id: str, question: str, context: str):
+    """
+    Same as generate_answer(), but yields text fragments as Bedrock
+    produces them (invoke_model_with_response_stream).
+    """
+    prompt = build_prompt(question, context, model_id=model_id)
+    body = build_request_body(model_id, prompt)
+
+    try:
+        response = _bedrock().invoke_model_with_response_stream(
+            modelId=model_id,
+            body=json.dumps(body),
+            accept="application/json",
+            contentType="application/json"
+        )
+
+        for event in response["body"]:
+            chunk = event.get("chunk")
+            if not chunk:
+                continue
+            text = parse_stream_chunk(json.loads(chunk["bytes"]))
+            if text:
+                yield text
+
+    except Exception as e:
+        print(f"[ERROR] Bedrock streaming generation failed: {e}")
+        raise
+
+
+def parse_stream_chunk(payload: dict) -> str:
+    """
+    Extract the text delta from one streamed chunk. Each model family
+    streams a different shape (mirrors build_request_body):
+
+      Claude 3 (Messages API) → {"type": "content_block_delta", "delta": {"text": ...}}
+      Titan Text              → {"outputText": ...}
+      Mistral                 → {"outputs": [{"text": ...}]}
+      DeepSeek / others       → {"generation": ...} | {"choices": [{"text": ...}]} | {"completion": ...}
+    """
+    if not isinstance(payload, dict):
+        return ""
+
+    # Claude event stream: only content_block_delta carries text;
+    # message_start / message_delta / message_stop etc. are bookkeeping
+    if "type" in payload:
+        if payload["type"] == "content_block_delta":
+            return payload.get("delta", {}).get("text", "")
+        return ""
+
+    if "outputText" in payload:
+        return payload["outputText"] or ""
+
+    if "outputs" in payload:
+        out = payload["outputs"]
+        if isinstance(out, list) and out:
+            return out[0].get("text", "") or ""
+
+    if "choices" in payload:
+        out = payload["choices"]
+        if isinstance(out, list) and out:
+            return out[0].get("text", "") or ""
+
+    for key in ("generation", "completion"):
+        if key in payload:
+            return payload[key] or ""
+
+    return ""
+
 # -----------------------------------------------------------
 # FUNCTION: Build Request Body for Model Families
 # -----------------------------------------------------------
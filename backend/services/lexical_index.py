@@ -0,0 +1,176 @@
+import re
+import json
+from array import array
+import numpy as np
+from backend.services.filters import LazyMetadataMasks
+
+# -----------------------------------------------------------
+# IN-MEMORY BM25 INDEX
+# -----------------------------------------------------------
+# Chunk texts are "Field: value; Field: value; ..." rows, so exact terms
+# (model names, years, regions) identify rows precisely. Postings are
+# stored CSR-style in flat NumPy arrays: the postings of term t are
+# doc_ids[offsets[t]:offsets[t + 1]], with their precomputed BM25 impact
+# (idf * saturated tf) in the parallel `impacts` array. A query is a few
+# vectorised scatter-adds, no per-posting Python work.
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Keeps "2.5" (engine size) and "x5" / "i8" intact
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+# Dropped from queries only; chunk texts have no prose
+STOPWORDS = frozenset(
+    "a an and are at by for from how in is of on or the to was were what with".split()
+)
+
+
+def tokenize(text: str):
+    return _TOKEN.findall(text.lower())
+
+
+def query_terms(query: str):
+    """Distinct query tokens in order, without stopwords."""
+    seen = []
+    for token in tokenize(query):
+        if token not in STOPWORDS and token not in seen:
+            seen.append(token)
+    return seen
+
+
+class BM25Index:
+    def __init__(self, ids, texts, vocab, offsets, doc_ids, impacts, metadata=None):
+        self.ids = ids
+        self.texts = texts
+        self.vocab = vocab            # term → term id
+        self.offsets = offsets        # int64, len(vocab) + 1
+        self.doc_ids = doc_ids        # int32, postings grouped by term
+        self.impacts = impacts        # float32, BM25 weight per posting
+        self.masks = LazyMetadataMasks(metadata, len(ids))   # built on the first filtered search
+
+    def __len__(self):
+        return len(self.ids)
+
+    # -------------------------------------------------------
+    # BUILD
+    # -------------------------------------------------------
+    @classmethod
+    def build(cls, ids, texts, k1: float = BM25_K1, b: float = BM25_B, metadata=None):
+        vocab = {}
+        post_terms, post_docs, post_tfs = array("i"), array("i"), array("f")
+        doc_len = np.zeros(len(texts), dtype=np.float32)
+
+        for doc, text in enumerate(texts):
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            doc_len[doc] = sum(counts.values())
+            for token, tf in counts.items():
+                term = vocab.setdefault(token, len(vocab))
+                post_terms.append(term)
+                post_docs.append(doc)
+                post_tfs.append(tf)
+
+        terms = np.frombuffer(post_terms, dtype=np.int32)
+        docs = np.frombuffer(post_docs, dtype=np.int32)
+        tfs = np.frombuffer(post_tfs, dtype=np.float32)
+
+        # Group postings by term (stable: doc order kept within a term)
+        order = np.argsort(terms, kind="stable")
+        terms, docs, tfs = terms[order], docs[order], tfs[order]
+        df = np.bincount(terms, minlength=len(vocab))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+
+        n = max(len(texts), 1)
+        idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = float(doc_len.mean()) if len(texts) else 1.0
+        norm = k1 * (1.0 - b + b * doc_len[docs] / avgdl)
+        impacts = (idf[terms] * tfs * (k1 + 1.0) / (tfs + norm)).astype(np.float32)
+
+        return cls(list(ids), list(texts), vocab, offsets, np.ascontiguousarray(docs), impacts, metadata=metadata)
+
+    @classmethod
+    def from_jsonl(cls, path: str):
+        """Build from a chunks (or embeddings) JSONL file with id/text(/metadata) fields."""
+        ids, texts, metadatas = [], [], []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    ids.append(record["id"])
+                    texts.append(record["text"])
+                    metadatas.append(record.get("metadata") or {})
+        return cls.build(ids, texts, metadata=metadatas)
+
+    # -------------------------------------------------------
+    # QUERY
+    # -------------------------------------------------------
+    def _postings(self, term_id):
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.impacts[start:end]
+
+    def search(self, query: str, top_k: int = 5, require_all: bool = False, metadata_filter: dict = None):
+        """
+        Top-k chunks by BM25 score as {'id', 'score', 'text', 'matched'}
+        dicts, where 'matched' is how many query terms the chunk contains.
+        With require_all, only chunks containing every query term qualify;
+        with metadata_filter, only chunks whose metadata matches it.
+        """
+        terms = [self.vocab.get(t) for t in query_terms(query)]
+        known = [t for t in terms if t is not None]
+        if not known or top_k <= 0 or (require_all and len(known) < len(terms)):
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        matched = np.zeros(len(self.ids), dtype=np.int16)
+        for term_id in known:
+            docs, impacts = self._postings(term_id)
+            scores[docs] += impacts       # doc ids are unique within a term
+            matched[docs] += 1
+
+        if require_all:
+            scores[matched < len(known)] = 0.0
+        mask = self.masks.mask(metadata_filter)
+        if mask is not None:
+            scores[~mask] = 0.0
+        candidates = np.flatnonzero(scores)
+        if candidates.size == 0:
+            return []
+
+        top_k = min(top_k, candidates.size)
+        cand_scores = scores[candidates]
+        part = np.argpartition(-cand_scores, top_k - 1)[:top_k]
+        best = candidates[part[np.argsort(-cand_scores[part], kind="stable")]]
+
+        return [
+            {
+                "id": self.ids[i],
+                "score": round(float(scores[i]), 4),
+                "text": self.texts[i],
+                "matched": int(matched[i]),
+            }
+            for i in best
+        ]
+
+
+# -----------------------------------------------------------
+# RECIPROCAL-RANK FUSION
+# -----------------------------------------------------------
+def rrf_fuse(result_lists, top_k: int = 5, k: int = 60):
+    """
+    Merge ranked match lists: score(d) = sum over lists of 1 / (k + rank).
+    Rank-based, so BM25 and cosine scores need no calibration.
+    """
+    fused, first_seen = {}, {}
+    for results in result_lists:
+        for rank, match in enumerate(results, start=1):
+            fused[match["id"]] = fused.get(match["id"], 0.0) + 1.0 / (k + rank)
+            first_seen.setdefault(match["id"], match)
+
+    best = sorted(fused, key=lambda i: fused[i], reverse=True)[:top_k]
+    return [
+        {"id": i, "score": round(fused[i], 6), "text": first_seen[i]["text"]}
+        for i in best
+    ]
@@ -0,0 +1,237 @@
+import json
+import numpy as np
+from backend.services.embedding_store import EmbeddingStore, is_store
+from backend.services.filters import LazyMetadataMasks
+
+# -----------------------------------------------------------
+# IN-PROCESS VECTOR INDEX (exact cosine search with NumPy)
+# -----------------------------------------------------------
+# The whole BMW corpus fits comfortably in memory, so instead of a
+# network round trip to Pinecone we keep one contiguous float32 matrix
+# of L2-normalised vectors and score queries with a single matmul.
+
+# Rows of the corpus matrix scored per matmul block. Bounds the size of
+# the temporary (queries x rows) score matrix for large batches.
+SCORE_BLOCK_ROWS = 65536
+
+# A metadata filter keeping at most this fraction of rows is searched by
+# gathering just those rows; broader filters score everything and mask.
+GATHER_MAX_FRACTION = 0.25
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Return a C-contiguous float32 copy of `matrix` with unit-length rows.
+    Zero rows are left as zeros instead of producing NaNs.
+    """
+    matrix = np.array(matrix, dtype=np.float32, copy=True, order="C")
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Partial sort: indices of the `top_k` highest scores in each row,
+    ordered best first. Uses argpartition so cost is O(n) per row
+    rather than a full O(n log n) sort.
+    """
+    n = scores.shape[1]
+    top_k = min(top_k, n)
+    if top_k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if top_k < n:
+        part = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    else:
+        part = np.tile(np.arange(n), (scores.shape[0], 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+def load_embeddings_jsonl(path: str, with_metadata: bool = False):
+    """
+    Read an embeddings JSONL file into (ids, float32 matrix, texts), plus
+    a list of metadata dicts when with_metadata is set.
+    """
+    ids, vectors, texts, metadatas = [], [], [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            ids.append(record["id"])
+            vectors.append(record["embedding"])
+            texts.append(record.get("text", ""))
+            metadatas.append(record.get("metadata") or {})
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2:
+        raise ValueError(f"No embeddings found in {path}")
+    if with_metadata:
+        return ids, matrix, texts, metadatas
+    return ids, matrix, texts
+
+
+def load_embeddings(path: str, with_metadata: bool = False):
+    """
+    Read (ids, float32 matrix, texts[, metadatas]) from either a binary
+    embedding store directory or an embeddings JSONL file.
+    """
+    if is_store(path):
+        store = EmbeddingStore.open(path)
+        loaded = store.ids.tolist(), np.asarray(store.vectors), store.texts.tolist()
+        if with_metadata:
+            return (*loaded, [store.metadata(i) for i in range(len(store))])
+        return loaded
+    return load_embeddings_jsonl(path, with_metadata=with_metadata)
+
+
+class LocalVectorIndex:
+    """
+    Exact cosine-similarity index held in process memory.
+
+    Vectors are normalised once at load time, so scoring a batch of
+    queries is a single (queries x dim) @ (dim x rows) matrix multiply
+    followed by a partial sort for the top-k.
+
+    Pass normalized=True for vectors that are already unit length (e.g.
+    a store written with normalize=True); the array — possibly a
+    read-only memmap — is then used as is, without a copy.
+
+    Per-row `metadata` dicts (or a callable returning them) enable
+    metadata_filter in search(); rows without metadata never match a
+    filter. Filter masks are built on the first filtered search.
+    """
+
+    def __init__(self, ids, vectors, texts, normalized: bool = False, metadata=None):
+        # Any sized, indexable sequence works (lists or store StringColumns)
+        self.ids = ids if hasattr(ids, "__getitem__") and hasattr(ids, "__len__") else list(ids)
+        self.texts = texts if hasattr(texts, "__getitem__") and hasattr(texts, "__len__") else list(texts)
+        if normalized and isinstance(vectors, np.ndarray) and vectors.dtype == np.float32 \
+                and vectors.flags["C_CONTIGUOUS"]:
+            self.matrix = vectors
+        else:
+            self.matrix = normalize_rows(vectors)
+
+        if not (len(self.ids) == len(self.texts) == self.matrix.shape[0]):
+            raise ValueError("ids, vectors and texts must have the same length")
+        self.masks = LazyMetadataMasks(metadata, len(self.ids))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    # -------------------------------------------------------
+    # LOADING
+    # -------------------------------------------------------
+    @classmethod
+    def from_jsonl(cls, path: str) -> "LocalVectorIndex":
+        """
+        Build the index from the JSONL written by
+        scripts/embed_chunks_bedrock.py (one {id, embedding, text} per line).
+        """
+        ids, matrix, texts, metadatas = load_embeddings_jsonl(path, with_metadata=True)
+        return cls(ids, matrix, texts, metadata=metadatas)
+
+    @classmethod
+    def from_store(cls, path: str) -> "LocalVectorIndex":
+        """
+        Open a binary embedding store (backend/services/embedding_store.py).
+        Vectors stay memory-mapped when the store was written normalised;
+        the metadata column is only decoded for the first filtered search.
+        """
+        store = EmbeddingStore.open(path)
+        metadata = lambda: [store.metadata(i) for i in range(len(store))]
+        return cls(store.ids, store.vectors, store.texts, normalized=store.normalized, metadata=metadata)
+
+    @classmethod
+    def from_path(cls, path: str) -> "LocalVectorIndex":
+        """Load from a store directory or an embeddings JSONL file."""
+        return cls.from_store(path) if is_store(path) else cls.from_jsonl(path)
+
+    # -------------------------------------------------------
+    # SEARCH
+    # -------------------------------------------------------
+    def search(self, query_vectors, top_k: int = 5, metadata_filter: dict = None):
+        """
+        Score a batch of query vectors against the whole corpus, or only
+        the rows whose metadata matches `metadata_filter` (Pinecone syntax).
+
+        Returns:
+            One list per query of {'id', 'score', 'text'} dicts, best first.
+        """
+        queries = normalize_rows(query_vectors)
+        if queries.shape[1] != self.dim:
+            raise ValueError(
+                f"Query dimension {queries.shape[1]} does not match index dimension {self.dim}"
+            )
+
+        best_idx, best_scores = self._search_arrays(queries, top_k, self.masks.mask(metadata_filter))
+
+        results = []
+        for row_idx, row_scores in zip(best_idx, best_scores):
+            results.append([
+                {
+                    "id": self.ids[i],
+                    "score": round(float(s), 4),
+                    "text": self.texts[i],
+                }
+                for i, s in zip(row_idx, row_scores)
+                if s > -np.inf
+            ])
+        return results
+
+    def query(self, query_vector, top_k: int = 5, metadata_filter: dict = None):
+        """Single-query convenience wrapper around search()."""
+        return self.search([query_vector], top_k=top_k, metadata_filter=metadata_filter)[0]
+
+    def _search_arrays(self, queries: np.ndarray, top_k: int, mask: np.ndarray = None):
+        """Blocked matmul + partial sort; returns (indices, scores) arrays."""
+        if mask is None:
+            return self._scan(queries, top_k)
+
+        rows = np.flatnonzero(mask)
+        if rows.size <= len(self) * GATHER_MAX_FRACTION:
+            # Selective filter: score only the matching rows
+            idx, scores = self._scan(queries, top_k, rows=rows)
+            return rows[idx], scores
+        return self._scan(queries, top_k, mask=mask)
+
+    def _scan(self, queries: np.ndarray, top_k: int, rows: np.ndarray = None, mask: np.ndarray = None):
+        """
+        Running top-k across row blocks of the matrix (or of matrix[rows]).
+        Rows outside `mask` score -inf.
+        """
+        n = len(self) if rows is None else rows.size
+        top_k = min(top_k, n)
+        cand_idx, cand_scores = [], []
+        for start in range(0, n, SCORE_BLOCK_ROWS):
+            stop = start + SCORE_BLOCK_ROWS
+            block = self.matrix[start:stop] if rows is None else self.matrix[rows[start:stop]]
+            scores = queries @ block.T
+            if mask is not None:
+                scores[:, ~mask[start:stop]] = -np.inf
+            idx = top_k_indices(scores, top_k)
+            cand_idx.append(idx + start)
+            cand_scores.append(np.take_along_axis(scores, idx, axis=1))
+
+        if len(cand_idx) <= 1:
+            if not cand_idx:
+                empty = np.empty((queries.shape[0], 0))
+                return empty.astype(np.int64), empty.astype(np.float32)
+            return cand_idx[0], cand_scores[0]
+
+        all_idx = np.concatenate(cand_idx, axis=1)
+        all_scores = np.concatenate(cand_scores, axis=1)
+        order = top_k_indices(all_scores, top_k)
+        return (
+            np.take_along_axis(all_idx, order, axis=1),
+            np.take_along_axis(all_scores, order, axis=1),
+        )
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from backend.config.settings import (
+    LOG_FILE,
+    LOG_ECHO_STDOUT,
+    LOG_QUEUE_SIZE,
+    LOG_BATCH_SIZE,
+    LOG_FLUSH_SECONDS,
+    LOG_ROTATE_BYTES,
+    LOG_ROTATE_SECONDS,
+)
+from backend.services.metrics import metrics
+
+# -----------------------------------------------------------
+# REQUEST LOG SINK (bounded queue, background batched writer)
+# -----------------------------------------------------------
+# write() only appends the entry dict to a bounded queue, so the request
+# path never serialises JSON or touches the filesystem. A daemon thread
+# drains up to LOG_BATCH_SIZE entries at a time, serialises them and
+# appends them to LOG_FILE with one write on a file handle kept open.
+# When the queue is full, entries are dropped and counted rather than
+# slowing requests down.
+#
+# The file is rotated to requests.<UTC timestamp>.jsonl once it exceeds
+# LOG_ROTATE_BYTES or is older than LOG_ROTATE_SECONDS;
+# scripts/compact_logs.py turns the rotated files into a columnar file.
+
+
+class RequestLogSink:
+    def __init__(self, path: str = LOG_FILE, max_queue: int = LOG_QUEUE_SIZE, batch_size: int = LOG_BATCH_SIZE,
+                 flush_interval: float = LOG_FLUSH_SECONDS, rotate_bytes: int = LOG_ROTATE_BYTES,
+                 rotate_seconds: float = LOG_ROTATE_SECONDS, echo: bool = LOG_ECHO_STDOUT):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.echo = logging.getLogger("rag.requests").info if echo else None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._write_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._file = None
+        self._opened_at = None
+        self._size = 0
+        self._failed = False
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+
+    # ---------------- request path ----------------
+    def write(self, entry: dict) -> bool:
+        """Queue one log entry; False (and counted) if the queue is full."""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._thread_lock:
+                self.dropped += 1
+            metrics.increment("request_log_dropped")
+            return False
+        self._ensure_thread()
+        return True
+
+    # ---------------- writer ----------------
+    def _ensure_thread(self):
+        if self._thread is not None or self.flush_interval <= 0:
+            return
+        with self._thread_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="rag-request-log", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._maybe_rotate(0)     # age-based rotation of an idle file
+                continue
+            self._write_batch(first)
+
+    def _take(self, first=None):
+        batch = [] if first is None else [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, first=None) -> int:
+        """Write one batch; returns the number of entries taken off the queue."""
+        with self._write_lock:
+            batch = self._take(first)
+            if not batch:
+                return 0
+            lines = [json.dumps(entry, default=str) for entry in batch]
+            if self.echo is not None:
+                for line in lines:
+                    self.echo(line)
+            if self.path:
+                data = ("\n".join(lines) + "\n").encode("utf-8")
+                try:
+                    self._maybe_rotate(len(data), locked=True)
+                    self._open()
+                    self._file.write(data)
+                    self._file.flush()
+                    self._size += len(data)
+                except OSError as e:
+                    if not self._failed:
+                        print(f"[ERROR] Could not write request log {self.path}: {e}")
+                    self._failed = True
+                    with self._thread_lock:
+                        self.dropped += len(batch)
+                    metrics.increment("request_log_dropped", len(batch))
+                    return len(batch)
+            self.written += len(batch)
+            return len(batch)
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "ab")
+            self._size = self._file.tell()
+            self._opened_at = time.time()
+
+    def _maybe_rotate(self, incoming: int, locked: bool = False):
+        if not self.path:
+            return
+        if not locked:
+            with self._write_lock:
+                return self._maybe_rotate(incoming, locked=True)
+        if self._file is None:
+            if not os.path.exists(self.path):
+                return
+            self._open()
+        too_big = self.rotate_bytes > 0 and self._size > 0 and self._size + incoming > self.rotate_bytes
+        too_old = self.rotate_seconds > 0 and self._size > 0 and time.time() - self._opened_at >= self.rotate_seconds
+        if too_big or too_old:
+            self.rotate(locked=True)
+
+    def rotate(self, locked: bool = False):
+        """Move the current file aside as requests.<UTC timestamp>.jsonl; returns its path."""
+        if not locked:
+            with self._write_lock:
+                return self.rotate(locked=True)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if not self.path or not os.path.exists(self.path):
+            return None
+        base, ext = os.path.splitext(self.path)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        target = f"{base}.{stamp}{ext}"
+        os.replace(self.path, target)
+        self.rotations += 1
+        return target
+
+    # ---------------- lifecycle ----------------
+    def flush(self):
+        """Write everything queued so far (tests, shutdown)."""
+        while self._write_batch():
+            pass
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+        }
+
+
+request_log = RequestLogSink()
+atexit.register(request_log.close)
@@ -0,0 +1,177 @@
+import sys
+import json
+import time
+import atexit
+import logging
+import threading
+import contextvars
+from backend.config.settings import (
+    METRICS_ENABLED,
+    METRICS_NAMESPACE,
+    METRICS_FLUSH_SECONDS,
+)
+
+# -----------------------------------------------------------
+# BUFFERED METRICS (CloudWatch Embedded Metric Format)
+# -----------------------------------------------------------
+# Recording a sample is a dict update under a lock. Every
+# METRICS_FLUSH_SECONDS a background thread writes one EMF JSON line per
+# dimension set to stdout; CloudWatch Logs turns those lines into metrics,
+# so no put_metric_data call (or boto3 client) is ever on the request path.
+
+# EMF accepts at most 100 values per metric per document
+MAX_VALUES_PER_METRIC = 100
+
+# Dimensions (model, k) for the request being served; set once per request
+_dimensions = contextvars.ContextVar("metric_dimensions", default=None)
+
+
+def _stdout_emitter():
+    emf_logger = logging.getLogger("rag.metrics")
+    emf_logger.propagate = False     # EMF lines must be bare JSON, no log prefix
+    if not emf_logger.handlers:
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(logging.Formatter("%(message)s"))
+        emf_logger.addHandler(stream)
+    emf_logger.setLevel(logging.INFO)
+    return emf_logger.info
+
+
+class MetricsBuffer:
+    """
+    In-process metric aggregation keyed by dimension set.
+
+    record() buffers latency samples, increment() sums counters; flush()
+    emits the buffer as EMF documents through `emit` (a callable taking
+    one JSON string) and clears it.
+    """
+
+    def __init__(self, namespace: str = METRICS_NAMESPACE, flush_interval: float = METRICS_FLUSH_SECONDS,
+                 emit=None, enabled: bool = True):
+        self.namespace = namespace
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._emit = emit
+        self._buffer = {}    # dims tuple → {metric: [unit, values list | count]}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.emitted = 0
+
+    # ---------------- recording ----------------
+    def record(self, name: str, value: float, unit: str = "Milliseconds", **dims):
+        if not self.enabled:
+            return
+        key = self._key(dims)
+        full = None
+        with self._lock:
+            metrics = self._buffer.setdefault(key, {})
+            entry = metrics.get(name)
+            if entry is None:
+                entry = metrics[name] = [unit, []]
+            entry[1].append(value)
+            if len(entry[1]) >= MAX_VALUES_PER_METRIC:
+                full = self._buffer.pop(key)
+        if full is not None:
+            self._write(key, full)
+        self._ensure_thread()
+
+    def increment(self, name: str, value: int = 1, **dims):
+        if not self.enabled:
+            return
+        key = self._key(dims)
+        with self._lock:
+            metrics = self._buffer.setdefault(key, {})
+            entry = metrics.get(name)
+            if entry is None:
+                metrics[name] = ["Count", value]
+            else:
+                entry[1] += value
+        self._ensure_thread()
+
+    @staticmethod
+    def _key(dims):
+        if not dims:
+            dims = _dimensions.get() or {}
+        return tuple(sorted((k, str(v)) for k, v in dims.items() if v is not None))
+
+    # ---------------- flushing ----------------
+    def flush(self):
+        with self._lock:
+            buffer, self._buffer = self._buffer, {}
+        for key, metrics in buffer.items():
+            self._write(key, metrics)
+
+    def _write(self, key, metrics):
+        doc = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [[k for k, _ in key]] if key else [[]],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, (unit, _) in metrics.items()],
+                }],
+            },
+            **dict(key),
+        }
+        for name, (_, value) in metrics.items():
+            doc[name] = value
+        if self._emit is None:
+            self._emit = _stdout_emitter()
+        try:
+            self._emit(json.dumps(doc))
+            self.emitted += 1
+        except Exception as e:
+            print(f"[ERROR] Metrics flush failed: {e}")
+
+    def _ensure_thread(self):
+        if self._thread is not None or self.flush_interval <= 0:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="rag-metrics", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+
+metrics = MetricsBuffer(enabled=METRICS_ENABLED)
+atexit.register(metrics.close)
+
+
+# -----------------------------------------------------------
+# REQUEST HELPERS
+# -----------------------------------------------------------
+# Every distinct dimension value is a separate (billed) CloudWatch metric,
+# so k is reported as a bucket
+K_BUCKETS = ((5, "1-5"), (10, "6-10"), (20, "11-20"))
+
+
+def k_bucket(k: int) -> str:
+    for limit, label in K_BUCKETS:
+        if k <= limit:
+            return label
+    return f"{K_BUCKETS[-1][0] + 1}+"
+
+
+def set_dimensions(model: str, k: int):
+    """
+    Tag every metric recorded for the current request with model and k
+    bucket. `model` must be a validated MODEL_MAP name, not client input.
+    """
+    _dimensions.set({"Model": model, "K": k_bucket(k)})
+
+
+def record_latency(stage: str, ms: float):
+    metrics.record(f"{stage}_ms", ms)
+
+
+def record_error(stage: str):
+    metrics.increment(f"{stage}_errors")
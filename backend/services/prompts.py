@@ -0,0 +1,145 @@
+import os
+import re
+import time
+import threading
+from backend.config.settings import (
+    PROMPT_TEMPLATE_PATH,
+    MODEL_CONTEXT_TOKENS,
+    DEFAULT_CONTEXT_TOKENS,
+    PROMPT_TOKEN_BUDGET,
+    MAX_TOKENS,
+)
+
+# Relative template paths resolve against the repository root, not the CWD
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# How often (seconds) a cached template re-checks its file's mtime
+RELOAD_CHECK_SECONDS = 1.0
+
+# Rough token estimate for English/tabular text (no tokenizer dependency)
+CHARS_PER_TOKEN = 4
+
+# Don't bother keeping a trimmed match shorter than this
+MIN_TRIMMED_TOKENS = 32
+
+_PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+
+# -----------------------------------------------------------
+# COMPILED TEMPLATE
+# -----------------------------------------------------------
+class PromptTemplate:
+    """
+    A template split once into literal segments and {{FIELD}} slots,
+    so rendering is a single join instead of repeated str.replace scans.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self._parts = []    # (is_field, text)
+        pos = 0
+        for match in _PLACEHOLDER.finditer(source):
+            self._parts.append((False, source[pos:match.start()]))
+            self._parts.append((True, match.group(1)))
+            pos = match.end()
+        self._parts.append((False, source[pos:]))
+        self.fields = {text for is_field, text in self._parts if is_field}
+        self.static_tokens = estimate_tokens("".join(t for f, t in self._parts if not f))
+
+    def render(self, **values) -> str:
+        return "".join(
+            values.get(text, "{{" + text + "}}") if is_field else text
+            for is_field, text in self._parts
+        )
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def resolve_path(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(REPO_ROOT, path)
+
+
+# -----------------------------------------------------------
+# TEMPLATE CACHE (reloaded when the file changes)
+# -----------------------------------------------------------
+_templates = {}     # abs path → [template, mtime_ns, last_checked]
+_lock = threading.Lock()
+
+
+def get_template(path: str = PROMPT_TEMPLATE_PATH) -> PromptTemplate:
+    """Return the compiled template, recompiling only if the file changed."""
+    path = resolve_path(path)
+    now = time.monotonic()
+    entry = _templates.get(path)
+    if entry and now - entry[2] < RELOAD_CHECK_SECONDS:
+        return entry[0]
+
+    with _lock:
+        entry = _templates.get(path)
+        mtime = os.stat(path).st_mtime_ns
+        if entry is None or entry[1] != mtime:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = [PromptTemplate(f.read()), mtime, now]
+            _templates[path] = entry
+        else:
+            entry[2] = now
+        return entry[0]
+
+
+# -----------------------------------------------------------
+# TOKEN BUDGET
+# -----------------------------------------------------------
+def input_token_budget(model_id: str) -> int:
+    """Input tokens allowed for a Bedrock modelId (leaves room for the answer)."""
+    window = MODEL_CONTEXT_TOKENS.get(model_id, DEFAULT_CONTEXT_TOKENS)
+    return max(0, min(window - MAX_TOKENS, PROMPT_TOKEN_BUDGET))
+
+
+def _trim(text: str, tokens: int) -> str:
+    return text[:tokens * CHARS_PER_TOKEN].rstrip() + " …"
+
+
+def fit_context(texts, budget_tokens: int):
+    """
+    Keep texts (already in priority order) while they fit the budget; the
+    first one that doesn't fit is trimmed if enough room is left, and the
+    rest are dropped. Returns the kept texts.
+    """
+    kept, remaining = [], budget_tokens
+    for text in texts:
+        cost = estimate_tokens(text) + 1    # + separator
+        if cost <= remaining:
+            kept.append(text)
+            remaining -= cost
+            continue
+        if remaining - 1 >= MIN_TRIMMED_TOKENS:
+            kept.append(_trim(text, remaining - 2))
+        break
+    return kept
+
+
+def build_context(model_id: str, matches, question: str = "", path: str = PROMPT_TEMPLATE_PATH) -> str:
+    """
+    Join match texts into a context that fits the model's input budget,
+    dropping (or trimming) the lowest-scoring matches first.
+    """
+    template = get_template(path)
+    budget = input_token_budget(model_id) - template.static_tokens - estimate_tokens(question)
+    ranked = sorted(matches, key=lambda m: m.get("score") or 0.0, reverse=True)
+    return "\n".join(fit_context([m["text"] for m in ranked], budget))
+
+
+def render_prompt(question: str, context: str, model_id: str = None,
+                  path: str = PROMPT_TEMPLATE_PATH) -> str:
+    """
+    Inject context and question into the compiled template. With a
+    model_id, an oversized context string is trimmed to the budget.
+    """
+    template = get_template(path)
+    if model_id is not None:
+        budget = input_token_budget(model_id) - template.static_tokens - estimate_tokens(question)
+        if estimate_tokens(context) > budget:
+            context = "\n".join(fit_context(context.split("\n"), budget))
+    return template.render(CONTEXT=context, QUESTION=question)
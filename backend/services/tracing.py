@@ -0,0 +1,137 @@
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# -----------------------------------------------------------
+# PER-REQUEST SPANS
+# -----------------------------------------------------------
+# A trace is a plain {stage: ms} dict held in a contextvar, so any code
+# running for the request (route, run_stage, helpers) can add to it
+# without threading it through call signatures. Repeated stages add up.
+
+# Latency samples kept per (stage, model) for quantiles
+HISTOGRAM_WINDOW = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Trace:
+    def __init__(self, model: str = None, prefix: str = ""):
+        self.model = model
+        self.prefix = prefix        # histogram stage prefix, e.g. "batch_"
+        self.spans = {}
+        self.start = time.perf_counter()
+
+    def add(self, stage: str, ms: float):
+        self.spans[stage] = round(self.spans.get(stage, 0.0) + ms, 2)
+
+    def timings(self) -> dict:
+        return dict(self.spans)
+
+
+_current = contextvars.ContextVar("rag_trace", default=None)
+
+
+def start_trace(model: str = None, prefix: str = "") -> Trace:
+    """
+    `model` becomes a histogram label, so pass a validated MODEL_MAP name.
+    Batch requests use a prefix: their stages sum many calls and would
+    skew the per-request quantiles.
+    """
+    trace = Trace(model, prefix)
+    _current.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current.get()
+
+
+def add_span(stage: str, ms: float):
+    """Add a measured duration to the current request's trace (no-op outside one)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, ms)
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as `stage` of the current trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_span(stage, (time.perf_counter() - start) * 1000)
+
+
+def finish_trace() -> dict:
+    """
+    Close the current trace: add the total as "request", feed every span
+    into the histograms and return the timings.
+    """
+    trace = _current.get()
+    if trace is None:
+        return {}
+    trace.add("request", (time.perf_counter() - trace.start) * 1000)
+    for stage, ms in trace.spans.items():
+        histograms.observe(trace.prefix + stage, trace.model or "unknown", ms)
+    _current.set(None)
+    return trace.timings()
+
+
+# -----------------------------------------------------------
+# AGGREGATE HISTOGRAMS (Prometheus text exposition)
+# -----------------------------------------------------------
+class LatencyHistograms:
+    """
+    Sliding window of the last HISTOGRAM_WINDOW samples per (stage, model),
+    plus lifetime count and sum, rendered as Prometheus summaries.
+    """
+
+    def __init__(self, window: int = HISTOGRAM_WINDOW):
+        self.window = window
+        self._series = {}    # (stage, model) → [deque of ms, count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, model: str, ms: float):
+        with self._lock:
+            series = self._series.get((stage, model))
+            if series is None:
+                series = self._series[(stage, model)] = [deque(maxlen=self.window), 0, 0.0]
+            series[0].append(ms)
+            series[1] += 1
+            series[2] += ms
+
+    def quantiles(self, stage: str, model: str) -> dict:
+        with self._lock:
+            samples = sorted(self._series[(stage, model)][0])
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in QUANTILES}
+
+    def render(self) -> str:
+        with self._lock:
+            keys = sorted(self._series)
+        lines = [
+            "# HELP rag_stage_latency_ms Request stage latency in milliseconds.",
+            "# TYPE rag_stage_latency_ms summary",
+        ]
+        for stage, model in keys:
+            labels = f'stage="{_escape(stage)}",model="{_escape(model)}"'
+            for q, value in self.quantiles(stage, model).items():
+                lines.append(f'rag_stage_latency_ms{{{labels},quantile="{q}"}} {value:.2f}')
+            with self._lock:
+                _, count, total = self._series[(stage, model)]
+            lines.append(f"rag_stage_latency_ms_sum{{{labels}}} {total:.2f}")
+            lines.append(f"rag_stage_latency_ms_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+histograms = LatencyHistograms()
@@ -1,37 +1,171 @@
 import os
-import json
-from dotenv import load_dotenv
-from pinecone import Pinecone
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from backend.config.settings import (
+    PINECONE_API_KEY,
+    PINECONE_INDEX_NAME,
+    PINECONE_HOST,
+    PINECONE_POOL_CONNECTIONS,
+    VECTOR_BACKEND,
+    LOCAL_EMBEDDINGS_PATH,
+    IVF_INDEX_PATH,
+    IVF_NPROBE,
+    INDEX_VERSION,
+    PINECONE_QUERY_CONCURRENCY,
+    RETRIEVAL_MODE,
+    LEXICAL_CHUNKS_PATH,
+    LEXICAL_MIN_TERMS,
+    HYBRID_CANDIDATES,
+    RRF_K,
+)
 
 # -----------------------------------------------------------
-# LOAD ENVIRONMENT VARIABLES
+# BACKEND HANDLES (created lazily on first use)
 # -----------------------------------------------------------
-load_dotenv()
+# Pinecone index — only connected when the Pinecone backend is used
+index = None
 
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "bmw-rag")
+# In-process NumPy index — only loaded when VECTOR_BACKEND is "local" or "ivf".
+# Loaded under a lock: concurrent first requests on executor threads would
+# otherwise each load their own copy of the matrix
+_local_index = None
+_local_lock = threading.Lock()
+
+# Pool for parallel Pinecone queries in retrieve_top_k_batch (created once,
+# under a lock, like the indexes)
+_query_pool = None
+_query_pool_lock = threading.Lock()
+
+# BM25 index over chunk texts — only built when RETRIEVAL_MODE is "hybrid" or "lexical"
+_lexical_index = None
+_lexical_lock = threading.Lock()
+
+
+def _get_pinecone_index():
+    global index
+    if index is None:
+        from pinecone import Pinecone    # heavy SDK import, deferred to first use
+        pc = Pinecone(api_key=PINECONE_API_KEY)
+        pc.openapi_config.connection_pool_maxsize = PINECONE_POOL_CONNECTIONS
+        index = pc.Index(host=PINECONE_HOST) if PINECONE_HOST else pc.Index(PINECONE_INDEX_NAME)
+    return index
+
+
+def _get_local_index():
+    global _local_index
+    if _local_index is None:
+        with _local_lock:
+            if _local_index is None:
+                if VECTOR_BACKEND == "ivf":
+                    _local_index = _load_ivf_index()
+                else:
+                    from backend.services.local_index import LocalVectorIndex
+                    _local_index = LocalVectorIndex.from_path(LOCAL_EMBEDDINGS_PATH)
+                    print(f"[INFO] Loaded local vector index: {len(_local_index)} vectors from {LOCAL_EMBEDDINGS_PATH}")
+    return _local_index
+
+
+def _get_lexical_index():
+    global _lexical_index
+    if _lexical_index is None:
+        with _lexical_lock:
+            if _lexical_index is None:
+                from backend.services.lexical_index import BM25Index
+                _lexical_index = BM25Index.from_jsonl(LEXICAL_CHUNKS_PATH)
+                print(f"[INFO] Built BM25 index: {len(_lexical_index)} chunks from {LEXICAL_CHUNKS_PATH}")
+    return _lexical_index
+
+
+def _get_query_pool():
+    global _query_pool
+    if _query_pool is None:
+        with _query_pool_lock:
+            if _query_pool is None:
+                _query_pool = ThreadPoolExecutor(
+                    max_workers=PINECONE_QUERY_CONCURRENCY,
+                    thread_name_prefix="pinecone-query",
+                )
+    return _query_pool
+
+
+def warm_up():
+    """Connect / load whichever vector backend is configured."""
+    if RETRIEVAL_MODE != "lexical":
+        if VECTOR_BACKEND in ("local", "ivf"):
+            _get_local_index()
+        else:
+            _get_pinecone_index()
+    if RETRIEVAL_MODE in ("hybrid", "lexical"):
+        _get_lexical_index()
+
+
+def _load_ivf_index():
+    from backend.services.ann_index import IVFIndex
+    if os.path.exists(IVF_INDEX_PATH):
+        ivf = IVFIndex.load(IVF_INDEX_PATH, nprobe=IVF_NPROBE)
+        print(f"[INFO] Loaded IVF index: {len(ivf)} vectors, {ivf.nlist} lists from {IVF_INDEX_PATH}")
+    else:
+        print(f"[WARN] {IVF_INDEX_PATH} not found, building IVF index from {LOCAL_EMBEDDINGS_PATH}")
+        ivf = IVFIndex.from_path(LOCAL_EMBEDDINGS_PATH, nprobe=IVF_NPROBE)
+    return ivf
 
 # -----------------------------------------------------------
-# INITIALIZE PINECONE CLIENT
+# FUNCTION: Index Version (used to invalidate answer caches)
 # -----------------------------------------------------------
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX_NAME)
+def index_version() -> str:
+    """
+    Identify the current contents of the vector index.
+
+    Combines INDEX_VERSION from settings (bump it after re-ingesting into
+    Pinecone) with the modification time of the local index file, so
+    rebuilding the local/IVF index also changes the version.
+    """
+    version = f"{VECTOR_BACKEND}:{INDEX_VERSION}"
+    if VECTOR_BACKEND in ("local", "ivf"):
+        path = IVF_INDEX_PATH if VECTOR_BACKEND == "ivf" and os.path.exists(IVF_INDEX_PATH) else LOCAL_EMBEDDINGS_PATH
+        try:
+            version += f":{os.path.getmtime(path)}"
+        except OSError:
+            pass
+    return version
 
 # -----------------------------------------------------------
 # FUNCTION: Retrieve Top-k Matches
 # -----------------------------------------------------------
-def retrieve_top_k(query_embedding: list, top_k: int = 5):
+def retrieve_top_k(query_embedding: list, top_k: int = 5, metadata_filter: dict = None):
     """
-    Query Pinecone for the top-k most similar vectors to the given embedding.
+    Return the top-k most similar vectors to the given embedding, using
+    the backend selected by VECTOR_BACKEND in settings.
+
+    A `metadata_filter` (Pinecone syntax, see services/filters.py) is
+    pushed down to the backend so only matching rows are scored. If
+    nothing matches it, the unfiltered top-k is returned instead.
 
     Returns:
         A list of dictionaries with 'id', 'score', and 'text' fields.
     """
+    if metadata_filter:
+        matches = _query_index(query_embedding, top_k, metadata_filter)
+        if matches:
+            return matches
+        print(f"[INFO] No vectors match filter {metadata_filter}; searching unfiltered")
+    return _query_index(query_embedding, top_k, None)
+
+
+def _query_index(query_embedding, top_k, metadata_filter):
     try:
-        results = index.query(
+        if VECTOR_BACKEND in ("local", "ivf"):
+            return _get_local_index().query(query_embedding, top_k=top_k, metadata_filter=metadata_filter)
+
+        if VECTOR_BACKEND != "pinecone":
+            raise ValueError(f"Unsupported VECTOR_BACKEND: {VECTOR_BACKEND}")
+
+        options = {"filter": metadata_filter} if metadata_filter else {}
+        results = _get_pinecone_index().query(
             vector=query_embedding,
             top_k=top_k,
-            include_metadata=True
+            include_metadata=True,
+            **options
         )
 
         # Convert Pinecone response into clean Python dicts
@@ -49,3 +183,90 @@ def retrieve_top_k(query_embedding: list, top_k: int = 5):
     except Exception as e:
         print(f"[ERROR] Retrieval failed: {e}")
         raise
+
+
+# -----------------------------------------------------------
+# FUNCTION: Retrieve Top-k Matches for Many Queries
+# -----------------------------------------------------------
+def retrieve_top_k_batch(query_embeddings: list, top_k: int = 5, metadata_filters: list = None):
+    """
+    Batched retrieve_top_k. Local backends score every unfiltered query
+    in one matrix multiply (filtered ones each search their own subset);
+    Pinecone queries are issued in parallel (PINECONE_QUERY_CONCURRENCY
+    at a time).
+
+    Returns:
+        One list of {'id', 'score', 'text'} dicts per query, in input order.
+    """
+    if not query_embeddings:
+        return []
+    metadata_filters = metadata_filters or [None] * len(query_embeddings)
+
+    if VECTOR_BACKEND in ("local", "ivf"):
+        plain = [i for i, f in enumerate(metadata_filters) if not f]
+        results = [None] * len(query_embeddings)
+        try:
+            if plain:
+                found = _get_local_index().search([query_embeddings[i] for i in plain], top_k=top_k)
+                for i, matches in zip(plain, found):
+                    results[i] = matches
+        except Exception as e:
+            print(f"[ERROR] Batch retrieval failed: {e}")
+            raise
+        for i, flt in enumerate(metadata_filters):
+            if flt:
+                results[i] = retrieve_top_k(query_embeddings[i], top_k=top_k, metadata_filter=flt)
+        return results
+
+    return list(_get_query_pool().map(
+        lambda e, f: retrieve_top_k(e, top_k=top_k, metadata_filter=f),
+        query_embeddings, metadata_filters,
+    ))
+
+
+# -----------------------------------------------------------
+# LEXICAL + HYBRID RETRIEVAL
+# -----------------------------------------------------------
+def _strip(matches):
+    return [{"id": m["id"], "score": m["score"], "text": m["text"]} for m in matches]
+
+
+def _bm25(query: str, top_k: int, metadata_filter: dict = None, **options):
+    """BM25 search, filtered when possible (unfiltered if nothing matches the filter)."""
+    index = _get_lexical_index()
+    if metadata_filter:
+        matches = index.search(query, top_k=top_k, metadata_filter=metadata_filter, **options)
+        if matches:
+            return matches
+    return index.search(query, top_k=top_k, **options)
+
+
+def lexical_search(query: str, top_k: int = 5, metadata_filter: dict = None):
+    """BM25 top-k over the chunk texts (no embedding needed)."""
+    return _strip(_bm25(query, top_k, metadata_filter))
+
+
+def lexical_fast_path(query: str, top_k: int = 5, metadata_filter: dict = None):
+    """
+    Confident lexical answer, or None. Confident means the query has at
+    least LEXICAL_MIN_TERMS non-stopword terms, every one of them is in
+    the index vocabulary, and the returned chunks contain all of them —
+    i.e. a keyword query like "X5 2022 Asia". Anything else (free-form
+    questions with unseen words) returns None and goes through embeddings.
+    """
+    from backend.services.lexical_index import query_terms
+    if len(query_terms(query)) < LEXICAL_MIN_TERMS:
+        return None
+    return _strip(_bm25(query, top_k, metadata_filter, require_all=True)) or None
+
+
+def fuse_with_lexical(query: str, vector_matches, top_k: int = 5, metadata_filter: dict = None):
+    """Reciprocal-rank fusion of vector matches with (filtered) BM25 matches."""
+    from backend.services.lexical_index import rrf_fuse
+    lexical = _bm25(query, top_k * HYBRID_CANDIDATES, metadata_filter)
+    return rrf_fuse([vector_matches, lexical], top_k=top_k, k=RRF_K)
+
+
+def candidate_depth(top_k: int) -> int:
+    """How many vector matches to fetch before fusion."""
+    return top_k * HYBRID_CANDIDATES if RETRIEVAL_MODE == "hybrid" else top_k
@@ -7,16 +7,17 @@ try:
     # FastAPI + Middleware
     from fastapi import FastAPI, Request
     from fastapi.middleware.cors import CORSMiddleware
-    from fastapi.responses import JSONResponse
+    from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+    from starlette.background import BackgroundTask
 
     # Pydantic / Data models
     from pydantic import BaseModel
+    from typing import List
 
-    # AWS + Utilities
-    import boto3
-    from mangum import Mangum
+    # Utilities (mangum is imported by the Lambda handler on first invoke)
     import json
     import time
+    import asyncio
     import logging
     import os
     from datetime import datetime
@@ -28,11 +29,54 @@ except Exception as e:
 
 # Local imports
 from backend.services.embeddings import get_query_embedding
-from backend.services.vector_store import retrieve_top_k
-from backend.services.generate import generate_answer
-from backend.config.settings import MODEL_MAP
+from backend.services.vector_store import (
+    retrieve_top_k,
+    retrieve_top_k_batch,
+    index_version,
+    lexical_search,
+    lexical_fast_path,
+    fuse_with_lexical,
+    candidate_depth,
+)
+from backend.services import vector_store
+from backend.services.aws_clients import bedrock_runtime
+from backend.services.generate import generate_answer, stream_answer
+from backend.services.prompts import build_context, get_template
+from backend.services.answer_cache import SemanticAnswerCache
+from backend.services import analytics
+from backend.services.filters import parse_filters, filter_key
+from backend.services.dispatcher import dispatcher, ModelUnavailableError
+from backend.services.log_sink import request_log
+from backend.services.metrics import metrics, set_dimensions, record_latency, record_error
+from backend.services.tracing import start_trace, current_trace, finish_trace, span, add_span, histograms
+from backend.services.concurrency import (
+    run_stage,
+    request_slot,
+    StageTimeoutError,
+    OverloadedError,
+)
+from backend.config.settings import (
+    EMBED_TIMEOUT_SECONDS,
+    RETRIEVE_TIMEOUT_SECONDS,
+    GENERATE_TIMEOUT_SECONDS,
+    BATCH_MAX_QUERIES,
+    BATCH_GENERATE_CONCURRENCY,
+    PINECONE_QUERY_CONCURRENCY,
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_SIZE,
+    ANSWER_CACHE_TTL_SECONDS,
+    WARM_UP_ON_INIT,
+    RETRIEVAL_MODE,
+    LEXICAL_FAST_PATH,
+    ANALYTICS_ENABLED,
+    METADATA_FILTERS_ENABLED,
+    AUTH_ENABLED,
+)
 from backend.security import enforce_rate_limit
-from backend.auth_verify import verify_access_token
+# backend.auth_verify (jose + requests) is only imported when AUTH_ENABLED
+# is set; otherwise the stub verify_access_token below is used and the
+# import would only add cold-start time
 
 
 
@@ -76,6 +120,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# -----------------------------------------------------------
+# SEMANTIC ANSWER CACHE (near-duplicate questions skip retrieval + generation)
+# -----------------------------------------------------------
+answer_cache = SemanticAnswerCache(
+    threshold=ANSWER_CACHE_THRESHOLD,
+    max_entries=ANSWER_CACHE_SIZE if ANSWER_CACHE_ENABLED else 0,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+)
+
 # -----------------------------------------------------------
 # REQUEST MODEL
 # -----------------------------------------------------------
@@ -83,6 +136,14 @@ class AskRequest(BaseModel):
     query: str
     model: str = "claude-sonnet"
     k: int = 5
+    include_timings: bool = False
+
+
+class BatchAskRequest(BaseModel):
+    queries: List[str]
+    model: str = "claude-sonnet"
+    k: int = 5
+    stream: bool = False
 
 # -----------------------------------------------------------
 # ROUTES
@@ -91,6 +152,12 @@ class AskRequest(BaseModel):
 async def root():
     return {"status": "ok", "message": "RAG Search Assistant API running"}
 
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Per-stage, per-model latency quantiles and model health (Prometheus text format)."""
+    return PlainTextResponse(histograms.render() + dispatcher.render(), media_type="text/plain; version=0.0.4")
+
 def verify_access_token(auth_header):
     # Simulate successful Cognito JWT validation
     return {
@@ -99,15 +166,24 @@ def verify_access_token(auth_header):
         "scope": "rag.search.invoke"
     }
 
-@app.post("/api/ask")
-async def ask(request: Request, body: AskRequest):
+async def _authorize(request: Request):
+    """
+    Authentication + rate limiting shared by all /api/ask routes.
+    Returns a JSONResponse to send back if the request is denied, else None.
+    """
     # -----------------------------------------------------------
     # AUTHENTICATION CHECK
     # -----------------------------------------------------------
     auth_header = request.headers.get("authorization") or request.headers.get("Authorization")
 
     try:
-        claims = verify_access_token(auth_header)
+        with span("auth"):
+            if AUTH_ENABLED:
+                # Cached claims / keys; a JWKS refresh runs off the event loop
+                from backend.auth_verify import verify_access_token_async
+                claims = await verify_access_token_async(auth_header)
+            else:
+                claims = verify_access_token(auth_header)
     except Exception as e:
         logger.warning(f"Unauthorized access attempt: {e}")
         # use JSONResponse so headers and content-type are correct
@@ -116,61 +192,485 @@ async def ask(request: Request, body: AskRequest):
     # -----------------------------------------------------------
     # RATE LIMIT
     # -----------------------------------------------------------
-    deny = await enforce_rate_limit(request)
+    with span("rate_limit"):
+        deny = await enforce_rate_limit(request)
+    if deny:
+        return deny
+
+    return None
+
+
+def _invalid_query(query) -> bool:
+    return not isinstance(query, str) or len(query) > 1000
+
+
+# -----------------------------------------------------------
+# RETRIEVAL (vector / hybrid / lexical, see RETRIEVAL_MODE)
+# -----------------------------------------------------------
+def _query_filter(query: str) -> dict:
+    """Metadata filter (Model / Year / Region / ...) named in the query, pushed down to search."""
+    return parse_filters(query) if METADATA_FILTERS_ENABLED else {}
+
+
+async def _retrieve_direct(query: str, k: int, metadata_filter: dict = None):
+    """
+    (matches, retrieval) found without an embedding call, or (None, None)
+    to take the embedding path:
+      aggregate → analytic question answered by the columnar engine; the
+                  computed result is the only context
+      lexical   → always in "lexical" mode, and in "hybrid" mode when BM25
+                  matches every keyword of the query (lexical_fast_path)
+    """
+    if ANALYTICS_ENABLED:
+        aggregate = await run_stage(
+            "analytics", analytics.answer_aggregate, query,
+            timeout=RETRIEVE_TIMEOUT_SECONDS,
+        )
+        if aggregate is not None:
+            return [aggregate], "aggregate"
+
+    if RETRIEVAL_MODE == "lexical":
+        func = lexical_search
+    elif RETRIEVAL_MODE == "hybrid" and LEXICAL_FAST_PATH:
+        func = lexical_fast_path
+    else:
+        return None, None
+    matches = await run_stage("retrieval", func, query, top_k=k, metadata_filter=metadata_filter,
+                              timeout=RETRIEVE_TIMEOUT_SECONDS)
+    return matches, ("lexical" if matches is not None else None)
+
+
+def _retrieve(query: str, query_embedding, k: int, metadata_filter: dict = None):
+    """Vector top-k, fused with BM25 results in hybrid mode."""
+    matches = retrieve_top_k(query_embedding, top_k=candidate_depth(k), metadata_filter=metadata_filter)
+    if RETRIEVAL_MODE == "hybrid":
+        return fuse_with_lexical(query, matches, top_k=k, metadata_filter=metadata_filter)
+    return matches
+
+
+def _retrieve_batch(queries, query_embeddings, k: int):
+    filters = [_query_filter(q) for q in queries]
+    if RETRIEVAL_MODE == "lexical":
+        return [lexical_search(q, top_k=k, metadata_filter=f) for q, f in zip(queries, filters)]
+    results = retrieve_top_k_batch(query_embeddings, top_k=candidate_depth(k), metadata_filters=filters)
+    if RETRIEVAL_MODE == "hybrid":
+        return [fuse_with_lexical(q, m, top_k=k, metadata_filter=f) for q, m, f in zip(queries, results, filters)]
+    return results
+
+
+@app.post("/api/ask")
+async def ask(request: Request, body: AskRequest):
+    model_name, model_id = dispatcher.resolve(body.model)
+    start_trace(model_name)
+    deny = await _authorize(request)
     if deny:
         return deny
 
     # -----------------------------------------------------------
     # BASIC VALIDATION
     # -----------------------------------------------------------
-    if not isinstance(body.query, str) or len(body.query) > 1000:
+    if _invalid_query(body.query):
         return JSONResponse(status_code=400, content={"error": "Prompt too long or invalid"})
 
     start_time = time.time()
-    cw = boto3.client("cloudwatch")
+    set_dimensions(model_name, body.k)
 
     try:
-        logger.info(f"Received query: {body.query}")
-        model_id = MODEL_MAP.get(body.model, MODEL_MAP["mistral"])
-        logger.info(f"Model selected: {model_id}")
-        logger.info("Starting embedding and retrieval...")
+        async with request_slot():
+            logger.info(f"Received query: {body.query}")
+            logger.info(f"Model selected: {model_id}")
+            logger.info("Starting embedding and retrieval...")
+
+            cached = None
+            metadata_filter = _query_filter(body.query)
+            direct, retrieval = await _retrieve_direct(body.query, body.k, metadata_filter)
+            if direct is not None:
+                # Aggregate or keyword query: no embedding, no answer cache
+                matches = direct
+            else:
+                retrieval = RETRIEVAL_MODE
+                query_embedding = await run_stage(
+                    "embedding", get_query_embedding, body.query,
+                    timeout=EMBED_TIMEOUT_SECONDS,
+                )
+                version = index_version()
+                cached = answer_cache.lookup(model_id, body.k, query_embedding, index_version=version,
+                                             scope=filter_key(metadata_filter))
+                if cached:
+                    logger.info(f"Answer cache hit (similarity={cached['similarity']}) for: {cached['query']}")
+                    matches, answer = cached["matches"], cached["answer"]
+                else:
+                    matches = await run_stage(
+                        "retrieval", _retrieve, body.query, query_embedding, body.k, metadata_filter,
+                        timeout=RETRIEVE_TIMEOUT_SECONDS,
+                    )
+
+            # A cache hit reports the model that produced the cached answer
+            answered_by, hedged = (cached and cached["answered_by"]) or model_name, False
+            if not cached:
+                # Requested model, hedged / failed over to FALLBACK_MODEL when slow or down
+                result = await dispatcher.generate(model_name, body.query, matches, generate=generate_answer)
+                answer, answered_by, hedged = result["answer"], result["model"], result["hedged"]
+                if direct is None:
+                    answer_cache.store(model_id, body.k, query_embedding, body.query, answer, matches,
+                                       index_version=version, scope=filter_key(metadata_filter),
+                                       answered_by=answered_by)
+
+            latency_ms = round((time.time() - start_time) * 1000, 2)
+
+            # Buffered EMF metric, flushed in the background (no CloudWatch call here)
+            metrics.record("Latency_ms", latency_ms)
+
+            with span("logging"):
+                log_request(answered_by, body.query, body.k, matches, answer, latency_ms,
+                            timings=current_trace().timings())
+            timings = finish_trace()
+
+            response = {
+                "model": body.model,
+                "answered_by": answered_by,
+                "hedged": hedged,
+                "answer": answer,
+                "matches": matches,
+                "latency_ms": latency_ms,
+                "cached": cached is not None,
+                "retrieval": retrieval,
+                "filter": metadata_filter,
+            }
+            if body.include_timings:
+                response["timings"] = timings
+            return response
+
+    except (OverloadedError, ModelUnavailableError) as e:
+        logger.warning(str(e))
+        record_error("overloaded")
+        return JSONResponse(status_code=503, content={"error": str(e)})
+
+    except StageTimeoutError as e:
+        logger.error(f"Stage timeout in /api/ask: {e}")
+        record_error("request")
+        return JSONResponse(status_code=504, content={"error": str(e)})
 
-        query_embedding = get_query_embedding(body.query)
-        matches = retrieve_top_k(query_embedding, top_k=body.k)
-        context = "\n".join([m["text"] for m in matches])
-        answer = generate_answer(model_id=model_id, question=body.query, context=context)
+    except Exception as e:
+        logger.exception("Unhandled exception in /api/ask")
+        record_error("request")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+# -----------------------------------------------------------
+# STREAMING ROUTE (Server-Sent Events)
+# -----------------------------------------------------------
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/ask/stream")
+async def ask_stream(request: Request, body: AskRequest):
+    """
+    Streaming variant of /api/ask. Emits Server-Sent Events:
+      matches → retrieved sources (sent before generation starts)
+      token   → answer text fragments as Bedrock produces them
+      done    → latency_ms and time-to-first-token
+      error   → if generation fails mid-stream
+    """
+    model_name, model_id = dispatcher.resolve(body.model)
+    start_trace(model_name)
+    deny = await _authorize(request)
+    if deny:
+        return deny
+
+    if _invalid_query(body.query):
+        return JSONResponse(status_code=400, content={"error": "Prompt too long or invalid"})
+
+    start_time = time.time()
+    set_dimensions(model_name, body.k)
+
+    # Embedding + retrieval (and the breaker check) happen before the
+    # response starts so that overload / timeouts still map to proper
+    # status codes. Streams are not hedged: tokens are already on the wire.
+    try:
+        async with request_slot() as slot:
+            cached = None
+            metadata_filter = _query_filter(body.query)
+            direct, retrieval = await _retrieve_direct(body.query, body.k, metadata_filter)
+            if direct is not None:
+                matches = direct
+            else:
+                retrieval = RETRIEVAL_MODE
+                query_embedding = await run_stage(
+                    "embedding", get_query_embedding, body.query,
+                    timeout=EMBED_TIMEOUT_SECONDS,
+                )
+                version = index_version()
+                cached = answer_cache.lookup(model_id, body.k, query_embedding, index_version=version,
+                                             scope=filter_key(metadata_filter))
+                if cached:
+                    matches = cached["matches"]
+                else:
+                    matches = await run_stage(
+                        "retrieval", _retrieve, body.query, query_embedding, body.k, metadata_filter,
+                        timeout=RETRIEVE_TIMEOUT_SECONDS,
+                    )
+            if cached:
+                answered_by, answer_model_id = cached["answered_by"] or model_name, None
+            else:
+                answered_by, answer_model_id = dispatcher.choose(model_name)
+            # The slot stays held while the answer streams (released when
+            # event_stream ends, or by the response's background task)
+            slot.detach()
+
+    except (OverloadedError, ModelUnavailableError) as e:
+        record_error("overloaded")
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    except StageTimeoutError as e:
+        logger.error(f"Stage timeout in /api/ask/stream: {e}")
+        record_error("request")
+        return JSONResponse(status_code=504, content={"error": str(e)})
+    except Exception as e:
+        logger.exception("Unhandled exception in /api/ask/stream")
+        record_error("request")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+    async def event_stream():
+        yield _sse("matches", {
+            "model": body.model,
+            "answered_by": answered_by,
+            "matches": matches,
+            "cached": cached is not None,
+            "retrieval": retrieval,
+            "filter": metadata_filter,
+        })
+
+        ttft_ms = None
+        if cached:
+            answer = cached["answer"]
+            ttft_ms = round((time.time() - start_time) * 1000, 2)
+            yield _sse("token", {"text": answer})
+        else:
+            parts = []
+            generation_start = ok = None
+            try:
+                with span("prompt"):
+                    context = build_context(answer_model_id, matches, body.query)
+                generation_start = time.perf_counter()
+                # Generator: the Bedrock call itself happens on the first next()
+                tokens = stream_answer(model_id=answer_model_id, question=body.query, context=context)
+                while True:
+                    # Pull each chunk off the blocking Bedrock event stream in the executor
+                    text = await run_stage("generation", next, tokens, None,
+                                           timeout=GENERATE_TIMEOUT_SECONDS, record=False)
+                    if text is None:
+                        break
+                    if ttft_ms is None:
+                        ttft_ms = round((time.time() - start_time) * 1000, 2)
+                    parts.append(text)
+                    yield _sse("token", {"text": text})
+            except Exception as e:
+                ok = False
+                logger.exception("Streaming generation failed in /api/ask/stream")
+                record_error("generation")
+                yield _sse("error", {"error": str(e)})
+                return
+            finally:
+                # Feeds the model's latency window and breaker (a client
+                # disconnect is not the model's fault); a call that never
+                # started frees its breaker probe instead
+                if generation_start is None:
+                    dispatcher.release(answered_by)
+                else:
+                    dispatcher.record(answered_by, (time.perf_counter() - generation_start) * 1000, ok is not False)
+
+            generation_ms = round((time.perf_counter() - generation_start) * 1000, 2)
+            record_latency("generation", generation_ms)
+            add_span("generation", generation_ms)
+            answer = "".join(parts).strip()
+            if direct is None:
+                answer_cache.store(model_id, body.k, query_embedding, body.query, answer, matches,
+                                   index_version=version, scope=filter_key(metadata_filter),
+                                   answered_by=answered_by)
 
         latency_ms = round((time.time() - start_time) * 1000, 2)
+        metrics.record("Latency_ms", latency_ms)
+        if ttft_ms is not None:
+            metrics.record("ttft_ms", ttft_ms)
+        with span("logging"):
+            log_request(answered_by, body.query, body.k, matches, answer, latency_ms,
+                        timings=current_trace().timings())
+        timings = finish_trace()
+
+        done = {"latency_ms": latency_ms, "ttft_ms": ttft_ms, "answered_by": answered_by}
+        if body.include_timings:
+            done["timings"] = timings
+        yield _sse("done", done)
+
+    return StreamingResponse(
+        slot.hold_during(event_stream()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also covers a client that disconnects before the body is iterated
+        background=BackgroundTask(slot.release),
+    )
+
 
-        # Push custom metric to CloudWatch
-        cw.put_metric_data(
-            Namespace="RAGSearch",
-            MetricData=[{
-                "MetricName": "Latency_ms",
-                "Unit": "Milliseconds",
-                "Value": latency_ms
-            }]
+# -----------------------------------------------------------
+# BATCH ROUTE
+# -----------------------------------------------------------
+async def _run_batch(body: BatchAskRequest, model_name: str, model_id: str):
+    """
+    Answer many questions with shared work:
+      1. embed all queries concurrently
+      2. one batched vector search (local index) or parallel Pinecone queries
+      3. generations with at most BATCH_GENERATE_CONCURRENCY in flight
+
+    Yields one result dict per query in completion order. Failures are
+    reported per item as {'index', 'query', 'error'}.
+    """
+    version = index_version()
+    set_dimensions(model_name, body.k)
+
+    async with request_slot():
+        pending = []
+        for i, query in enumerate(body.queries):
+            if _invalid_query(query):
+                yield {"index": i, "query": query, "error": "Prompt too long or invalid"}
+            else:
+                pending.append(i)
+
+        # 1. Embeddings (the query embedding cache de-duplicates repeats)
+        embedded = await asyncio.gather(*[
+            run_stage("embedding", get_query_embedding, body.queries[i], timeout=EMBED_TIMEOUT_SECONDS)
+            for i in pending
+        ], return_exceptions=True)
+
+        embeddings = {}
+        to_retrieve = []
+        for i, result in zip(pending, embedded):
+            if isinstance(result, Exception):
+                yield {"index": i, "query": body.queries[i], "error": f"embedding failed: {result}"}
+                continue
+            embeddings[i] = result
+            cached = answer_cache.lookup(model_id, body.k, result, index_version=version,
+                                         scope=filter_key(_query_filter(body.queries[i])))
+            if cached:
+                yield {
+                    "index": i, "query": body.queries[i], "answer": cached["answer"],
+                    "answered_by": cached["answered_by"] or model_name,
+                    "matches": cached["matches"], "latency_ms": 0.0, "cached": True,
+                }
+            else:
+                to_retrieve.append(i)
+
+        # 2. Retrieval as one batched call (timeout scales with the number
+        #    of parallel Pinecone rounds; local search is a single matmul)
+        rounds = 1 + len(to_retrieve) // PINECONE_QUERY_CONCURRENCY
+        try:
+            batch_matches = await run_stage(
+                "retrieval", _retrieve_batch,
+                [body.queries[i] for i in to_retrieve], [embeddings[i] for i in to_retrieve], body.k,
+                timeout=RETRIEVE_TIMEOUT_SECONDS * rounds,
+            )
+        except Exception as e:
+            for i in to_retrieve:
+                yield {"index": i, "query": body.queries[i], "error": f"retrieval failed: {e}"}
+            return
+
+        # 3. Generations with bounded parallelism
+        gen_slots = asyncio.Semaphore(BATCH_GENERATE_CONCURRENCY)
+
+        async def answer_one(i, matches):
+            async with gen_slots:
+                started = time.time()
+                try:
+                    # Breaker-aware failover, but no hedging: batches favour throughput
+                    result = await dispatcher.generate(model_name, body.queries[i], matches,
+                                                       generate=generate_answer, hedge=False)
+                except Exception as e:
+                    return {"index": i, "query": body.queries[i], "error": f"generation failed: {e}"}
+
+            answer = result["answer"]
+            latency_ms = round((time.time() - started) * 1000, 2)
+            answer_cache.store(model_id, body.k, embeddings[i], body.queries[i], answer, matches,
+                               index_version=version, scope=filter_key(_query_filter(body.queries[i])),
+                               answered_by=result["model"])
+            log_request(result["model"], body.queries[i], body.k, matches, answer, latency_ms)
+            return {
+                "index": i, "query": body.queries[i], "answer": answer, "answered_by": result["model"],
+                "matches": matches, "latency_ms": latency_ms, "cached": False,
+            }
+
+        tasks = [asyncio.ensure_future(answer_one(i, m)) for i, m in zip(to_retrieve, batch_matches)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+@app.post("/api/ask/batch")
+async def ask_batch(request: Request, body: BatchAskRequest):
+    """
+    Answer up to BATCH_MAX_QUERIES questions in one call (one auth check,
+    one rate-limit hit). With "stream": true, results are sent as NDJSON
+    lines in completion order followed by a summary line; otherwise one
+    JSON document with results in input order.
+    """
+    model_name, model_id = dispatcher.resolve(body.model)
+    start_trace(model_name, prefix="batch_")
+    deny = await _authorize(request)
+    if deny:
+        return deny
+
+    if not body.queries or len(body.queries) > BATCH_MAX_QUERIES:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Provide between 1 and {BATCH_MAX_QUERIES} queries"},
         )
 
-        log_request(body.model, body.query, body.k, matches, answer, latency_ms)
+    start_time = time.time()
 
+    def summary(results):
+        failed = sum(1 for r in results if "error" in r)
         return {
             "model": body.model,
-            "answer": answer,
-            "matches": matches,
-            "latency_ms": latency_ms
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "latency_ms": round((time.time() - start_time) * 1000, 2),
         }
 
+    if body.stream:
+        async def ndjson():
+            results = []
+            try:
+                async for result in _run_batch(body, model_name, model_id):
+                    results.append(result)
+                    yield json.dumps(result) + "\n"
+            except Exception as e:
+                logger.exception("Unhandled exception in /api/ask/batch")
+                yield json.dumps({"error": str(e)}) + "\n"
+            finish_trace()
+            yield json.dumps({"done": True, **summary(results)}) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    try:
+        results = [r async for r in _run_batch(body, model_name, model_id)]
+    except OverloadedError as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
     except Exception as e:
-        logger.exception("Unhandled exception in /api/ask")
+        logger.exception("Unhandled exception in /api/ask/batch")
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+    finish_trace()
+    results.sort(key=lambda r: r["index"])
+    return {**summary(results), "results": results}
 
 
 # -----------------------------------------------------------
 # LOGGING FUNCTION
 # -----------------------------------------------------------
-def log_request(model: str, query: str, k: int, matches: list, answer: str, latency_ms: float):
+def log_request(model: str, query: str, k: int, matches: list, answer: str, latency_ms: float,
+                timings: dict = None):
     log_entry = {
         "timestamp": datetime.utcnow().isoformat(),
         "model": model,
@@ -182,10 +682,51 @@ def log_request(model: str, query: str, k: int, matches: list, answer: str, late
         "answer_length": len(answer),
         "latency_ms": latency_ms,
     }
-    logger.info(json.dumps(log_entry))
+    if timings:
+        log_entry["timings"] = timings
+    # Serialised and written by the background sink, not on the request path
+    request_log.write(log_entry)
+
+
+# -----------------------------------------------------------
+# WARM-UP (optional, during Lambda init)
+# -----------------------------------------------------------
+def warm_up():
+    """Build the Bedrock client, compile the prompt, open the vector backend and load the column store."""
+    start = time.time()
+    try:
+        bedrock_runtime()
+        get_template()
+        vector_store.warm_up()
+        if ANALYTICS_ENABLED:
+            analytics.get_store()
+    except Exception as e:
+        print(f"[ERROR] Warm-up failed (continuing lazily): {e}")
+        return
+    logger.info(f"Warm-up finished in {round((time.time() - start) * 1000, 2)} ms")
+
+
+if WARM_UP_ON_INIT:
+    warm_up()
 
 
 # -----------------------------------------------------------
 # LAMBDA HANDLER
 # -----------------------------------------------------------
-handler = Mangum(app)
+_mangum = None
+
+
+def handler(event, context):
+    """Lambda entry point; the Mangum adapter is built on first invocation."""
+    global _mangum
+    if _mangum is None:
+        from mangum import Mangum
+        _mangum = Mangum(app)
+    try:
+        return _mangum(event, context)
+    finally:
+        # A frozen or recycled container never runs the flush threads or
+        # atexit, so buffered metrics and request-log lines are written
+        # before returning
+        metrics.flush()
+        request_log.flush()
@@ -1,6 +1,15 @@
-import boto3, json
+import os
+import sys
+import json
 
-client = boto3.client("bedrock", region_name="us-east-1")
+# Runnable as `python scripts/accessclaude.py` from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from backend.services.aws_clients import get_client
+
+client = get_client("bedrock", region_name="us-east-1")
 
 response = client.put_use_case_for_model_access(
     modelIdentifier="anthropic.claude-3-sonnet-20240229-v1:0",
@@ -0,0 +1,103 @@
+"""
+Cold-start benchmark: imports main.py in fresh interpreters and reports
+import time, lazy client initialisation and first-request time.
+
+Run from the repository root:
+    python scripts/bench_cold_start.py --runs 5
+    python scripts/bench_cold_start.py --ask "Top selling model in 2022?"   # real Bedrock call
+    python scripts/bench_cold_start.py --max-import-ms 600                  # fail on regression
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a fresh interpreter per run; prints one JSON line
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+
+from backend.services.aws_clients import bedrock_runtime
+bedrock_runtime()
+t2 = time.perf_counter()
+
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+query = sys.argv[1]
+t3 = time.perf_counter()
+if query:
+    response = client.post("/api/ask", json={"query": query, "model": "claude-haiku"})
+else:
+    response = client.get("/")
+t4 = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "client_init_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t4 - t3) * 1000,
+    "status": response.status_code,
+}))
+"""
+
+
+def run_probe(query, warm):
+    env = dict(os.environ, WARM_UP_ON_INIT="true" if warm else "false", METRICS_ENABLED="false")
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, query or ""],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def heaviest_imports(top):
+    """Cumulative import time per module for `import main` (python -X importtime)."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [p.strip() for p in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative_us) / 1000, int(self_us) / 1000, name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure main.py cold-start cost")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ask", default="", help="Send a real /api/ask query as the first request")
+    parser.add_argument("--warm", action="store_true", help="Set WARM_UP_ON_INIT=true for the runs")
+    parser.add_argument("--top", type=int, default=10, help="Show the N heaviest imports")
+    parser.add_argument("--max-import-ms", type=float, default=None,
+                        help="Exit non-zero if median import time exceeds this")
+    args = parser.parse_args()
+
+    results = [run_probe(args.ask, args.warm) for _ in range(args.runs)]
+
+    print(f"📊 Cold start over {args.runs} fresh interpreters (median / max):")
+    for key in ("import_ms", "client_init_ms", "first_request_ms"):
+        values = [r[key] for r in results]
+        print(f"  {key:<18} {statistics.median(values):>9.1f} {max(values):>9.1f}")
+    print(f"  first request status: {sorted({r['status'] for r in results})}")
+
+    if args.top:
+        print("\n🐢 Heaviest imports (cumulative ms, self ms):")
+        for cumulative, own, name in heaviest_imports(args.top):
+            print(f"  {cumulative:>8.1f} {own:>8.1f}  {name}")
+
+    median_import = statistics.median(r["import_ms"] for r in results)
+    if args.max_import_ms is not None and median_import > args.max_import_ms:
+        print(f"[ERROR] Median import time {median_import:.1f} ms exceeds {args.max_import_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Build the approximate (IVF) vector index from the embeddings JSONL (or a
+binary embedding store directory) and report recall@k against exact
+search for a sweep of nprobe values.
+
+Run from the repository root:
+    python -m scripts.build_ivf_index --nlist 1024 --nprobe 1,4,8,16,32
+"""
+import argparse
+import numpy as np
+from backend.services.ann_index import IVFIndex, recall_at_k
+from backend.services.local_index import load_embeddings
+
+# Config
+INPUT_EMBEDDINGS = "data/processed/bmw_embeddings.jsonl"
+OUTPUT_INDEX = "data/processed/bmw_ivf.npz"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an IVF index and measure recall@k")
+    parser.add_argument("--input", default=INPUT_EMBEDDINGS, help="Embeddings JSONL or store directory")
+    parser.add_argument("--output", default=OUTPUT_INDEX)
+    parser.add_argument("--nlist", type=int, default=None, help="Number of lists (default ~4*sqrt(N))")
+    parser.add_argument("--nprobe", default="1,4,8,16,32", help="Comma-separated nprobe values to evaluate")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="Corpus rows sampled as evaluation queries")
+    args = parser.parse_args()
+
+    ids, matrix, texts, metadatas = load_embeddings(args.input, with_metadata=True)
+    print(f"🔄 Building IVF index over {len(ids)} vectors...")
+
+    ivf = IVFIndex.build(ids, matrix, texts, nlist=args.nlist, metadata=metadatas)
+    ivf.save(args.output)
+    print(f"✅ Saved IVF index ({ivf.nlist} lists) to {args.output}")
+
+    # Evaluate with perturbed corpus vectors so queries are not exact duplicates
+    rng = np.random.default_rng(0)
+    sample = matrix[rng.choice(len(ids), size=min(args.queries, len(ids)), replace=False)]
+    queries = sample + rng.normal(scale=0.01, size=sample.shape).astype(np.float32)
+
+    exact = ivf.to_exact()
+    print(f"\n{'nprobe':>8} {'recall@' + str(args.k):>10} {'ann ms/q':>10} {'exact ms/q':>11}")
+    for nprobe in [int(p) for p in args.nprobe.split(",") if p]:
+        report = recall_at_k(ivf, queries, top_k=args.k, nprobe=nprobe, exact=exact)
+        print(
+            f"{report['nprobe']:>8} {report['recall']:>10.4f} "
+            f"{report['ann_ms_per_query']:>10.3f} {report['exact_ms_per_query']:>11.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
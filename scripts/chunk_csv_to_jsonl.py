@@ -1,37 +1,269 @@
 import os
 import csv
 import json
+import re
+import argparse
+from itertools import islice
+from multiprocessing import Pool
 
 # Config
 INPUT_CSV = "data/raw/bmw_sales_data.csv"
 OUTPUT_JSONL = "data/processed/bmw_chunks.jsonl"
 
-# Read the CSV and convert each row into a flattened chunk
-def process_csv(input_path):
-    chunks = []
+# Rows handed to a worker process at a time
+BATCH_ROWS = 5000
+
+# Numeric columns summarised by --group-by rollups (avg/min/max),
+# and the subset where a total is meaningful
+ROLLUP_METRICS = ["Sales_Volume", "Price_USD", "Mileage_KM", "Engine_Size_L"]
+ROLLUP_TOTALS = {"Sales_Volume"}
+
+
+# -----------------------------------------------------------
+# READING: raw CSV records, batched (parsing happens in workers)
+# -----------------------------------------------------------
+def _iter_raw_records(csvfile):
+    """
+    Yield one physical CSV record per item as raw text. Lines are joined
+    while a quoted field is still open, so embedded newlines are safe.
+    """
+    pending = ""
+    for line in csvfile:
+        pending += line
+        if pending.count('"') % 2 == 0:
+            yield pending
+            pending = ""
+    if pending:
+        yield pending
+
+
+def iter_batches(input_path, batch_rows=BATCH_ROWS):
+    """
+    Stream the CSV as (header, start_row, [raw record lines]) batches.
+    Only one batch per worker is ever held in memory.
+    """
     with open(input_path, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for i, row in enumerate(reader):
-            chunk_text = "; ".join([f"{k}: {v}" for k, v in row.items()])
-            chunk = {
-                "id": f"bmw-{i}",
-                "text": chunk_text,
-                "metadata": {
-                    "row_number": i
-                }
-            }
-            chunks.append(chunk)
+        records = _iter_raw_records(csvfile)
+        header_line = next(records, None)
+        if header_line is None:
+            return
+        header = next(csv.reader([header_line]))
+
+        start = 0
+        while True:
+            lines = list(islice(records, batch_rows))
+            if not lines:
+                break
+            yield header, start, lines
+            start += len(lines)
+
+
+def _parse(header, lines):
+    return [dict(zip(header, values)) for values in csv.reader(lines) if values]
+
+
+def _row_text(row):
+    return "; ".join([f"{k}: {v}" for k, v in row.items()])
+
+
+def _typed(value):
+    """CSV string → int / float / str, so metadata filters can compare numbers."""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _row_metadata(rows):
+    """
+    Columns as filterable metadata: every column for a single row; for a
+    multi-row chunk only the columns whose value is shared by all rows.
+    """
+    first = rows[0]
+    return {
+        k: _typed(v) for k, v in first.items()
+        if k and v != "" and all(r.get(k) == v for r in rows[1:])
+    }
+
+
+# -----------------------------------------------------------
+# WORKERS: row chunks
+# -----------------------------------------------------------
+def _format_row_batch(args):
+    """Worker: parse a batch and emit chunks of `rows_per_chunk` rows."""
+    header, start, lines, rows_per_chunk = args
+    rows = _parse(header, lines)
+    chunks = []
+    for offset in range(0, len(rows), rows_per_chunk):
+        group = rows[offset:offset + rows_per_chunk]
+        first = start + offset
+        if rows_per_chunk == 1:
+            chunks.append({
+                "id": f"bmw-{first}",
+                "text": _row_text(group[0]),
+                "metadata": {**_row_metadata(group), "row_number": first}
+            })
+        else:
+            last = first + len(group) - 1
+            chunks.append({
+                "id": f"bmw-{first}-{last}",
+                "text": "\n".join(_row_text(r) for r in group),
+                "metadata": {**_row_metadata(group), "row_start": first, "row_end": last}
+            })
     return chunks
 
-# Save to JSONL file (one JSON object per line)
+
+# -----------------------------------------------------------
+# WORKERS: group-by rollups
+# -----------------------------------------------------------
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _aggregate_batch(args):
+    """
+    Worker: partial rollups for one batch.
+    Returns {group_key: [row_count, {metric: [sum, min, max, n]}]}.
+    """
+    header, start, lines, group_by, metrics = args
+    partial = {}
+    for row in _parse(header, lines):
+        key = tuple(row.get(c, "") for c in group_by)
+        entry = partial.setdefault(key, [0, {}])
+        entry[0] += 1
+        for m in metrics:
+            value = _to_float(row.get(m))
+            if value is None:
+                continue
+            stats = entry[1].get(m)
+            if stats is None:
+                entry[1][m] = [value, value, value, 1]
+            else:
+                stats[0] += value
+                stats[1] = min(stats[1], value)
+                stats[2] = max(stats[2], value)
+                stats[3] += 1
+    return partial
+
+
+def _merge_partial(total, partial):
+    for key, (count, metric_stats) in partial.items():
+        entry = total.setdefault(key, [0, {}])
+        entry[0] += count
+        for m, (s, lo, hi, n) in metric_stats.items():
+            stats = entry[1].get(m)
+            if stats is None:
+                entry[1][m] = [s, lo, hi, n]
+            else:
+                stats[0] += s
+                stats[1] = min(stats[1], lo)
+                stats[2] = max(stats[2], hi)
+                stats[3] += n
+
+
+def _fmt(value):
+    return str(int(value)) if float(value).is_integer() else f"{value:.2f}"
+
+
+def _slug(values):
+    return "-".join(re.sub(r"[^a-z0-9]+", "_", v.lower()).strip("_") or "na" for v in values)
+
+
+def _rollup_chunk(group_by, key, count, metric_stats, metrics):
+    parts = [f"{c}: {v}" for c, v in zip(group_by, key)]
+    parts.append(f"Rows: {count}")
+    for m in metrics:
+        if m not in metric_stats:
+            continue
+        s, lo, hi, n = metric_stats[m]
+        if m in ROLLUP_TOTALS:
+            parts.append(f"{m} total: {_fmt(s)}")
+        parts.append(f"{m} avg: {_fmt(s / n)}")
+        parts.append(f"{m} min: {_fmt(lo)}")
+        parts.append(f"{m} max: {_fmt(hi)}")
+    return {
+        "id": f"bmw-group-{_slug(key)}",
+        "text": "; ".join(parts),
+        "metadata": {**{c: _typed(v) for c, v in zip(group_by, key)}, "rows": count}
+    }
+
+
+# -----------------------------------------------------------
+# PIPELINE
+# -----------------------------------------------------------
+def _map(func, tasks, workers):
+    """Ordered map over tasks, in a process pool when workers > 1."""
+    if workers <= 1:
+        yield from map(func, tasks)
+        return
+    with Pool(processes=workers) as pool:
+        yield from pool.imap(func, tasks)
+
+
+def process_csv(input_path, rows_per_chunk=1, group_by=None, metrics=None,
+                workers=1, batch_rows=BATCH_ROWS):
+    """
+    Generator of chunks for `input_path`.
+
+    - default: one chunk per row ("bmw-<row>"), as before
+    - rows_per_chunk=N: N consecutive rows per chunk ("bmw-<first>-<last>")
+    - group_by=[cols]: one rollup chunk per distinct group (row count and
+      avg/min/max of `metrics`, totals for ROLLUP_TOTALS), e.g. Model/Year/Region
+
+    Batches of raw CSV lines are parsed and formatted in `workers`
+    processes; chunks are yielded in input order as batches complete.
+    """
+    if group_by:
+        metrics = [m for m in (metrics or ROLLUP_METRICS) if m not in group_by]
+        tasks = ((h, s, lines, group_by, metrics) for h, s, lines in iter_batches(input_path, batch_rows))
+        totals = {}
+        for partial in _map(_aggregate_batch, tasks, workers):
+            _merge_partial(totals, partial)
+        for key in sorted(totals):
+            count, metric_stats = totals[key]
+            yield _rollup_chunk(group_by, key, count, metric_stats, metrics)
+        return
+
+    # Keep chunks from spanning two batches
+    batch_rows = max(rows_per_chunk, batch_rows - batch_rows % rows_per_chunk)
+    tasks = ((h, s, lines, rows_per_chunk) for h, s, lines in iter_batches(input_path, batch_rows))
+    for chunks in _map(_format_row_batch, tasks, workers):
+        yield from chunks
+
+# Save to JSONL file (one JSON object per line), streaming
 def save_chunks_to_jsonl(chunks, output_path):
     os.makedirs(os.path.dirname(output_path), exist_ok=True)  # ✅ Create folders if needed
+    count = 0
     with open(output_path, 'w', encoding='utf-8') as f:
         for chunk in chunks:
             f.write(json.dumps(chunk) + '\n')
+            count += 1
+    return count
 
 # Run ETL
 if __name__ == "__main__":
-    chunks = process_csv(INPUT_CSV)
-    save_chunks_to_jsonl(chunks, OUTPUT_JSONL)
-    print(f"✅ Processed {len(chunks)} chunks into {OUTPUT_JSONL}")
+    parser = argparse.ArgumentParser(description="Chunk the BMW sales CSV into JSONL")
+    parser.add_argument("--input", default=INPUT_CSV)
+    parser.add_argument("--output", default=OUTPUT_JSONL)
+    parser.add_argument("--rows-per-chunk", type=int, default=1)
+    parser.add_argument("--group-by", default="", help="Comma-separated columns, e.g. Model,Year,Region")
+    parser.add_argument("--metrics", default=",".join(ROLLUP_METRICS), help="Numeric columns for rollups")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    chunks = process_csv(
+        args.input,
+        rows_per_chunk=max(1, args.rows_per_chunk),
+        group_by=[c for c in args.group_by.split(",") if c],
+        metrics=[m for m in args.metrics.split(",") if m],
+        workers=args.workers,
+    )
+    count = save_chunks_to_jsonl(chunks, args.output)
+    print(f"✅ Processed {count} chunks into {args.output}")
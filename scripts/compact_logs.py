@@ -0,0 +1,209 @@
+"""
+Compact the request logs (backend/logs/requests.jsonl and its rotated
+requests.<timestamp>.jsonl siblings) into one columnar .npz file and
+print query analytics: top queries, latency per model and per stage,
+and repeated queries worth caching or pre-warming.
+
+Run from the repository root:
+    python -m scripts.compact_logs                         # compact + report
+    python -m scripts.compact_logs --report-only           # report from an existing .npz
+"""
+import os
+import glob
+import json
+import time
+import argparse
+import numpy as np
+from backend.config.settings import LOG_FILE
+from backend.services.embeddings import normalize_query
+
+# Config
+INPUT_LOG = LOG_FILE or "backend/logs/requests.jsonl"
+OUTPUT_COLUMNS = "data/processed/request_log.npz"
+
+# Numeric columns: name → (dtype, entry → value)
+NUMERIC_COLUMNS = {
+    "k": (np.int16, lambda e: e.get("k", 0)),
+    "latency_ms": (np.float32, lambda e: e.get("latency_ms", np.nan)),
+    "top_score": (np.float32, lambda e: e["scores"][0] if e.get("scores") else np.nan),
+    "n_matches": (np.int16, lambda e: len(e.get("match_ids", []))),
+    "context_length": (np.int32, lambda e: e.get("context_length", 0)),
+    "answer_length": (np.int32, lambda e: e.get("answer_length", 0)),
+}
+
+
+# -----------------------------------------------------------
+# READING
+# -----------------------------------------------------------
+def log_files(path: str) -> list:
+    """The live log file plus its rotated siblings, oldest first."""
+    base, ext = os.path.splitext(path)
+    files = sorted(glob.glob(f"{glob.escape(base)}.*{ext}"))
+    return files + ([path] if os.path.exists(path) else [])
+
+
+def read_entries(paths):
+    """Yield log entries, skipping blank and malformed lines (e.g. a torn last write)."""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+# -----------------------------------------------------------
+# COMPACTION: entries → dict of NumPy columns
+# -----------------------------------------------------------
+def _dictionary(values):
+    categories, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+    return codes.astype(np.int32), categories
+
+
+def compact(entries) -> dict:
+    """
+    Columnar form of the log entries. Strings (model, normalised query)
+    are dictionary-encoded as <name>_codes + <name>_values; per-stage
+    timings become timing_<stage> columns with NaN where absent.
+    """
+    entries = list(entries)
+    columns = {}
+    stamps = [e.get("timestamp") or "NaT" for e in entries]
+    columns["timestamp"] = np.array(stamps, dtype="datetime64[us]").astype("datetime64[ms]")
+    for name, source in (("model", lambda e: e.get("model", "")),
+                         ("query", lambda e: normalize_query(e.get("query", "")))):
+        columns[f"{name}_codes"], columns[f"{name}_values"] = _dictionary([source(e) for e in entries])
+    for name, (dtype, source) in NUMERIC_COLUMNS.items():
+        columns[name] = np.array([source(e) for e in entries], dtype=dtype)
+
+    stages = sorted({s for e in entries for s in (e.get("timings") or {})})
+    for stage in stages:
+        columns[f"timing_{stage}"] = np.array(
+            [(e.get("timings") or {}).get(stage, np.nan) for e in entries], dtype=np.float32
+        )
+    return columns
+
+
+def save(columns: dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, **columns)
+
+
+def load(path: str) -> dict:
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+# -----------------------------------------------------------
+# ANALYTICS
+# -----------------------------------------------------------
+def _percentiles(values):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": int(len(values)), "mean": round(float(values.mean()), 2),
+            "p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)}
+
+
+def report(columns: dict, top: int = 10, min_repeats: int = 3) -> dict:
+    """
+    - top_queries: most frequent normalised queries with mean latency
+    - latency_by_model / latency_by_stage: count, mean, p50 / p95 / p99 (ms)
+    - cache_candidates: queries asked at least `min_repeats` times, by the
+      latency an answer cache would have saved (repeats after the first)
+    """
+    latency = columns["latency_ms"].astype(np.float64)
+    queries, query_values = columns["query_codes"], columns["query_values"]
+
+    counts = np.bincount(queries, minlength=len(query_values))
+    totals = np.bincount(queries, weights=np.nan_to_num(latency), minlength=len(query_values))
+    means = np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+    order = np.argsort(-counts, kind="stable")[:top]
+    top_queries = [
+        {"query": str(query_values[i]), "count": int(counts[i]), "mean_latency_ms": round(float(means[i]), 2)}
+        for i in order if counts[i]
+    ]
+
+    saved = (counts - 1).clip(min=0) * means
+    repeated = np.flatnonzero(counts >= min_repeats)
+    repeated = repeated[np.argsort(-saved[repeated], kind="stable")][:top]
+    cache_candidates = [
+        {"query": str(query_values[i]), "count": int(counts[i]), "saved_ms": round(float(saved[i]), 2)}
+        for i in repeated
+    ]
+
+    models = columns["model_codes"]
+    latency_by_model = {
+        str(name): _percentiles(latency[models == code])
+        for code, name in enumerate(columns["model_values"])
+    }
+    latency_by_stage = {
+        name[len("timing_"):]: _percentiles(values.astype(np.float64))
+        for name, values in columns.items() if name.startswith("timing_")
+    }
+    return {
+        "requests": int(len(latency)),
+        "top_queries": top_queries,
+        "latency_by_model": latency_by_model,
+        "latency_by_stage": {s: p for s, p in latency_by_stage.items() if p},
+        "cache_candidates": cache_candidates,
+    }
+
+
+def _print_report(result: dict):
+    print(f"\n📊 {result['requests']} requests")
+    print("\nTop queries:")
+    for q in result["top_queries"]:
+        print(f"  {q['count']:>6}  {q['mean_latency_ms']:>9.1f} ms  {q['query']}")
+    print(f"\n{'model':<16} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, p in result["latency_by_model"].items():
+        if p:
+            print(f"{name:<16} {p['count']:>7} {p['p50']:>9.1f} {p['p95']:>9.1f} {p['p99']:>9.1f}")
+    if result["latency_by_stage"]:
+        print(f"\n{'stage':<16} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, p in result["latency_by_stage"].items():
+            print(f"{name:<16} {p['count']:>7} {p['p50']:>9.1f} {p['p95']:>9.1f} {p['p99']:>9.1f}")
+    print("\nCache candidates (repeated queries, latency a cache would have saved):")
+    for q in result["cache_candidates"] or [{"count": 0, "saved_ms": 0.0, "query": "(none)"}]:
+        print(f"  {q['count']:>6}  {q['saved_ms']:>11.1f} ms  {q['query']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact request logs into columns and report query analytics")
+    parser.add_argument("--input", default=INPUT_LOG, help="Live log file; rotated siblings are included")
+    parser.add_argument("--output", default=OUTPUT_COLUMNS)
+    parser.add_argument("--report-only", action="store_true", help="Skip compaction, report from --output")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--min-repeats", type=int, default=3, help="Minimum count for a cache candidate")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.report_only:
+        columns = load(args.output)
+    else:
+        files = log_files(args.input)
+        if not files:
+            print(f"❌ No request logs found at {args.input}")
+            return
+        start = time.time()
+        columns = compact(read_entries(files))
+        save(columns, args.output)
+        size = os.path.getsize(args.output)
+        raw = sum(os.path.getsize(f) for f in files)
+        print(f"✅ Compacted {len(columns['latency_ms'])} entries from {len(files)} file(s) "
+              f"({raw / 1024:.1f} KB → {size / 1024:.1f} KB) in {time.time() - start:.2f}s → {args.output}")
+
+    result = report(columns, top=args.top, min_repeats=args.min_repeats)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        _print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Convert bmw_embeddings.jsonl into the binary embedding store
+(memory-mappable float32 matrix + id/text/metadata columns).
+
+Run from the repository root:
+    python -m scripts.convert_embeddings_to_store --normalize
+"""
+import os
+import time
+import argparse
+from backend.services.embedding_store import convert_jsonl, EmbeddingStore
+
+# Config
+INPUT_EMBEDDINGS = "data/processed/bmw_embeddings.jsonl"
+OUTPUT_STORE = "data/processed/bmw_store"
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert embeddings JSONL to the binary store format")
+    parser.add_argument("--input", default=INPUT_EMBEDDINGS)
+    parser.add_argument("--output", default=OUTPUT_STORE)
+    parser.add_argument("--normalize", action="store_true",
+                        help="Store unit-length vectors so the local index can use them zero-copy")
+    args = parser.parse_args()
+
+    start = time.time()
+    count = convert_jsonl(args.input, args.output, normalize=args.normalize)
+    elapsed = time.time() - start
+
+    store = EmbeddingStore.open(args.output)
+    print(f"✅ Wrote {count} vectors (dim {store.dim}) to {args.output} in {elapsed:.1f}s")
+    print(f"   JSONL: {os.path.getsize(args.input) / 1e6:.1f} MB → store: {_dir_size(args.output) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
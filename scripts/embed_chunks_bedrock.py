@@ -1,15 +1,47 @@
-import boto3
 import json
 import os
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
 from tqdm import tqdm  # progress bar (install with `pip install tqdm`)
 
+# Also runnable as `python scripts/embed_chunks_bedrock.py` from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from backend.config.settings import AWS_MAX_POOL_CONNECTIONS
+from backend.services.aws_clients import get_client
+
 # Config
 INPUT_CHUNKS = "data/processed/bmw_chunks.jsonl"
 OUTPUT_EMBEDDINGS = "data/processed/bmw_embeddings.jsonl"
 REGION = "us-east-1"  # update if Bedrock is in another region
 
-# Create Bedrock client
-bedrock = boto3.client("bedrock-runtime", region_name=REGION)
+# Concurrency / retry defaults
+DEFAULT_WORKERS = 8
+MAX_RETRIES = 8
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+
+# Error codes Bedrock uses when we should slow down and retry
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelTimeoutException",
+    "InternalServerException",
+}
+
+# Shared Bedrock client, built on first use. Throttling is retried by
+# AdaptiveThrottle below, so botocore's own retries are switched off.
+def _bedrock():
+    return get_client("bedrock-runtime", region_name=REGION, max_attempts=1)
 
 def embed_text(text):
     """
@@ -20,7 +52,7 @@ def embed_text(text):
         "inputText": text
     }
 
-    response = bedrock.invoke_model(
+    response = _bedrock().invoke_model(
         modelId="amazon.titan-embed-text-v1",
         body=json.dumps(body),
         contentType="application/json",
@@ -30,33 +62,207 @@ def embed_text(text):
     response_body = json.loads(response["body"].read())
     return response_body["embedding"]
 
+
+# -----------------------------------------------------------
+# ADAPTIVE THROTTLE (AIMD concurrency limit)
+# -----------------------------------------------------------
+class AdaptiveThrottle:
+    """
+    Caps the number of in-flight Bedrock calls.
+
+    Every throttling error halves the limit (multiplicative decrease);
+    every `increase_after` consecutive successes raise it by one again
+    (additive increase), up to `max_limit`.
+    """
+
+    def __init__(self, max_limit: int, increase_after: int = 20):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.increase_after = increase_after
+        self.in_flight = 0
+        self.throttle_events = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool = False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttle_events += 1
+                self._successes = 0
+                self.limit = max(1, self.limit // 2)
+            else:
+                self._successes += 1
+                if self._successes >= self.increase_after and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
+    return False
+
+
+def embed_with_retry(text, throttle: AdaptiveThrottle, max_retries: int = MAX_RETRIES):
+    """
+    embed_text() with adaptive throttling and exponential backoff
+    (full jitter) on Bedrock throttling / transient errors.
+    """
+    for attempt in range(max_retries + 1):
+        throttle.acquire()
+        try:
+            embedding = embed_text(text)
+        except Exception as e:
+            throttle.release(throttled=_is_retryable(e))
+            if not _is_retryable(e) or attempt == max_retries:
+                raise
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+            time.sleep(random.uniform(0, delay))
+            continue
+        throttle.release()
+        return embedding
+
+
+# -----------------------------------------------------------
+# CHECKPOINTING (the output file is the checkpoint)
+# -----------------------------------------------------------
+def load_completed_ids(output_path):
+    """
+    Return the ids already embedded in `output_path`.
+    A partially written last line (crash mid-write) is truncated away.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    valid_bytes = 0
+    with open(output_path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                done.add(json.loads(raw)["id"])
+            except (ValueError, KeyError):
+                break
+            valid_bytes += len(raw)
+
+    if valid_bytes != os.path.getsize(output_path):
+        print(f"⚠️  Truncating incomplete tail of {output_path}")
+        with open(output_path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return done
+
+
+def iter_pending_chunks(input_path, completed_ids):
+    with open(input_path, "r", encoding="utf-8") as infile:
+        for line in infile:
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if chunk["id"] not in completed_ids:
+                yield chunk
+
+
+def embed_chunks(chunks, outfile, workers=DEFAULT_WORKERS, max_retries=MAX_RETRIES, progress=None):
+    """
+    Embed `chunks` concurrently and write records to `outfile` in input
+    order. At most `workers * 4` chunks are buffered at once, so memory
+    stays flat regardless of corpus size.
+
+    Returns:
+        (number of records written, AdaptiveThrottle with stats)
+    """
+    throttle = AdaptiveThrottle(max_limit=workers)
+    window = deque()
+    written = 0
+
+    def flush_one():
+        chunk, future = window.popleft()
+        record = {
+            "id": chunk["id"],
+            "embedding": future.result(),
+            "text": chunk["text"],
+            "metadata": chunk.get("metadata", {})
+        }
+        outfile.write(json.dumps(record) + "\n")
+        outfile.flush()
+        if progress is not None:
+            progress.update(1)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for chunk in chunks:
+                window.append((chunk, pool.submit(embed_with_retry, chunk["text"], throttle, max_retries)))
+                if len(window) >= workers * 4:
+                    flush_one()
+                    written += 1
+            while window:
+                flush_one()
+                written += 1
+        except BaseException:
+            # Stop queued work; everything flushed so far is a valid checkpoint
+            for _, future in window:
+                future.cancel()
+            raise
+
+    return written, throttle
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Embed chunks with Titan via Bedrock (resumable)")
+    parser.add_argument("--input", default=INPUT_CHUNKS)
+    parser.add_argument("--output", default=OUTPUT_EMBEDDINGS)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Max concurrent Bedrock calls")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES)
+    parser.add_argument("--restart", action="store_true", help="Ignore existing output and start over")
+    parser.add_argument("--store", default=None,
+                        help="Also write a binary embedding store directory (e.g. data/processed/bmw_store)")
+    args = parser.parse_args()
+
     # Ensure output directory exists
-    os.makedirs(os.path.dirname(OUTPUT_EMBEDDINGS), exist_ok=True)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
 
-    with open(INPUT_CHUNKS, "r", encoding="utf-8") as infile, \
-         open(OUTPUT_EMBEDDINGS, "w", encoding="utf-8") as outfile:
+    if args.restart and os.path.exists(args.output):
+        os.remove(args.output)
 
-        print(f"🔄 Generating embeddings for chunks in {INPUT_CHUNKS}...")
+    completed = load_completed_ids(args.output)
+    if completed:
+        print(f"⏩ Resuming: {len(completed)} chunks already embedded in {args.output}")
 
-        for line in tqdm(infile, desc="Embedding chunks"):
-            chunk = json.loads(line)
-            text = chunk["text"]
+    if args.workers > AWS_MAX_POOL_CONNECTIONS:
+        print(f"⚠️ {args.workers} workers share {AWS_MAX_POOL_CONNECTIONS} pooled connections; "
+              f"set AWS_MAX_POOL_CONNECTIONS >= {args.workers}")
 
-            # Generate embedding
-            embedding = embed_text(text)
+    print(f"🔄 Generating embeddings for chunks in {args.input} with {args.workers} workers...")
+    start = time.time()
 
-            # Combine with metadata
-            record = {
-                "id": chunk["id"],
-                "embedding": embedding,
-                "text": text,
-                "metadata": chunk["metadata"]
-            }
+    with open(args.output, "a", encoding="utf-8") as outfile, \
+         tqdm(desc="Embedding chunks") as progress:
+        written, throttle = embed_chunks(
+            iter_pending_chunks(args.input, completed),
+            outfile,
+            workers=args.workers,
+            max_retries=args.max_retries,
+            progress=progress,
+        )
 
-            outfile.write(json.dumps(record) + "\n")
+    elapsed = time.time() - start
+    rate = written / elapsed if elapsed else 0.0
+    print(f"✅ Embedded {written} new chunks in {elapsed:.1f}s ({rate:.1f}/s, "
+          f"{throttle.throttle_events} throttling retries) → {args.output}")
 
-    print(f"✅ All embeddings generated and saved to {OUTPUT_EMBEDDINGS}")
+    if args.store:
+        from backend.services.embedding_store import convert_jsonl
+        count = convert_jsonl(args.output, args.store)
+        print(f"✅ Wrote binary embedding store with {count} vectors → {args.store}")
 
 if __name__ == "__main__":
     main()
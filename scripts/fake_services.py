@@ -0,0 +1,235 @@
+"""
+Local stand-ins for Bedrock Runtime and the Pinecone data plane, used by
+scripts/load_test.py to load-test the real FastAPI app without AWS or
+Pinecone. Each is a small threaded HTTP server speaking just enough of
+the real wire format for boto3 / the Pinecone SDK:
+
+  FakeBedrock        POST /model/<modelId>/invoke   (Titan embeddings,
+                     Claude 3 / Titan Text / Mistral answers). Response
+                     streaming is not implemented.
+  FakeVectorStore    POST /query                    (Pinecone index host)
+
+Both sleep for a latency drawn from a configurable distribution, and
+FakeBedrock answers a fraction of calls with ThrottlingException (429).
+
+Run standalone (e.g. to point a local uvicorn at them):
+    python -m scripts.fake_services --generate-latency lognormal:800:0.4 --throttle-rate 0.02
+"""
+import re
+import json
+import math
+import time
+import zlib
+import random
+import argparse
+import threading
+from urllib.parse import unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+EMBED_DIMENSION = 1536
+CORPUS_SIZE = 50000
+
+MODELS = ["3 Series", "5 Series", "7 Series", "M3", "M5", "X1", "X3", "X5", "X6", "i3", "i8"]
+REGIONS = ["Africa", "Asia", "Europe", "Middle East", "North America", "South America"]
+
+
+# -----------------------------------------------------------
+# LATENCY DISTRIBUTIONS
+# -----------------------------------------------------------
+def parse_latency(spec: str):
+    """
+    Latency sampler (→ seconds) from a spec string, in milliseconds:
+        fixed:50            always 50 ms
+        uniform:20:80       uniform between 20 and 80 ms
+        lognormal:300:0.5   median 300 ms, log-space sigma 0.5 (long tail)
+    """
+    kind, *params = spec.split(":")
+    try:
+        values = [float(p) for p in params]
+        if kind == "fixed" and len(values) == 1:
+            return lambda: values[0] / 1000
+        if kind == "uniform" and len(values) == 2:
+            return lambda: random.uniform(*values) / 1000
+        if kind == "lognormal" and len(values) == 2:
+            mu = math.log(values[0])
+            return lambda: random.lognormvariate(mu, values[1]) / 1000
+    except ValueError:
+        pass
+    raise ValueError(f"Bad latency spec '{spec}' (fixed:MS, uniform:LO:HI or lognormal:MEDIAN:SIGMA)")
+
+
+# -----------------------------------------------------------
+# SHARED SERVER PLUMBING
+# -----------------------------------------------------------
+class _FakeServer:
+    """Threaded HTTP server on 127.0.0.1 that calls self.handle(path, body) per POST."""
+
+    def __init__(self, port: int = 0):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"       # keep-alive, like the real services
+            disable_nagle_algorithm = True      # headers and body go out as separate writes
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b"{}"
+                try:
+                    status, payload, headers = fake.handle(self.path, json.loads(raw or b"{}"))
+                except Exception as e:
+                    status, payload, headers = 500, {"message": str(e)}, {}
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.calls = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def _count(self, throttled: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.throttled += int(throttled)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# -----------------------------------------------------------
+# FAKE BEDROCK RUNTIME
+# -----------------------------------------------------------
+_INVOKE_PATH = re.compile(r"^/model/([^/]+)/invoke$")
+
+
+def fake_embedding(text: str, dimension: int = EMBED_DIMENSION):
+    """Deterministic unit vector for `text` (same text → same vector)."""
+    rng = random.Random(zlib.crc32(text.encode("utf-8")))
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimension)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [round(v / norm, 6) for v in vector]
+
+
+class FakeBedrock(_FakeServer):
+    def __init__(self, embed_latency: str = "fixed:20", generate_latency: str = "lognormal:400:0.3",
+                 throttle_rate: float = 0.0, port: int = 0, dimension: int = EMBED_DIMENSION):
+        super().__init__(port)
+        self.embed_latency = parse_latency(embed_latency)
+        self.generate_latency = parse_latency(generate_latency)
+        self.throttle_rate = throttle_rate
+        self.dimension = dimension
+
+    def handle(self, path, body):
+        found = _INVOKE_PATH.match(path)
+        if not found:
+            return 404, {"message": f"Unsupported path {path}"}, {"x-amzn-ErrorType": "ResourceNotFoundException"}
+        model_id = unquote(found.group(1))
+
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            self._count(throttled=True)
+            return 429, {"message": "Too many requests, please wait before trying again."}, \
+                {"x-amzn-ErrorType": "ThrottlingException"}
+        self._count()
+
+        if "embed" in model_id:
+            time.sleep(self.embed_latency())
+            text = body.get("inputText", "")
+            return 200, {"embedding": fake_embedding(text, self.dimension),
+                         "inputTextTokenCount": len(text.split())}, {}
+
+        time.sleep(self.generate_latency())
+        answer = "Based on the retrieved BMW sales records, the X5 had the highest sales volume."
+        if model_id.startswith("anthropic."):
+            return 200, {"role": "assistant", "type": "message", "stop_reason": "end_turn",
+                         "content": [{"type": "text", "text": answer}]}, {}
+        if model_id.startswith("mistral."):
+            return 200, {"outputs": [{"text": answer, "stop_reason": "stop"}]}, {}
+        return 200, {"outputText": answer}, {}
+
+
+# -----------------------------------------------------------
+# FAKE VECTOR STORE (Pinecone data plane)
+# -----------------------------------------------------------
+def fake_chunk(i: int) -> dict:
+    model, region, year = MODELS[i % len(MODELS)], REGIONS[i % len(REGIONS)], 2010 + i % 15
+    return {
+        "text": f"Model: {model}; Year: {year}; Region: {region}; Sales_Volume: {1000 + (i * 7919) % 9000}",
+        "Model": model, "Region": region, "Year": year, "row_number": i,
+    }
+
+
+class FakeVectorStore(_FakeServer):
+    def __init__(self, latency: str = "fixed:15", port: int = 0, corpus_size: int = CORPUS_SIZE):
+        super().__init__(port)
+        self.latency = parse_latency(latency)
+        self.corpus_size = corpus_size
+
+    def handle(self, path, body):
+        if path != "/query":
+            return 404, {"message": f"Unsupported path {path}"}, {}
+        self._count()
+        time.sleep(self.latency())
+
+        # Same vector → same matches; metadata filters are accepted but not applied
+        top_k = int(body.get("topK", 5))
+        vector = body.get("vector") or [0.0]
+        rng = random.Random(zlib.crc32(json.dumps(vector[:8]).encode("utf-8")))
+        ids = rng.sample(range(self.corpus_size), min(top_k, self.corpus_size))
+        matches = [
+            {"id": f"bmw-{i}", "score": round(0.9 - 0.01 * rank, 4),
+             **({"metadata": fake_chunk(i)} if body.get("includeMetadata") else {})}
+            for rank, i in enumerate(ids)
+        ]
+        return 200, {"matches": matches, "namespace": body.get("namespace", "")}, {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fake Bedrock and Pinecone servers")
+    parser.add_argument("--bedrock-port", type=int, default=8901)
+    parser.add_argument("--vector-port", type=int, default=8902)
+    parser.add_argument("--embed-latency", default="fixed:20")
+    parser.add_argument("--generate-latency", default="lognormal:400:0.3")
+    parser.add_argument("--vector-latency", default="fixed:15")
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    bedrock = FakeBedrock(args.embed_latency, args.generate_latency, args.throttle_rate, port=args.bedrock_port)
+    vectors = FakeVectorStore(args.vector_latency, port=args.vector_port)
+    with bedrock, vectors:
+        print(f"✅ Fake Bedrock on {bedrock.url}, fake Pinecone index on {vectors.url}")
+        print(f"   BEDROCK_ENDPOINT_URL={bedrock.url} PINECONE_HOST={vectors.url} VECTOR_BACKEND=pinecone")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Incremental re-ingestion driven by content hashes.
+
+Compares bmw_chunks.jsonl against a manifest of chunk id → content hash
+from the previous run, then:
+  - embeds only new or changed chunks (Titan via Bedrock)
+  - rewrites bmw_embeddings.jsonl reusing vectors of unchanged chunks
+  - upserts new/changed vectors and deletes vanished ids in Pinecone
+  - saves the updated manifest and prints a diff summary
+
+The manifest tracks the local embeddings file and the Pinecone index
+separately, so a --no-pinecone run leaves the next Pinecone run with the
+full set of pending upserts / deletes. Without a manifest, hashes are
+seeded from an existing embeddings file instead of re-embedding it.
+
+Run from the repository root:
+    python -m scripts.chunk_csv_to_jsonl
+    python -m scripts.incremental_ingest            # or --dry-run
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+from contextlib import ExitStack
+from dotenv import load_dotenv
+from scripts.embed_chunks_bedrock import embed_chunks, DEFAULT_WORKERS
+from scripts.push_embeddings_to_pinecone import batch_upload
+
+load_dotenv()
+
+# Config
+INPUT_CHUNKS = "data/processed/bmw_chunks.jsonl"
+EMBEDDINGS_FILE = "data/processed/bmw_embeddings.jsonl"
+MANIFEST_FILE = "data/processed/ingest_manifest.json"
+INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "bmw-rag")
+DELETE_BATCH = 1000
+
+
+# -----------------------------------------------------------
+# HASHING + MANIFEST
+# -----------------------------------------------------------
+def chunk_hash(chunk) -> str:
+    """Content hash over everything that ends up in the index."""
+    payload = json.dumps(
+        {"text": chunk["text"], "metadata": chunk.get("metadata", {})},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path):
+    """
+    {'chunks': id → hash in the local embeddings file,
+     'indexed': id → hash last synced to the vector index}, or None.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    chunks = data.get("chunks", {})
+    # Version 1 manifests had a single map, assumed to be synced
+    return {"chunks": chunks, "indexed": data.get("indexed", chunks)}
+
+
+def save_manifest(path, chunks, indexed):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 2, "updated_at": time.time(), "chunks": chunks, "indexed": indexed}, f)
+    os.replace(tmp, path)
+
+
+def seed_hashes(embeddings_path):
+    """Content hashes of the records already in an embeddings file (first run, no manifest)."""
+    hashes = {}
+    if os.path.exists(embeddings_path):
+        with open(embeddings_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    hashes[record["id"]] = chunk_hash(record)
+    return hashes
+
+
+def scan_chunks(path):
+    """Return (ordered ids, {id: hash}) for the chunk file."""
+    order, hashes = [], {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                chunk = json.loads(line)
+                order.append(chunk["id"])
+                hashes[chunk["id"]] = chunk_hash(chunk)
+    return order, hashes
+
+
+def diff_manifest(old, new):
+    """Classify ids as added / changed / removed / unchanged."""
+    added = [i for i in new if i not in old]
+    changed = [i for i in new if i in old and old[i] != new[i]]
+    removed = [i for i in old if i not in new]
+    unchanged = [i for i in new if i in old and old[i] == new[i]]
+    return {"added": added, "changed": changed, "removed": removed, "unchanged": unchanged}
+
+
+def format_diff(diff, sample=5):
+    lines = []
+    for key in ("added", "changed", "removed", "unchanged"):
+        ids = diff[key]
+        line = f"  {key:<10} {len(ids):>7}"
+        if ids and key != "unchanged":
+            line += "  e.g. " + ", ".join(ids[:sample]) + (" ..." if len(ids) > sample else "")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# -----------------------------------------------------------
+# EMBEDDINGS FILE MERGE (offset index, no full load)
+# -----------------------------------------------------------
+# Records are written as json.dumps({"id": ..., ...}), so the id can be
+# read from the line prefix without parsing a 1536-float embedding
+_ID_PREFIX = re.compile(rb'^\{"id": ("(?:[^"\\]|\\.)*")')
+
+
+def _line_id(raw):
+    match = _ID_PREFIX.match(raw)
+    try:
+        return json.loads(match.group(1)) if match else json.loads(raw)["id"]
+    except (ValueError, KeyError):
+        return None
+
+
+def index_offsets(path):
+    """Map id → (byte offset, length) of its line in a JSONL file."""
+    offsets = {}
+    if not os.path.exists(path):
+        return offsets
+    with open(path, "rb") as f:
+        pos = 0
+        for raw in f:
+            if raw.strip():
+                chunk_id = _line_id(raw)
+                if chunk_id is not None:
+                    offsets[chunk_id] = (pos, len(raw))
+            pos += len(raw)
+    return offsets
+
+
+def merge_embeddings(order, old_path, new_path, out_path):
+    """
+    Write out_path with one record per id in `order`, taking the line
+    from new_path when present, else from old_path.
+    """
+    old_offsets = index_offsets(old_path)
+    new_offsets = index_offsets(new_path)
+    tmp = out_path + ".tmp"
+
+    with ExitStack() as stack:
+        out = stack.enter_context(open(tmp, "wb"))
+        old_f = stack.enter_context(open(old_path, "rb")) if old_offsets else None
+        new_f = stack.enter_context(open(new_path, "rb")) if new_offsets else None
+        for chunk_id in order:
+            if chunk_id in new_offsets:
+                src, (pos, length) = new_f, new_offsets[chunk_id]
+            else:
+                src, (pos, length) = old_f, old_offsets[chunk_id]
+            src.seek(pos)
+            line = src.read(length)
+            out.write(line if line.endswith(b"\n") else line + b"\n")
+
+    os.replace(tmp, out_path)
+
+
+def iter_records(path, ids):
+    """Records for `ids` only, read by offset (other lines are not parsed)."""
+    offsets = index_offsets(path)
+    with open(path, "rb") as f:
+        for chunk_id, (pos, length) in offsets.items():
+            if chunk_id in ids:
+                f.seek(pos)
+                yield json.loads(f.read(length))
+
+
+# -----------------------------------------------------------
+# VECTOR INDEX SYNC
+# -----------------------------------------------------------
+def sync_index(index, upsert_records, delete_ids):
+    """Upsert new/changed vectors and delete removed ids."""
+    stats = batch_upload(upsert_records, target=index, show_progress=False)
+    if stats["failed_batches"]:
+        # Leave the manifest's index state untouched so the next run retries these ids
+        raise RuntimeError(f"{stats['failed_batches']} upsert batches failed")
+
+    for start in range(0, len(delete_ids), DELETE_BATCH):
+        index.delete(ids=delete_ids[start:start + DELETE_BATCH])
+
+
+def _pinecone_index():
+    from pinecone import Pinecone
+    return Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(INDEX_NAME)
+
+
+def run(chunks_path, embeddings_path, manifest_path, index=None, workers=DEFAULT_WORKERS, dry_run=False):
+    """
+    Perform one incremental ingestion pass. Returns the diff dict.
+    `index` is any object with upsert(vectors=...) / delete(ids=...),
+    or None to only refresh the local embeddings file.
+    """
+    order, new_hashes = scan_chunks(chunks_path)
+    manifest = load_manifest(manifest_path)
+    if manifest is None:
+        # First run: vectors already on disk count as embedded; the index
+        # state is unknown, so everything is upserted once
+        manifest = {"chunks": seed_hashes(embeddings_path), "indexed": {}}
+    diff = diff_manifest(manifest["chunks"], new_hashes)
+
+    # Unchanged chunks whose vector is missing locally must be embedded too
+    existing = index_offsets(embeddings_path)
+    missing = [i for i in diff["unchanged"] if i not in existing]
+    to_embed = set(diff["added"]) | set(diff["changed"]) | set(missing)
+    diff["reembedded_missing"] = missing
+    index_diff = diff_manifest(manifest["indexed"], new_hashes)
+    diff["upserted"] = index_diff["added"] + index_diff["changed"] if index is not None else []
+    diff["deleted"] = index_diff["removed"] if index is not None else []
+
+    if dry_run:
+        return diff
+
+    new_path = embeddings_path + ".delta"
+    with open(chunks_path, "r", encoding="utf-8") as f, open(new_path, "w", encoding="utf-8") as out:
+        pending = (c for c in map(json.loads, filter(str.strip, f)) if c["id"] in to_embed)
+        embed_chunks(pending, out, workers=workers)
+
+    os.makedirs(os.path.dirname(embeddings_path) or ".", exist_ok=True)
+    merge_embeddings(order, embeddings_path, new_path, embeddings_path)
+    os.remove(new_path)
+    # The local file is current; the index only advances once synced
+    save_manifest(manifest_path, new_hashes, manifest["indexed"])
+
+    if index is not None:
+        sync_index(index, iter_records(embeddings_path, set(diff["upserted"])), diff["deleted"])
+        save_manifest(manifest_path, new_hashes, new_hashes)
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed and upsert only new or changed chunks")
+    parser.add_argument("--chunks", default=INPUT_CHUNKS)
+    parser.add_argument("--embeddings", default=EMBEDDINGS_FILE)
+    parser.add_argument("--manifest", default=MANIFEST_FILE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--no-pinecone", action="store_true", help="Only refresh the local embeddings file")
+    parser.add_argument("--dry-run", action="store_true", help="Report the diff without embedding or upserting")
+    args = parser.parse_args()
+
+    start = time.time()
+    index = None if (args.no_pinecone or args.dry_run) else _pinecone_index()
+    diff = run(args.chunks, args.embeddings, args.manifest, index=index,
+               workers=args.workers, dry_run=args.dry_run)
+
+    print("📋 Ingestion diff:")
+    print(format_diff(diff))
+    if diff["reembedded_missing"]:
+        print(f"  (+{len(diff['reembedded_missing'])} unchanged chunks re-embedded: missing locally)")
+    if args.dry_run:
+        print("ℹ️  Dry run: nothing embedded, upserted or saved.")
+        return
+
+    touched = len(diff["added"]) + len(diff["changed"]) + len(diff["removed"])
+    print(f"✅ Incremental ingest finished in {time.time() - start:.1f}s ({touched} ids touched)")
+    if index is None:
+        print("ℹ️  Pinecone not synced; the next run without --no-pinecone upserts / deletes the pending ids.")
+    else:
+        print(f"  Pinecone: {len(diff['upserted'])} upserted, {len(diff['deleted'])} deleted")
+    if touched or diff["upserted"] or diff["deleted"]:
+        print("ℹ️  Index contents changed: bump INDEX_VERSION so cached answers are dropped.")
+
+
+if __name__ == "__main__":
+    main()
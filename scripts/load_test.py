@@ -0,0 +1,287 @@
+"""
+Load test for /api/ask: starts fake Bedrock and Pinecone servers
+(scripts/fake_services.py), runs the real FastAPI app under uvicorn
+against them, and drives it at several concurrency levels with a
+closed-loop load generator. Reports requests/s and p50/p95/p99 latency
+per level and compares them with a stored baseline.
+
+Run from the repository root:
+    python -m scripts.load_test --levels 1,8,32 --requests 300
+    python -m scripts.load_test --save-baseline                  # record this machine's baseline
+    python -m scripts.load_test --generate-latency lognormal:800:0.6 --throttle-rate 0.05
+    python -m scripts.load_test --url http://localhost:8000      # an already running server (no fakes)
+
+Exits with status 1 if throughput drops or p95 rises by more than
+--tolerance against the baseline (same fake-service settings only).
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import subprocess
+import numpy as np
+import httpx
+from scripts.fake_services import FakeBedrock, FakeVectorStore, parse_latency
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Config
+BASELINE_FILE = "data/benchmarks/load_baseline.json"
+DEFAULT_LEVELS = "1,4,16,32"
+DEFAULT_TOLERANCE = 0.2
+
+QUESTIONS = [
+    "Which BMW model sold best in {region} in {year}?",
+    "How did {model} prices change around {year}?",
+    "Tell me about {model} sales in {region}",
+    "What colours were popular for the {model} in {year}?",
+]
+MODELS = ["X5", "X3", "i8", "M3", "5 Series"]
+REGIONS = ["Europe", "Asia", "North America", "Africa"]
+
+
+# -----------------------------------------------------------
+# SERVER UNDER TEST
+# -----------------------------------------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_env(bedrock_url: str, vector_url: str) -> dict:
+    """Environment for main.py talking only to the fakes."""
+    return dict(
+        os.environ,
+        BEDROCK_ENDPOINT_URL=bedrock_url,
+        PINECONE_HOST=vector_url,
+        PINECONE_API_KEY="load-test",
+        VECTOR_BACKEND="pinecone",
+        RETRIEVAL_MODE="vector",
+        ANALYTICS_ENABLED="false",              # every question takes the embed → search → generate path
+        AWS_ACCESS_KEY_ID="load-test",
+        AWS_SECRET_ACCESS_KEY="load-test",
+        AWS_DEFAULT_REGION="us-east-1",
+        RATE_LIMIT_MAX_REQUESTS="1000000000",
+        LOG_FILE="",
+        LOG_ECHO_STDOUT="false",
+        METRICS_ENABLED="false",
+        WARM_UP_ON_INIT="true",
+    )
+
+
+def start_app(env: dict, port: int, log=subprocess.DEVNULL, timeout: float = 30.0):
+    """Launch `uvicorn main:app` and wait until GET / answers."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+        try:
+            if httpx.get(url + "/", timeout=1.0).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"App did not start within {timeout}s")
+
+
+# -----------------------------------------------------------
+# LOAD GENERATOR
+# -----------------------------------------------------------
+def make_question(i: int, repeat_fraction: float = 0.0, rng=None) -> str:
+    """Distinct question per request (cache misses), unless picked for a repeat."""
+    if rng is not None and rng.random() < repeat_fraction:
+        return QUESTIONS[0].format(region="Europe", year=2020)
+    template = QUESTIONS[i % len(QUESTIONS)]
+    question = template.format(model=MODELS[i % len(MODELS)], region=REGIONS[i % len(REGIONS)],
+                               year=2010 + i % 15)
+    return f"{question} (request {i})"
+
+
+async def run_level(url: str, concurrency: int, requests: int, model: str = "mistral", k: int = 5,
+                    repeat_fraction: float = 0.0, offset: int = 0, timeout: float = 120.0) -> dict:
+    """
+    `concurrency` workers each send /api/ask requests back to back until
+    `requests` have completed. Returns rps, latency percentiles (ms) and
+    the count of each non-200 status.
+    """
+    rng = np.random.default_rng(offset)
+    latencies, statuses = [], {}
+    next_index = iter(range(offset, offset + requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        async def worker():
+            for i in next_index:
+                payload = {"query": make_question(i, repeat_fraction, rng), "model": model, "k": k}
+                start = time.perf_counter()
+                try:
+                    status = (await client.post("/api/ask", json=payload)).status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                ms = (time.perf_counter() - start) * 1000
+                if status == 200:
+                    latencies.append(ms)
+                else:
+                    statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    result = {"concurrency": concurrency, "requests": requests, "ok": len(latencies),
+              "rps": round(len(latencies) / elapsed, 2), "errors": statuses}
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        result.update(p50_ms=round(float(p50), 1), p95_ms=round(float(p95), 1), p99_ms=round(float(p99), 1))
+    return result
+
+
+def run_load(url: str, levels, requests: int, warmup: int = 10, **options) -> list:
+    if warmup:
+        asyncio.run(run_level(url, min(4, max(levels)), warmup, offset=10 ** 6, **options))
+    results = []
+    for n, level in enumerate(levels):
+        result = asyncio.run(run_level(url, level, requests, offset=n * requests, **options))
+        results.append(result)
+        print(format_row(result))
+    return results
+
+
+def format_row(result: dict) -> str:
+    errors = ", ".join(f"{s}×{c}" for s, c in result["errors"].items()) or "-"
+    return (f"{result['concurrency']:>11} {result['rps']:>9.1f} {result.get('p50_ms', float('nan')):>9.1f} "
+            f"{result.get('p95_ms', float('nan')):>9.1f} {result.get('p99_ms', float('nan')):>9.1f}   {errors}")
+
+
+# -----------------------------------------------------------
+# BASELINES
+# -----------------------------------------------------------
+def check_regressions(results: list, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Regressions against baseline['levels'] (keyed by concurrency): lower
+    rps or higher p95 by more than `tolerance`, or any new errors.
+    """
+    problems = []
+    for result in results:
+        base = baseline.get("levels", {}).get(str(result["concurrency"]))
+        if not base:
+            continue
+        level = f"concurrency {result['concurrency']}"
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            problems.append(f"{level}: {result['rps']} req/s vs baseline {base['rps']}")
+        if "p95_ms" in base and result.get("p95_ms", float("inf")) > base["p95_ms"] * (1 + tolerance):
+            problems.append(f"{level}: p95 {result.get('p95_ms')} ms vs baseline {base['p95_ms']} ms")
+        if sum(result["errors"].values()) > sum(base.get("errors", {}).values()):
+            problems.append(f"{level}: errors {result['errors']} vs baseline {base.get('errors', {})}")
+    return problems
+
+
+def load_baseline(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: list, config: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    baseline = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "config": config,
+        "levels": {str(r["concurrency"]): r for r in results},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /api/ask against fake Bedrock and Pinecone")
+    parser.add_argument("--levels", default=DEFAULT_LEVELS, help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per level")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--model", default="mistral")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat-fraction", type=float, default=0.0,
+                        help="Share of requests repeating one question (exercises the caches)")
+    parser.add_argument("--embed-latency", default="fixed:20", help="fixed:MS | uniform:LO:HI | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--generate-latency", default="lognormal:400:0.3")
+    parser.add_argument("--vector-latency", default="fixed:15")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of Bedrock calls throttled")
+    parser.add_argument("--url", default=None, help="Test a running server instead of starting one with fakes")
+    parser.add_argument("--server-log", default=None, help="Write the app's output to this file")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.levels.split(",")]
+    for spec in (args.embed_latency, args.generate_latency, args.vector_latency):
+        parse_latency(spec)     # fail fast on a typo
+    config = {
+        "requests": args.requests, "model": args.model, "k": args.k, "repeat_fraction": args.repeat_fraction,
+        "embed_latency": args.embed_latency, "generate_latency": args.generate_latency,
+        "vector_latency": args.vector_latency, "throttle_rate": args.throttle_rate, "url": args.url,
+    }
+    options = {"model": args.model, "k": args.k, "repeat_fraction": args.repeat_fraction}
+
+    bedrock = vectors = process = log = None
+    try:
+        if args.url:
+            url = args.url
+        else:
+            bedrock = FakeBedrock(args.embed_latency, args.generate_latency, args.throttle_rate).start()
+            vectors = FakeVectorStore(args.vector_latency).start()
+            log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+            process, url = start_app(server_env(bedrock.url, vectors.url), _free_port(), log=log)
+            print(f"🚀 App on {url} (fake Bedrock {bedrock.url}, fake Pinecone {vectors.url})")
+
+        print(f"\n{'concurrency':>11} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}   errors")
+        results = run_load(url, levels, args.requests, warmup=args.warmup, **options)
+        if bedrock is not None:
+            print(f"\nFake Bedrock: {bedrock.calls} calls, {bedrock.throttled} throttled; "
+                  f"fake Pinecone: {vectors.calls} queries")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        if log not in (None, subprocess.DEVNULL):
+            log.close()
+        for fake in (bedrock, vectors):
+            if fake is not None:
+                fake.stop()
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, config)
+        print(f"\n✅ Saved baseline → {args.baseline}")
+        return
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nℹ️ No baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    if baseline.get("config") != config:
+        print(f"\n⚠️ Baseline was recorded with different settings, not comparing: {baseline.get('config')}")
+        return
+    problems = check_regressions(results, baseline, args.tolerance)
+    if problems:
+        print(f"\n❌ Performance regression (tolerance {args.tolerance:.0%}):")
+        for problem in problems:
+            print(f"   - {problem}")
+        sys.exit(1)
+    print(f"\n✅ Within {args.tolerance:.0%} of the baseline from {baseline.get('created')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 import json
 import os
+import sys
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
-from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
 
 # Load Pinecone API key from .env
@@ -13,39 +18,204 @@ INDEX_NAME = "bmw-rag"
 REGION = "us-east-1"
 EMBEDDING_FILE = "data/processed/bmw_embeddings.jsonl"
 
-# Initialise Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
+# Upsert limits. Pinecone caps a request at 2 MB and 1000 vectors and a
+# vector's metadata at 40 KB; stay under each with some headroom.
+MAX_BATCH_COUNT = 200
+MAX_BATCH_BYTES = 1_800_000
+MAX_METADATA_TEXT_BYTES = 32_000
 
-index = pc.Index("bmw-rag")
+# Parallelism / retry defaults
+DEFAULT_CONCURRENCY = 8
+MAX_RETRIES = 6
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
 
+
+# -----------------------------------------------------------
+# TARGETS (anything with upsert(vectors=[(id, values, metadata), ...]))
+# -----------------------------------------------------------
+def pinecone_target(index_name=INDEX_NAME):
+    """Connect to the Pinecone index lazily (only when actually uploading)."""
+    from pinecone import Pinecone
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+    return pc.Index(index_name)
+
+
+class InMemoryTarget:
+    """
+    Local stand-in for a Pinecone index, for tests and dry runs.
+    Optional `latency` (seconds per request) and `fail_every` (the first
+    attempt of every n-th distinct batch fails) simulate a remote service.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_every: int = 0):
+        self.vectors = {}
+        self.requests = 0
+        self.latency = latency
+        self.fail_every = fail_every
+        self._batches = set()
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors):
+        with self._lock:
+            self.requests += 1
+            first_id = vectors[0][0] if vectors else None
+            should_fail = False
+            if self.fail_every and first_id not in self._batches:
+                self._batches.add(first_id)
+                should_fail = len(self._batches) % self.fail_every == 0
+        if self.latency:
+            time.sleep(self.latency)
+        if should_fail:
+            raise ConnectionError("simulated upsert failure")
+        with self._lock:
+            for vid, values, metadata in vectors:
+                self.vectors[vid] = (values, metadata)
+
+    def delete(self, ids):
+        with self._lock:
+            for vid in ids:
+                self.vectors.pop(vid, None)
+
+
+# -----------------------------------------------------------
+# LOADING
+# -----------------------------------------------------------
 def load_embeddings(filepath):
+    # Binary store directory (scripts/convert_embeddings_to_store.py): no JSON parsing
+    if os.path.isdir(filepath):
+        from backend.services.embedding_store import EmbeddingStore
+        yield from EmbeddingStore.open(filepath).iter_records()
+        return
+
     with open(filepath, "r", encoding="utf-8") as f:
         for line in f:
             yield json.loads(line)
 
-def batch_upload(chunks, batch_size=100):
-    batch = []
-    for chunk in tqdm(chunks, desc="Uploading to Pinecone"):
-        # Build Pinecone-compatible format
-        vector = (
-            chunk["id"],
-            chunk["embedding"],
-            {
-                "text": chunk["text"],
-                **chunk.get("metadata", {})
-            }
-        )
-        batch.append(vector)
 
-        if len(batch) == batch_size:
-            index.upsert(vectors=batch)
-            batch = []
+def to_vector(chunk):
+    """Build a Pinecone (id, values, metadata) tuple, trimming oversized text."""
+    text = chunk["text"]
+    encoded = text.encode("utf-8")
+    if len(encoded) > MAX_METADATA_TEXT_BYTES:
+        text = encoded[:MAX_METADATA_TEXT_BYTES].decode("utf-8", errors="ignore")
+    return (
+        chunk["id"],
+        chunk["embedding"],
+        {
+            "text": text,
+            **chunk.get("metadata", {})
+        }
+    )
+
+
+def estimate_bytes(vector) -> int:
+    """Approximate request bytes for one vector (JSON floats ≈ 20 chars)."""
+    vid, values, metadata = vector
+    return len(vid) + 20 * len(values) + len(json.dumps(metadata)) + 32
+
 
-    # Upload any remaining vectors
+def iter_batches(vectors, max_count=MAX_BATCH_COUNT, max_bytes=MAX_BATCH_BYTES):
+    """Group vectors into batches bounded by both count and estimated bytes."""
+    batch, size = [], 0
+    for vector in vectors:
+        vsize = estimate_bytes(vector)
+        if batch and (len(batch) >= max_count or size + vsize > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(vector)
+        size += vsize
     if batch:
-        index.upsert(vectors=batch)
+        yield batch
+
+
+# -----------------------------------------------------------
+# UPLOAD
+# -----------------------------------------------------------
+def _upsert_with_retry(target, batch, stats, lock, max_retries):
+    for attempt in range(max_retries + 1):
+        try:
+            target.upsert(vectors=batch)
+            return len(batch)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            with lock:
+                stats["retries"] += 1
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+            print(f"[WARN] Upsert of {len(batch)} vectors failed ({e}); retrying in ≤{delay:.1f}s")
+            time.sleep(random.uniform(0, delay))
+
+
+def batch_upload(chunks, target=None, max_count=MAX_BATCH_COUNT, max_bytes=MAX_BATCH_BYTES,
+                 concurrency=DEFAULT_CONCURRENCY, max_retries=MAX_RETRIES, show_progress=True):
+    """
+    Upload chunk records with up to `concurrency` upserts in flight.
+
+    Returns:
+        {'vectors', 'batches', 'retries', 'failed_batches', 'seconds', 'vectors_per_second'}
+    """
+    target = target if target is not None else pinecone_target()
+    stats = {"vectors": 0, "batches": 0, "retries": 0, "failed_batches": 0}
+    lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(concurrency * 2)   # bound queued batches
+    errors = []
+    progress = tqdm(desc="Uploading to Pinecone", unit="vec", disable=not show_progress)
+
+    def done(future):
+        in_flight.release()
+        try:
+            n = future.result()
+        except Exception as e:
+            with lock:
+                stats["failed_batches"] += 1
+            errors.append(e)
+            return
+        with lock:
+            stats["vectors"] += n
+            stats["batches"] += 1
+        progress.update(n)
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for batch in iter_batches(map(to_vector, chunks), max_count=max_count, max_bytes=max_bytes):
+            in_flight.acquire()
+            future = pool.submit(_upsert_with_retry, target, batch, stats, lock, max_retries)
+            future.add_done_callback(done)
+    progress.close()
+
+    stats["seconds"] = round(time.time() - start, 3)
+    stats["vectors_per_second"] = round(stats["vectors"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    if errors:
+        print(f"[ERROR] {len(errors)} batches failed after retries; first error: {errors[0]}")
+    return stats
+
+
+def main(argv=None) -> int:
+    """CLI entry point; returns the process exit code (1 if any batch failed)."""
+    parser = argparse.ArgumentParser(description="Upsert embeddings into Pinecone")
+    parser.add_argument("input", nargs="?", default=EMBEDDING_FILE, help="Embeddings JSONL or store directory")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--max-count", type=int, default=MAX_BATCH_COUNT)
+    parser.add_argument("--max-bytes", type=int, default=MAX_BATCH_BYTES)
+    parser.add_argument("--target", choices=["pinecone", "memory"], default="pinecone",
+                        help="'memory' uploads to an in-process stand-in (dry run)")
+    args = parser.parse_args(argv)
+
+    target = InMemoryTarget() if args.target == "memory" else pinecone_target()
+    embeddings = load_embeddings(args.input)
+    stats = batch_upload(embeddings, target=target, max_count=args.max_count,
+                         max_bytes=args.max_bytes, concurrency=args.concurrency)
+    summary = (f"Uploaded {stats['vectors']} vectors in {stats['batches']} batches "
+               f"({stats['vectors_per_second']} vectors/s, {stats['retries']} retries, "
+               f"{stats['failed_batches']} failed batches).")
+    if stats["failed_batches"]:
+        # A partial upsert is a failure for CI / shell callers; re-run to retry
+        print(f"❌ {summary}")
+        return 1
+    print(f"✅ {summary}")
+    return 0
+
 
 if __name__ == "__main__":
-    embeddings = load_embeddings(EMBEDDING_FILE)
-    batch_upload(embeddings)
-    print("✅ Embeddings uploaded to Pinecone.")
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+
+# Keep test requests out of the tracked backend/logs/requests.jsonl;
+# entries are still echoed to the console logger
+os.environ.setdefault("LOG_FILE", "")
@@ -0,0 +1,86 @@
+import pytest
+from fastapi.testclient import TestClient
+import main
+from backend.services import analytics
+from backend.services.analytics import ColumnStore, plan_question, execute
+
+CSV = """Model,Year,Region,Color,Fuel_Type,Transmission,Engine_Size_L,Mileage_KM,Price_USD,Sales_Volume,Sales_Classification
+X5,2022,Asia,Black,Diesel,Automatic,3.0,1000,80000,900,Low
+X5,2022,Europe,White,Petrol,Manual,2.0,2000,70000,500,Low
+i8,2022,Asia,Blue,Hybrid,Automatic,1.5,3000,110000,8000,High
+i8,2021,North America,Red,Hybrid,Manual,1.5,4000,100000,100,Low
+5 Series,2022,North America,Black,Petrol,Automatic,3.5,5000,60000,700,Low
+"""
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "sales.csv"
+    path.write_text(CSV)
+    return ColumnStore.from_csv(str(path))
+
+
+def test_columns_are_typed_and_rollups_cached(store):
+    assert len(store) == 5
+    assert set(store.numeric) == {"Year", "Engine_Size_L", "Mileage_KM", "Price_USD", "Sales_Volume"}
+    assert store.categorical["Year"][1] == ["2021", "2022"]
+    stats = store.group_stats("Model", "Sales_Volume")
+    assert stats["categories"] == ["5 Series", "X5", "i8"]
+    assert list(stats["sum"]) == [700, 1400, 8100] and list(stats["max"]) == [700, 900, 8000]
+    assert store.group_stats("Model", "Sales_Volume") is stats
+
+
+def test_router_parses_aggregate_questions(store):
+    plan = plan_question(store, "Which model had the highest sales volume in 2022?")
+    assert plan == {"op": "max", "metric": "Sales_Volume", "group": "Model", "filters": {"Year": {"$eq": 2022}}}
+
+    plan = plan_question(store, "Average price by region for hybrid cars in North America")
+    assert plan["op"] == "mean" and plan["group"] == "Region"
+    assert plan["filters"] == {"Region": {"$eq": "North America"}, "Fuel_Type": {"$eq": "Hybrid"}}
+
+    # "Which BMW ... most" ranks models by total sales, not the single largest row
+    for question in ("which BMW sold most in 2022", "best selling BMW 2022"):
+        plan = plan_question(store, question)
+        assert plan == {"op": "max", "metric": "Sales_Volume", "group": "Model", "filters": {"Year": {"$eq": 2022}}}
+        assert execute(store, plan).splitlines()[2] == "1. i8: 8,000 (rows: 1)"
+
+    # Units sold, not row counts
+    assert plan_question(store, "How many X5 were sold in Asia?")["op"] == "sum"
+    # Descriptive questions stay on vector / lexical retrieval
+    assert plan_question(store, "What is the X5 like?") is None
+    assert plan_question(store, "Tell me about the i8 hybrid") is None
+    assert plan_question(store, "What are the top features of the X5 engine?") is None
+    assert plan_question(store, "Which engine is the most reliable?") is None
+    assert plan_question(store, "How many doors does the X5 have?") is None
+    # A loose metric word still routes when the question asks for a breakdown
+    assert plan_question(store, "Which model has the biggest engine?")["metric"] == "Engine_Size_L"
+    assert plan_question(store, "What is the most popular model?")["group"] == "Model"
+
+
+def test_execute_returns_compact_result(store):
+    text = execute(store, plan_question(store, "Which model had the highest sales volume in 2022?"))
+    lines = text.splitlines()
+    assert "Year = 2022; 4 rows" in lines[0]
+    assert lines[1] == "Total Sales_Volume by Model, highest first:"
+    assert lines[2] == "1. i8: 8,000 (rows: 1)" and lines[3].startswith("2. X5: 1,400")
+
+    text = execute(store, plan_question(store, "What is the lowest price in Asia?"))
+    assert "Lowest Price_USD: 80,000 (Model: X5, Year: 2022, Region: Asia" in text
+    assert "Engine_Size_L: 3, Mileage_KM: 1,000, Price_USD: 80,000, Sales_Volume: 900" in text
+    assert "No rows match" in execute(store, plan_question(store, "Total sales of i8 in Europe"))
+
+
+def test_ask_routes_aggregates_without_vector_search(store, monkeypatch):
+    monkeypatch.setattr(analytics, "_store", store)
+    monkeypatch.setattr(main, "ANALYTICS_ENABLED", True)
+    monkeypatch.setattr(main, "get_query_embedding", lambda q: pytest.fail("embedding called"))
+    monkeypatch.setattr(main, "retrieve_top_k", lambda e, top_k=5, metadata_filter=None: pytest.fail("vector search called"))
+    contexts = []
+    monkeypatch.setattr(main, "generate_answer",
+                        lambda model_id, question, context: contexts.append(context) or "The i8.")
+
+    response = TestClient(main.app).post("/api/ask", json={"query": "Which model sold the most in 2022?"})
+    data = response.json()
+    assert response.status_code == 200 and data["retrieval"] == "aggregate"
+    assert data["matches"][0]["id"] == "aggregate"
+    assert "1. i8: 8,000" in contexts[0] and len(contexts[0]) < 1000
@@ -0,0 +1,45 @@
+import numpy as np
+from backend.services.ann_index import IVFIndex, recall_at_k
+
+
+def _clustered_corpus(n_clusters=20, per_cluster=50, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(n_clusters, dim))
+    vectors = np.concatenate([
+        c + rng.normal(scale=0.1, size=(per_cluster, dim)) for c in centres
+    ]).astype(np.float32)
+    ids = [f"bmw-{i}" for i in range(len(vectors))]
+    texts = [f"row {i}" for i in range(len(vectors))]
+    return ids, vectors, texts
+
+
+def test_full_probe_equals_exact_search():
+    """Probing every list must give the exact answer."""
+    ids, vectors, texts = _clustered_corpus()
+    ivf = IVFIndex.build(ids, vectors, texts, nlist=16)
+
+    report = recall_at_k(ivf, vectors[:25], top_k=10, nprobe=ivf.nlist)
+    assert report["recall"] == 1.0
+
+
+def test_recall_improves_with_nprobe():
+    ids, vectors, texts = _clustered_corpus()
+    ivf = IVFIndex.build(ids, vectors, texts, nlist=32)
+
+    low = recall_at_k(ivf, vectors[::40], top_k=20, nprobe=1)["recall"]
+    high = recall_at_k(ivf, vectors[::40], top_k=20, nprobe=8)["recall"]
+    assert 0 < low <= high <= 1.0
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    ids, vectors, texts = _clustered_corpus(n_clusters=4, per_cluster=10)
+    texts[0] = "Model: i8; Region: Europe — ünïcode"
+    ivf = IVFIndex.build(ids, vectors, texts, nlist=4, nprobe=2)
+
+    path = tmp_path / "ivf.npz"
+    ivf.save(str(path))
+    loaded = IVFIndex.load(str(path), nprobe=2)
+
+    assert loaded.ids == ivf.ids and loaded.texts == ivf.texts
+    assert loaded.query(vectors[0], top_k=3) == ivf.query(vectors[0], top_k=3)
+    assert loaded.query(vectors[0], top_k=1)[0]["id"] == "bmw-0"
@@ -0,0 +1,64 @@
+import numpy as np
+from backend.services.answer_cache import SemanticAnswerCache
+
+MODEL = "anthropic.claude-3-haiku-20240307-v1:0"
+
+
+def _vec(*values):
+    return list(values) + [0.0] * (8 - len(values))
+
+
+def test_near_duplicate_hits_and_distant_query_misses():
+    cache = SemanticAnswerCache(threshold=0.95, max_entries=10)
+    cache.store(MODEL, 5, _vec(1.0, 0.1), "best selling BMW 2022", "The X5.", [{"id": "bmw-1"}])
+
+    hit = cache.lookup(MODEL, 5, _vec(1.0, 0.15))
+    assert hit["answer"] == "The X5."
+    assert hit["query"] == "best selling BMW 2022"
+    assert hit["similarity"] >= 0.95
+
+    assert cache.lookup(MODEL, 5, _vec(0.0, 1.0)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_bucketed_by_model_and_k():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store(MODEL, 5, _vec(1.0), "q", "a", [])
+
+    assert cache.lookup(MODEL, 3, _vec(1.0)) is None
+    assert cache.lookup("mistral.mistral-7b-instruct-v0:1", 5, _vec(1.0)) is None
+    assert cache.lookup(MODEL, 5, _vec(1.0)) is not None
+
+
+def test_lru_eviction_ttl_and_index_version(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("backend.services.answer_cache.time.monotonic", lambda: now[0])
+    cache = SemanticAnswerCache(threshold=0.99, max_entries=2, ttl_seconds=10)
+
+    cache.store(MODEL, 5, _vec(1.0), "a", "A", [], index_version="v1")
+    cache.store(MODEL, 5, _vec(0.0, 1.0), "b", "B", [], index_version="v1")
+    cache.lookup(MODEL, 5, _vec(1.0), index_version="v1")          # "b" becomes LRU
+    cache.store(MODEL, 5, _vec(0.0, 0.0, 1.0), "c", "C", [], index_version="v1")
+
+    assert cache.lookup(MODEL, 5, _vec(0.0, 1.0), index_version="v1") is None
+    assert cache.lookup(MODEL, 5, _vec(1.0), index_version="v1")["answer"] == "A"
+
+    now[0] = 11
+    assert cache.lookup(MODEL, 5, _vec(1.0), index_version="v1") is None
+
+    cache.store(MODEL, 5, _vec(1.0), "a", "A2", [], index_version="v1")
+    assert cache.lookup(MODEL, 5, _vec(1.0), index_version="v2") is None
+    assert len(cache) == 0 and cache.stats()["invalidations"] == 1
+
+
+def test_high_dimensional_similarity_matches_numpy():
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=1536)
+    near = base + rng.normal(scale=0.05, size=1536)
+    cache = SemanticAnswerCache(threshold=0.99)
+    cache.store(MODEL, 5, base.tolist(), "q", "a", [])
+
+    expected = float(base @ near / (np.linalg.norm(base) * np.linalg.norm(near)))
+    hit = cache.lookup(MODEL, 5, near.tolist())
+    assert hit is not None
+    assert abs(hit["similarity"] - expected) < 1e-3
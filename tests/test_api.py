@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from backend.main import app
+from main import app
 
 client = TestClient(app)
 
@@ -18,15 +18,15 @@ def test_api_ask_minimal(monkeypatch):
     def fake_get_query_embedding(query):
         return [0.1] * 1536
 
-    def fake_retrieve_top_k(embedding, top_k=5):
+    def fake_retrieve_top_k(embedding, top_k=5, metadata_filter=None):
         return [{"id": "chunk_1", "text": "BMW X5 sales grew 20% in 2022.", "score": 0.9}]
 
     def fake_generate_answer(model_id, question, context):
         return "The BMW X5 had the highest sales in 2022."
 
-    monkeypatch.setattr("backend.main.get_query_embedding", fake_get_query_embedding)
-    monkeypatch.setattr("backend.main.retrieve_top_k", fake_retrieve_top_k)
-    monkeypatch.setattr("backend.main.generate_answer", fake_generate_answer)
+    monkeypatch.setattr("main.get_query_embedding", fake_get_query_embedding)
+    monkeypatch.setattr("main.retrieve_top_k", fake_retrieve_top_k)
+    monkeypatch.setattr("main.generate_answer", fake_generate_answer)
 
     payload = {"query": "Which BMW model had the highest sales in 2022?", "model": "claude-3-sonnet", "k": 3}
     response = client.post("/api/ask", json=payload)
@@ -0,0 +1,76 @@
+import json
+import time
+import threading
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+
+
+def _install_fakes(monkeypatch, fail_on=None, delay=0.0):
+    calls = {"embed": 0, "retrieve_batches": 0, "max_parallel_generations": 0}
+    active = [0]
+    lock = threading.Lock()
+
+    def fake_embed(query):
+        calls["embed"] += 1
+        return [float(len(query)), 1.0]
+
+    def fake_retrieve_batch(embeddings, top_k=5, metadata_filters=None):
+        calls["retrieve_batches"] += 1
+        return [[{"id": f"bmw-{int(e[0])}", "score": 0.9, "text": "Model: X5"}] for e in embeddings]
+
+    def fake_generate(model_id, question, context):
+        with lock:
+            active[0] += 1
+            calls["max_parallel_generations"] = max(calls["max_parallel_generations"], active[0])
+        time.sleep(delay)
+        with lock:
+            active[0] -= 1
+        if fail_on and fail_on in question:
+            raise RuntimeError("throttled")
+        return f"answer to {question}"
+
+    monkeypatch.setattr(main, "get_query_embedding", fake_embed)
+    monkeypatch.setattr(main, "retrieve_top_k_batch", fake_retrieve_batch)
+    monkeypatch.setattr(main, "generate_answer", fake_generate)
+    monkeypatch.setattr(main, "answer_cache", main.SemanticAnswerCache(max_entries=0))
+    return calls
+
+
+def test_batch_returns_results_in_input_order_with_per_item_errors(monkeypatch):
+    calls = _install_fakes(monkeypatch, fail_on="bad")
+    queries = ["X5 sales 2022", "bad question", "i8 in Asia", "x" * 1001]
+
+    response = client.post("/api/ask/batch", json={"queries": queries, "model": "claude-haiku", "k": 3})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["index"] for r in data["results"]] == [0, 1, 2, 3]
+    assert data["results"][0]["answer"] == "answer to X5 sales 2022"
+    assert "generation failed" in data["results"][1]["error"]
+    assert "invalid" in data["results"][3]["error"]
+    assert data["succeeded"] == 2 and data["failed"] == 2
+    assert calls["retrieve_batches"] == 1          # one batched vector search
+    assert calls["embed"] == 3
+
+
+def test_batch_generation_parallelism_is_bounded(monkeypatch):
+    calls = _install_fakes(monkeypatch, delay=0.05)
+    monkeypatch.setattr(main, "BATCH_GENERATE_CONCURRENCY", 2)
+
+    response = client.post("/api/ask/batch", json={"queries": [f"q{i}" for i in range(6)]})
+
+    assert response.json()["succeeded"] == 6
+    assert calls["max_parallel_generations"] == 2
+
+
+def test_batch_stream_ndjson(monkeypatch):
+    _install_fakes(monkeypatch)
+
+    response = client.post("/api/ask/batch", json={"queries": ["a", "b"], "stream": True})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert sorted(l["index"] for l in lines[:-1]) == [0, 1]
+    assert lines[-1]["done"] is True and lines[-1]["succeeded"] == 2
@@ -0,0 +1,59 @@
+import json
+from contextlib import asynccontextmanager
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+
+
+def _parse_sse(raw: str):
+    events = []
+    for block in raw.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_ask_stream_emits_matches_then_tokens(monkeypatch):
+    matches = [{"id": "bmw-1", "score": 0.91, "text": "Model: X5; Year: 2022"}]
+
+    monkeypatch.setattr(main, "get_query_embedding", lambda q: [0.3, 0.7])
+    monkeypatch.setattr(main, "retrieve_top_k", lambda e, top_k=5, metadata_filter=None: matches)
+    monkeypatch.setattr(main, "stream_answer", lambda model_id, question, context: iter(["The X5 ", "led."]))
+    monkeypatch.setattr(main, "answer_cache", main.SemanticAnswerCache(max_entries=0))
+
+    response = client.post("/api/ask/stream", json={"query": "Best seller 2022?", "model": "claude-haiku"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    assert [e for e, _ in events] == ["matches", "token", "token", "done"]
+    assert events[0][1]["matches"] == matches
+    assert "".join(d["text"] for e, d in events if e == "token") == "The X5 led."
+    assert events[-1][1]["ttft_ms"] is not None
+
+
+def test_stream_holds_its_request_slot_until_the_body_is_sent(monkeypatch):
+    slots = []
+    real_slot = main.request_slot
+
+    @asynccontextmanager
+    async def counting_slot(timeout=None):
+        async with real_slot(timeout) as slot:
+            slots.append(slot)
+            yield slot
+
+    def tokens(model_id, question, context):
+        # Generation runs after the endpoint returned the StreamingResponse
+        yield f"in flight: {sum(s.held for s in slots)}"
+
+    monkeypatch.setattr(main, "request_slot", counting_slot)
+    monkeypatch.setattr(main, "get_query_embedding", lambda q: [0.3, 0.7])
+    monkeypatch.setattr(main, "retrieve_top_k", lambda e, top_k=5, metadata_filter=None: [])
+    monkeypatch.setattr(main, "stream_answer", tokens)
+    monkeypatch.setattr(main, "answer_cache", main.SemanticAnswerCache(max_entries=0))
+
+    response = client.post("/api/ask/stream", json={"query": "Best seller 2022?", "model": "claude-haiku"})
+    events = _parse_sse(response.text)
+    assert [d["text"] for e, d in events if e == "token"] == ["in flight: 1"]
+    assert len(slots) == 1 and not slots[0].held
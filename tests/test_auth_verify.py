@@ -0,0 +1,127 @@
+import time
+import asyncio
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from backend import auth_verify
+from backend.services.cache import TTLCache
+
+
+def _rsa_key(kid):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    return pem, {**public, "kid": kid, "use": "sig"}
+
+
+KEY_A = _rsa_key("kid-a")
+KEY_B = _rsa_key("kid-b")
+
+
+def _token(key, exp_in=600, aud=auth_verify.APP_CLIENT_ID, sub="user-1"):
+    pem, public = key
+    claims = {"sub": sub, "aud": aud, "exp": int(time.time()) + exp_in}
+    return "Bearer " + jwt.encode(claims, pem, algorithm="RS256", headers={"kid": public["kid"]})
+
+
+@pytest.fixture
+def jwks(monkeypatch):
+    """Local JWKS endpoint: mutate `served` to rotate keys; `fetches` counts calls."""
+    state = {"served": [KEY_A[1]], "fetches": 0}
+
+    def fake_fetch():
+        state["fetches"] += 1
+        time.sleep(0.05)
+        return list(state["served"])
+
+    monkeypatch.setattr(auth_verify, "_fetch_jwks", fake_fetch)
+    monkeypatch.setattr(auth_verify, "_keys", {})
+    monkeypatch.setattr(auth_verify, "_keys_fetched_at", 0.0)
+    monkeypatch.setattr(auth_verify, "_verified", TTLCache(max_size=100, ttl_seconds=3600))
+    return state
+
+
+def test_repeat_verification_is_served_from_cache(jwks, monkeypatch):
+    header = _token(KEY_A)
+    claims = auth_verify.verify_access_token(header)
+    assert claims["sub"] == "user-1" and jwks["fetches"] == 1
+
+    # A cached token skips parsing and RSA entirely
+    monkeypatch.setattr(auth_verify, "_verify_with_keys", lambda *a: pytest.fail("not cached"))
+    start = time.perf_counter()
+    for _ in range(1000):
+        assert auth_verify.verify_access_token(header) == claims
+    assert (time.perf_counter() - start) / 1000 < 0.0005
+
+
+def test_rejects_bad_signature_expiry_and_audience(jwks):
+    pem_b, public_b = KEY_B
+    forged = _token((pem_b, {**public_b, "kid": "kid-a"}))
+    with pytest.raises(Exception, match="Signature"):
+        auth_verify.verify_access_token(forged)
+    with pytest.raises(Exception, match="expired"):
+        auth_verify.verify_access_token(_token(KEY_A, exp_in=-5))
+    with pytest.raises(Exception, match="audience"):
+        auth_verify.verify_access_token(_token(KEY_A, aud="someone-else"))
+    with pytest.raises(Exception, match="Authorization"):
+        auth_verify.verify_access_token("Basic abc")
+
+
+def test_cached_claims_expire_with_the_token(jwks, monkeypatch):
+    header = _token(KEY_A, exp_in=60)
+    auth_verify.verify_access_token(header)
+    later = time.time() + 120
+    monkeypatch.setattr(auth_verify.time, "time", lambda: later)
+    with pytest.raises(Exception, match="expired"):
+        auth_verify.verify_access_token(header)
+
+
+def test_key_rotation_refreshes_once_for_concurrent_requests(jwks):
+    async def scenario():
+        await auth_verify.verify_access_token_async(_token(KEY_A))
+        assert jwks["fetches"] == 1
+
+        # Cognito rotates to kid-b; JWKS may be refetched (min interval elapsed)
+        jwks["served"] = [KEY_A[1], KEY_B[1]]
+        auth_verify._keys_fetched_at -= auth_verify.JWKS_MIN_REFRESH_SECONDS
+        headers = [_token(KEY_B, sub=f"user-{i}") for i in range(10)]
+        return await asyncio.gather(*[auth_verify.verify_access_token_async(h) for h in headers])
+
+    results = asyncio.run(scenario())
+    assert [c["sub"] for c in results] == [f"user-{i}" for i in range(10)]
+    assert jwks["fetches"] == 2
+
+
+def test_unknown_kid_does_not_refetch_within_min_interval(jwks):
+    auth_verify.verify_access_token(_token(KEY_A))
+    for _ in range(5):
+        with pytest.raises(Exception, match="Public key not found"):
+            auth_verify.verify_access_token(_token(KEY_B))
+    assert jwks["fetches"] == 1
+
+
+def test_authorize_uses_the_async_verifier_when_enabled(jwks, monkeypatch):
+    import main
+    from fastapi.testclient import TestClient
+    from starlette.requests import Request
+
+    monkeypatch.setattr(main, "AUTH_ENABLED", True)
+    monkeypatch.setattr(main, "verify_access_token", lambda header: pytest.fail("stub verifier used"))
+
+    async def allow(request):
+        return None
+    monkeypatch.setattr(main, "enforce_rate_limit", allow)
+
+    def request(header):
+        headers = [(b"authorization", header.encode())] if header else []
+        return Request({"type": "http", "method": "POST", "path": "/api/ask", "headers": headers})
+
+    assert asyncio.run(main._authorize(request(_token(KEY_A)))) is None
+    assert asyncio.run(main._authorize(request(_token(KEY_A, exp_in=-5)))).status_code == 401
+    assert TestClient(main.app).post("/api/ask", json={"query": "X5?"}).status_code == 401
+    assert jwks["fetches"] == 1
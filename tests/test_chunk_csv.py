@@ -0,0 +1,66 @@
+import csv
+import json
+from scripts.chunk_csv_to_jsonl import process_csv, save_chunks_to_jsonl
+
+ROWS = [
+    {"Model": "X5", "Year": "2022", "Region": "Asia", "Price_USD": "80000", "Sales_Volume": "100"},
+    {"Model": "X5", "Year": "2022", "Region": "Asia", "Price_USD": "60000", "Sales_Volume": "300"},
+    {"Model": "i8", "Year": "2013", "Region": "Europe", "Price_USD": "90000", "Sales_Volume": "50"},
+    {"Model": "M3", "Year": "2020", "Region": "Europe, West", "Price_USD": "70000", "Sales_Volume": "7"},
+    {"Model": "X5", "Year": "2022", "Region": "Asia", "Price_USD": "70000", "Sales_Volume": "200"},
+]
+
+
+def _write_csv(path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(ROWS[0]))
+        writer.writeheader()
+        writer.writerows(ROWS)
+
+
+def test_one_row_per_chunk_matches_original_format(tmp_path):
+    path = tmp_path / "sales.csv"
+    _write_csv(path)
+
+    chunks = list(process_csv(str(path), batch_rows=2))
+
+    assert [c["id"] for c in chunks] == [f"bmw-{i}" for i in range(5)]
+    assert chunks[3]["text"] == "Model: M3; Year: 2020; Region: Europe, West; Price_USD: 70000; Sales_Volume: 7"
+    assert chunks[4]["metadata"] == {
+        "Model": "X5", "Year": 2022, "Region": "Asia", "Price_USD": 70000, "Sales_Volume": 200, "row_number": 4,
+    }
+
+
+def test_rows_per_chunk_and_multiprocess_output_is_identical(tmp_path):
+    path = tmp_path / "sales.csv"
+    _write_csv(path)
+
+    single = list(process_csv(str(path), rows_per_chunk=2, batch_rows=3, workers=1))
+    multi = list(process_csv(str(path), rows_per_chunk=2, batch_rows=3, workers=2))
+
+    assert single == multi
+    assert [c["id"] for c in single] == ["bmw-0-1", "bmw-2-3", "bmw-4-4"]
+    assert single[0]["text"].count("\n") == 1
+    # Multi-row chunks keep only the columns shared by every row
+    assert single[0]["metadata"] == {"Model": "X5", "Year": 2022, "Region": "Asia", "row_start": 0, "row_end": 1}
+
+
+def test_group_by_rollups(tmp_path):
+    path = tmp_path / "sales.csv"
+    _write_csv(path)
+
+    chunks = {c["id"]: c for c in process_csv(str(path), group_by=["Model", "Year"], batch_rows=2)}
+
+    x5 = chunks["bmw-group-x5-2022"]
+    assert x5["metadata"] == {"Model": "X5", "Year": 2022, "rows": 3}
+    assert "Sales_Volume total: 600" in x5["text"]
+    assert "Price_USD avg: 70000" in x5["text"]
+    assert "Price_USD total" not in x5["text"]
+    assert len(chunks) == 3
+
+
+def test_save_chunks_streams_generator(tmp_path):
+    out = tmp_path / "out" / "chunks.jsonl"
+    count = save_chunks_to_jsonl(({"id": str(i)} for i in range(3)), str(out))
+    assert count == 3
+    assert [json.loads(l)["id"] for l in out.read_text().splitlines()] == ["0", "1", "2"]
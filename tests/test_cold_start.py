@@ -0,0 +1,50 @@
+import os
+import sys
+import json
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_main_defers_heavy_sdks():
+    probe = (
+        "import sys, json, main; "
+        "print(json.dumps([m for m in ('boto3', 'botocore', 'pinecone', 'mangum', 'jose') if m in sys.modules]))"
+    )
+    env = dict(os.environ, WARM_UP_ON_INIT="false", METRICS_ENABLED="false")
+    out = subprocess.run([sys.executable, "-c", probe], cwd=REPO_ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+
+
+def test_bedrock_client_is_shared_and_lazy(monkeypatch):
+    from backend.services import aws_clients, embeddings, generate
+
+    created = []
+    fake_boto3 = type("boto3", (), {"client": staticmethod(lambda name, region_name=None, config=None: created.append(name) or object())})
+    monkeypatch.setitem(sys.modules, "boto3", fake_boto3)
+    aws_clients.reset_clients()
+    try:
+        assert embeddings._bedrock() is generate._bedrock()
+        assert created == ["bedrock-runtime"]
+    finally:
+        aws_clients.reset_clients()
+
+
+def test_clients_use_tuned_config():
+    from backend.services import aws_clients
+
+    config = aws_clients.client_config(max_pool_connections=64, max_attempts=1)
+    assert config.max_pool_connections == 64
+    assert config.retries == {"mode": aws_clients.AWS_RETRY_MODE, "total_max_attempts": 1}
+    assert config.connect_timeout == aws_clients.AWS_CONNECT_TIMEOUT_SECONDS
+    assert config.tcp_keepalive == aws_clients.AWS_TCP_KEEPALIVE
+
+    aws_clients.reset_clients()
+    try:
+        client = aws_clients.get_client("bedrock-runtime", region_name="us-east-1", max_attempts=1)
+        assert client is aws_clients.get_client("bedrock-runtime", region_name="us-east-1", max_attempts=1)
+        assert client is not aws_clients.get_client("bedrock-runtime", region_name="us-east-1")
+        assert client.meta.config.max_pool_connections == aws_clients.AWS_MAX_POOL_CONNECTIONS
+    finally:
+        aws_clients.reset_clients()
@@ -0,0 +1,54 @@
+import asyncio
+import time
+import pytest
+from backend.services import concurrency
+from backend.services.concurrency import (
+    run_stage,
+    request_slot,
+    StageTimeoutError,
+    OverloadedError,
+)
+
+
+def _blocking_call(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_blocking_stages_do_not_serialize_the_event_loop():
+    """Eight 0.2 s blocking calls should overlap instead of taking 1.6 s."""
+
+    async def scenario():
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            run_stage("generation", _blocking_call, 0.2, timeout=5) for _ in range(8)
+        ])
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(scenario())
+    assert results == [0.2] * 8
+    assert elapsed < 0.8
+
+
+def test_stage_timeout_raises():
+    async def scenario():
+        await run_stage("embedding", _blocking_call, 0.5, timeout=0.05)
+
+    with pytest.raises(StageTimeoutError) as exc:
+        asyncio.run(scenario())
+    assert exc.value.stage == "embedding"
+
+
+def test_request_slot_enforces_ceiling(monkeypatch):
+    monkeypatch.setattr(concurrency, "MAX_CONCURRENT_REQUESTS", 1)
+
+    async def scenario():
+        async with request_slot():
+            with pytest.raises(OverloadedError):
+                async with request_slot(timeout=0.05):
+                    pass
+        # Slot released: admission works again
+        async with request_slot(timeout=0.05):
+            return True
+
+    assert asyncio.run(scenario())
@@ -0,0 +1,132 @@
+import time
+import asyncio
+from fastapi.testclient import TestClient
+import main
+from backend.config.settings import MODEL_MAP, DEFAULT_MODEL
+from backend.services import dispatcher as dispatch
+from backend.services.dispatcher import Dispatcher, ModelHealth, ModelUnavailableError
+
+MATCHES = [{"id": "bmw-1", "score": 0.9, "text": "Model: X5; Year: 2022"}]
+
+
+def _fake_generate(delays=None, failing=()):
+    calls = []
+
+    def generate(model_id, question, context):
+        calls.append(model_id)
+        if model_id in failing:
+            raise RuntimeError("ThrottlingException")
+        time.sleep((delays or {}).get(model_id, 0.0))
+        return f"answer from {model_id}"
+    return generate, calls
+
+
+def test_breaker_opens_probes_and_closes():
+    health = ModelHealth("claude-sonnet", breaker_window=10, min_calls=4, error_rate=0.5, cooldown=30)
+    for ok in (True, False, False):
+        health.record(100, ok, now=0)
+    assert health.state == "closed"
+    health.record(100, False, now=1)               # 3/4 failed
+    assert health.state == "open" and not health.allow(now=10)
+
+    assert health.allow(now=31) and not health.allow(now=31)   # a single probe
+    health.record(100, False, now=32)              # probe failed: open again
+    assert not health.allow(now=40) and health.allow(now=62)
+    health.record(80, True, now=63)
+    assert health.state == "closed" and health.allow(now=63)
+    assert list(health.latencies) == [100, 80]       # only successful calls
+
+
+def test_probe_that_never_reports_is_released(monkeypatch):
+    health = ModelHealth("claude-sonnet", cooldown=30, probe_timeout=60)
+    health.opened_at = 0
+    assert health.allow(now=31) and not health.allow(now=40)
+    assert health.allow(now=91) and health.state == "half_open"   # abandoned probe expired
+    health.release()
+    assert health.state == "open" and health.allow(now=92)
+
+    # A granted probe that fails before reaching Bedrock is released, not left half-open
+    def broken_context(model_id, matches, question):
+        raise ValueError("bad template")
+    monkeypatch.setattr(dispatch, "build_context", broken_context)
+    d = Dispatcher(fallback=None, hedge=False)
+    d.health("claude-sonnet").opened_at = time.monotonic() - 3600
+    generate, calls = _fake_generate()
+    try:
+        asyncio.run(d.generate("claude-sonnet", "q", MATCHES, generate=generate))
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+    assert calls == [] and d.health("claude-sonnet").state == "open" and d.health("claude-sonnet").allow()
+
+
+def test_slow_primary_is_hedged_to_fallback(monkeypatch):
+    monkeypatch.setattr(dispatch, "HEDGE_MIN_MS", 0)
+    d = Dispatcher(fallback="claude-haiku", hedge=True)
+    for _ in range(dispatch.HEDGE_MIN_SAMPLES):
+        d.record("claude-sonnet", 20, ok=True)
+    assert d.hedge_delay("claude-sonnet") == 0.02
+
+    sonnet, haiku = MODEL_MAP["claude-sonnet"], MODEL_MAP["claude-haiku"]
+    generate, calls = _fake_generate(delays={sonnet: 0.5})
+    result = asyncio.run(d.generate("claude-sonnet", "Top model?", MATCHES, generate=generate))
+
+    assert result["model"] == "claude-haiku" and result["hedged"]
+    assert result["answer"] == f"answer from {haiku}" and calls == [sonnet, haiku]
+
+
+def test_failures_fail_over_and_open_the_breaker():
+    d = Dispatcher(fallback="claude-haiku", hedge=False)
+    sonnet = MODEL_MAP["claude-sonnet"]
+    generate, calls = _fake_generate(failing={sonnet})
+
+    for _ in range(dispatch.BREAKER_MIN_CALLS):
+        result = asyncio.run(d.generate("claude-sonnet", "q", MATCHES, generate=generate))
+        assert result["model"] == "claude-haiku" and not result["hedged"]
+    assert d.health("claude-sonnet").state == "open"
+
+    # Open breaker: the fallback is called directly
+    calls.clear()
+    asyncio.run(d.generate("claude-sonnet", "q", MATCHES, generate=generate))
+    assert calls == [MODEL_MAP["claude-haiku"]]
+
+    d.health("claude-haiku").opened_at = time.monotonic()
+    try:
+        d.choose("claude-sonnet")
+        raise AssertionError("expected ModelUnavailableError")
+    except ModelUnavailableError:
+        pass
+    assert 'rag_model_circuit_open{model="claude-sonnet"} 1' in d.render()
+
+
+def test_unknown_model_is_reported_not_hidden(monkeypatch, caplog):
+    monkeypatch.setattr(main, "generate_answer", lambda model_id, question, context: "ok")
+    monkeypatch.setattr(main, "answer_cache", main.SemanticAnswerCache(max_entries=0))
+    monkeypatch.setattr(main, "get_query_embedding", lambda q: [1.0, 0.0])
+    monkeypatch.setattr(main, "retrieve_top_k", lambda e, top_k=5, metadata_filter=None: MATCHES)
+    monkeypatch.setattr(main, "ANALYTICS_ENABLED", False)
+
+    response = TestClient(main.app).post("/api/ask", json={"query": "Tell me about the X5", "model": "gpt-4"})
+    assert response.status_code == 200
+    assert response.json()["model"] == "gpt-4" and response.json()["answered_by"] == DEFAULT_MODEL
+    assert any(r.name == "rag.dispatcher" and r.levelname == "WARNING" and "gpt-4" in r.getMessage()
+               for r in caplog.records)
+
+
+def test_cached_fallback_answer_reports_the_model_that_answered(monkeypatch):
+    sonnet = MODEL_MAP["claude-sonnet"]
+    generate, calls = _fake_generate(failing={sonnet})
+    monkeypatch.setattr(main, "dispatcher", Dispatcher(fallback="claude-haiku", hedge=False))
+    monkeypatch.setattr(main, "generate_answer", generate)
+    monkeypatch.setattr(main, "answer_cache", main.SemanticAnswerCache())
+    monkeypatch.setattr(main, "get_query_embedding", lambda q: [1.0, 0.0])
+    monkeypatch.setattr(main, "retrieve_top_k", lambda e, top_k=5, metadata_filter=None: MATCHES)
+    monkeypatch.setattr(main, "ANALYTICS_ENABLED", False)
+
+    client = TestClient(main.app)
+    body = {"query": "Tell me about the X5", "model": "claude-sonnet"}
+    first = client.post("/api/ask", json=body).json()
+    second = client.post("/api/ask", json=body).json()
+    assert first["answered_by"] == "claude-haiku" and not first["cached"]
+    assert second["cached"] and second["answered_by"] == "claude-haiku"
+    assert calls == [sonnet, MODEL_MAP["claude-haiku"]]
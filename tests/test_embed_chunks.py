@@ -0,0 +1,78 @@
+import io
+import json
+import threading
+import pytest
+from botocore.exceptions import ClientError
+from scripts import embed_chunks_bedrock as embed
+
+
+def _throttling_error():
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+
+
+@pytest.fixture
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(embed, "BACKOFF_BASE_SECONDS", 0.001)
+
+
+def test_concurrent_embedding_keeps_input_order_and_retries(monkeypatch, fast_backoff):
+    attempts = {}
+    lock = threading.Lock()
+
+    def fake_embed_text(text):
+        with lock:
+            attempts[text] = attempts.get(text, 0) + 1
+            first = attempts[text] == 1
+        if first and text.endswith("3"):
+            raise _throttling_error()
+        return [float(text.split("-")[1])]
+
+    monkeypatch.setattr(embed, "embed_text", fake_embed_text)
+    chunks = [{"id": f"bmw-{i}", "text": f"row-{i}", "metadata": {"row_number": i}} for i in range(40)]
+
+    out = io.StringIO()
+    written, throttle = embed.embed_chunks(iter(chunks), out, workers=4)
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert written == 40
+    assert [r["id"] for r in records] == [c["id"] for c in chunks]
+    assert records[13]["embedding"] == [13.0]
+    assert throttle.throttle_events == 4          # rows 3, 13, 23, 33 throttled once
+    assert throttle.limit >= 1
+
+
+def test_non_retryable_error_is_raised(monkeypatch, fast_backoff):
+    def fake_embed_text(text):
+        raise ClientError({"Error": {"Code": "ValidationException"}}, "InvokeModel")
+
+    monkeypatch.setattr(embed, "embed_text", fake_embed_text)
+    with pytest.raises(ClientError):
+        embed.embed_chunks(iter([{"id": "a", "text": "x"}]), io.StringIO(), workers=2)
+
+
+def test_resume_skips_completed_ids_and_truncates_partial_line(tmp_path):
+    output = tmp_path / "emb.jsonl"
+    good = json.dumps({"id": "bmw-0", "embedding": [0.0], "text": "a", "metadata": {}}) + "\n"
+    output.write_text(good + '{"id": "bmw-1", "embed')
+
+    done = embed.load_completed_ids(str(output))
+
+    assert done == {"bmw-0"}
+    assert output.read_text() == good
+
+    chunks = tmp_path / "chunks.jsonl"
+    chunks.write_text("".join(json.dumps({"id": f"bmw-{i}", "text": "t"}) + "\n" for i in range(3)))
+    pending = [c["id"] for c in embed.iter_pending_chunks(str(chunks), done)]
+    assert pending == ["bmw-1", "bmw-2"]
+
+
+def test_adaptive_throttle_aimd():
+    throttle = embed.AdaptiveThrottle(max_limit=8, increase_after=2)
+    throttle.acquire()
+    throttle.release(throttled=True)
+    assert throttle.limit == 4
+
+    for _ in range(4):
+        throttle.acquire()
+        throttle.release()
+    assert throttle.limit == 6
@@ -0,0 +1,66 @@
+import io
+import json
+import pytest
+from backend.services import embeddings
+from backend.services.cache import TTLCache, SqliteCache
+
+
+class FakeBedrock:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke_model(self, modelId, body, accept, contentType):
+        self.calls += 1
+        text = json.loads(body)["inputText"]
+        return {"body": io.BytesIO(json.dumps({"embedding": [float(len(text)), 0.5, -1.25]}).encode())}
+
+
+@pytest.fixture
+def fake_bedrock(monkeypatch):
+    fake = FakeBedrock()
+    monkeypatch.setattr(embeddings, "bedrock", fake)
+    monkeypatch.setattr(embeddings, "_query_cache", TTLCache(max_size=8, ttl_seconds=60))
+    monkeypatch.setattr(embeddings, "_disk_cache", None)
+    return fake
+
+
+def test_normalized_queries_share_one_bedrock_call(fake_bedrock):
+    first = embeddings.get_query_embedding("Best selling BMW 2022")
+    second = embeddings.get_query_embedding("  best   SELLING bmw 2022 ")
+
+    assert first == second
+    assert fake_bedrock.calls == 1
+    stats = embeddings.embedding_cache_stats()["memory"]
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_disk_tier_survives_memory_reset(fake_bedrock, tmp_path, monkeypatch):
+    disk = SqliteCache(str(tmp_path / "emb.sqlite3"), ttl_seconds=60)
+    monkeypatch.setattr(embeddings, "_disk_cache", disk)
+
+    original = embeddings.get_query_embedding("X5 sales in Asia")
+
+    # Simulate a fresh process: empty memory tier, same SQLite file
+    monkeypatch.setattr(embeddings, "_query_cache", TTLCache(max_size=8, ttl_seconds=60))
+    monkeypatch.setattr(embeddings, "_disk_cache", SqliteCache(disk.path, ttl_seconds=60))
+
+    assert embeddings.get_query_embedding("x5 sales in asia") == original
+    assert fake_bedrock.calls == 1
+
+
+def test_ttl_cache_lru_eviction_and_expiry(monkeypatch):
+    cache = TTLCache(max_size=2, ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")          # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+    now = [1000.0]
+    monkeypatch.setattr("backend.services.cache.time.monotonic", lambda: now[0])
+    cache.set("d", 4)
+    now[0] += 11
+    assert cache.get("d") is None
@@ -0,0 +1,74 @@
+import json
+import numpy as np
+import pytest
+from backend.services.embedding_store import (
+    EmbeddingStore,
+    EmbeddingStoreWriter,
+    convert_jsonl,
+    is_store,
+)
+from backend.services.local_index import LocalVectorIndex
+
+
+def _write_jsonl(path, n=5, dim=4):
+    rng = np.random.default_rng(0)
+    records = []
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            record = {
+                "id": f"bmw-{i}",
+                "embedding": rng.normal(size=dim).tolist(),
+                "text": f"Model: i{i}; Region: Südamerika",
+                "metadata": {"row_number": i},
+            }
+            records.append(record)
+            f.write(json.dumps(record) + "\n")
+    return records
+
+
+def test_convert_jsonl_roundtrip(tmp_path):
+    records = _write_jsonl(tmp_path / "emb.jsonl")
+    store_path = str(tmp_path / "store")
+
+    assert convert_jsonl(str(tmp_path / "emb.jsonl"), store_path) == 5
+    assert is_store(store_path)
+
+    store = EmbeddingStore.open(store_path)
+    assert len(store) == 5 and store.dim == 4
+    assert isinstance(store.vectors, np.memmap)
+    assert store.ids[2] == "bmw-2"
+    assert store.texts[-1] == records[-1]["text"]
+    assert store.metadata(3) == {"row_number": 3}
+    np.testing.assert_allclose(store.vectors[1], records[1]["embedding"], rtol=1e-6)
+
+    roundtrip = list(store.iter_records())
+    assert [r["id"] for r in roundtrip] == [r["id"] for r in records]
+
+
+def test_normalized_store_is_used_zero_copy_by_local_index(tmp_path):
+    _write_jsonl(tmp_path / "emb.jsonl")
+    store_path = str(tmp_path / "store")
+    convert_jsonl(str(tmp_path / "emb.jsonl"), store_path, normalize=True)
+
+    index = LocalVectorIndex.from_path(store_path)
+    reference = LocalVectorIndex.from_path(str(tmp_path / "emb.jsonl"))
+
+    assert isinstance(index.matrix, np.memmap)
+    query = np.ones(4)
+    assert [m["id"] for m in index.query(query, top_k=3)] == [m["id"] for m in reference.query(query, top_k=3)]
+
+    # Metadata is only decoded once a filtered search needs it
+    assert not index.masks.built
+    filtered = index.query(query, top_k=3, metadata_filter={"row_number": {"$gte": 3}})
+    assert index.masks.built and sorted(m["id"] for m in filtered) == ["bmw-3", "bmw-4"]
+
+
+def test_writer_rejects_dim_mismatch_and_leaves_no_partial_store(tmp_path):
+    store_path = str(tmp_path / "store")
+    with pytest.raises(ValueError):
+        with EmbeddingStoreWriter(store_path) as writer:
+            writer.append("a", [1.0, 2.0])
+            writer.append("b", [1.0, 2.0, 3.0])
+
+    assert not is_store(store_path)
+    assert not (tmp_path / "store.tmp").exists()
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from backend.services.filters import MetadataMasks, parse_filters, describe_filter
+from backend.services.local_index import LocalVectorIndex
+from backend.services.ann_index import IVFIndex
+from backend.services.answer_cache import SemanticAnswerCache
+
+MODELS = ["X5", "i8", "M3", "X1"]
+REGIONS = ["Europe", "Asia", "North America"]
+
+
+def _rows(n=400):
+    return [
+        {"Model": MODELS[i % 4], "Region": REGIONS[i % 3], "Year": 2010 + i % 15, "row_number": i}
+        for i in range(n)
+    ]
+
+
+def test_parse_filters_from_questions():
+    assert parse_filters("Hybrid BMWs in Europe in 2020?") == {
+        "Fuel_Type": {"$eq": "Hybrid"}, "Region": {"$eq": "Europe"}, "Year": {"$eq": 2020},
+    }
+    assert parse_filters("Compare the X5 and X6 in North America since 2018") == {
+        "Region": {"$eq": "North America"}, "Model": {"$in": ["X5", "X6"]}, "Year": {"$gte": 2018},
+    }
+    assert parse_filters("i8 sales between 2015 and 2018")["Year"] == {"$gte": 2015, "$lte": 2018}
+    assert parse_filters("3 Series before 2015") == {"Model": {"$eq": "3 Series"}, "Year": {"$lt": 2015}}
+    # "high" alone is not a Sales_Classification constraint; engine sizes are not years
+    assert parse_filters("Which model has the highest 3.0 engine price?") == {}
+    assert parse_filters("rows with a high sales classification") == {"Sales_Classification": {"$eq": "High"}}
+    assert describe_filter({"Region": {"$eq": "Asia"}, "Year": {"$gte": 2018}}) == "Region = Asia; Year >= 2018"
+
+
+def test_metadata_masks_evaluate_pinecone_operators():
+    masks = MetadataMasks.from_records(_rows(30) + [{}])
+    assert "Model" in masks.bitmaps and "row_number" in masks.bitmaps
+
+    def ids(flt):
+        return np.flatnonzero(masks.mask(flt)).tolist()
+
+    assert ids({"Model": {"$eq": "X5"}, "Region": "Asia"}) == [4, 16, 28]
+    assert ids({"Model": {"$in": ["i8", "M3"]}, "Year": {"$gte": 2022}}) == [13, 14, 29]
+    assert ids({"Year": {"$eq": "2011"}}) == [1, 16]                 # numbers compare as numbers
+    assert ids({"$or": [{"Model": "X1", "Year": 2013}, {"row_number": {"$lt": 2}}]}) == [0, 1, 3]
+    assert ids({"Color": "Red"}) == []                               # unknown field matches nothing
+    assert masks.mask({}) is None
+    with pytest.raises(ValueError):
+        masks.mask({"Model": {"$gt": "X1"}})
+
+
+def test_filtered_search_only_returns_matching_rows():
+    rng = np.random.default_rng(0)
+    rows = _rows()
+    vectors = rng.normal(size=(len(rows), 8)).astype(np.float32)
+    ids = [f"bmw-{i}" for i in range(len(rows))]
+    index = LocalVectorIndex(ids, vectors, [""] * len(rows), metadata=rows)
+    ivf = IVFIndex.build(ids, vectors, [""] * len(rows), nlist=8, nprobe=1, metadata=rows)
+
+    def allowed(flt):
+        return {f"bmw-{i}" for i in np.flatnonzero(index.masks.mask(flt))}
+
+    selective = {"Model": "X5", "Region": "Asia", "Year": {"$lte": 2014}}   # gathered rows
+    broad = {"Region": {"$ne": "Asia"}}                                       # masked full scan
+    for flt in (selective, broad):
+        expected = [m["id"] for m in index.query(vectors[7], top_k=len(rows)) if m["id"] in allowed(flt)][:5]
+        found = index.query(vectors[7], top_k=5, metadata_filter=flt)
+        assert [m["id"] for m in found] == expected
+        assert {m["id"] for m in ivf.query(vectors[7], top_k=5, metadata_filter=flt)} <= allowed(flt)
+
+    # Too few matches in the probed list: IVF scans every matching row, i.e. exact results
+    exact = index.query(vectors[7], top_k=5, metadata_filter=selective)
+    assert ivf.query(vectors[7], top_k=5, metadata_filter=selective) == exact
+
+
+def test_answer_cache_is_scoped_by_filter():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("m", 5, [1.0, 0.0], "X5 sales in 2020", "A", [], scope='{"Year": 2020}')
+    assert cache.lookup("m", 5, [1.0, 0.0], scope='{"Year": 2021}') is None
+    assert cache.lookup("m", 5, [1.0, 0.0], scope='{"Year": 2020}')["answer"] == "A"
@@ -25,3 +25,38 @@ def test_generate_answer_live_call():
     )
     assert isinstance(answer, str)
     assert len(answer) > 0
+
+
+def test_parse_stream_chunk_per_model_family():
+    """Each model family streams text deltas in a different shape."""
+    from backend.services.generate import parse_stream_chunk
+
+    assert parse_stream_chunk({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hi"}}) == "Hi"
+    assert parse_stream_chunk({"type": "message_start", "message": {"role": "assistant"}}) == ""
+    assert parse_stream_chunk({"type": "message_delta", "delta": {"stop_reason": "end_turn"}}) == ""
+    assert parse_stream_chunk({"outputText": "Titan", "index": 0}) == "Titan"
+    assert parse_stream_chunk({"outputs": [{"text": "Mistral", "stop_reason": None}]}) == "Mistral"
+    assert parse_stream_chunk({"generation": "DeepSeek"}) == "DeepSeek"
+
+
+def test_stream_answer_yields_fragments(monkeypatch):
+    """stream_answer should decode the Bedrock event stream into text fragments."""
+    import json
+    from backend.services import generate
+
+    events = [
+        {"type": "message_start", "message": {}},
+        {"type": "content_block_delta", "delta": {"text": "The X5 "}},
+        {"type": "content_block_delta", "delta": {"text": "sold most."}},
+        {"type": "message_stop"},
+    ]
+
+    class FakeBedrock:
+        def invoke_model_with_response_stream(self, modelId, body, accept, contentType):
+            assert json.loads(body)["messages"][0]["role"] == "user"
+            return {"body": [{"chunk": {"bytes": json.dumps(e).encode()}} for e in events]}
+
+    monkeypatch.setattr(generate, "bedrock", FakeBedrock())
+
+    parts = list(generate.stream_answer("anthropic.claude-3-haiku-20240307-v1:0", "Which?", "ctx"))
+    assert parts == ["The X5 ", "sold most."]
@@ -0,0 +1,117 @@
+import json
+import pytest
+from scripts import incremental_ingest as ingest
+
+
+class InMemoryIndex:
+    def __init__(self):
+        self.vectors = {}
+
+    def upsert(self, vectors):
+        for vid, values, metadata in vectors:
+            self.vectors[vid] = (values, metadata)
+
+    def delete(self, ids):
+        for vid in ids:
+            self.vectors.pop(vid, None)
+
+
+@pytest.fixture
+def fake_embed(monkeypatch):
+    embedded = []
+
+    def fake_embed_chunks(chunks, outfile, workers=1, **kwargs):
+        count = 0
+        for chunk in chunks:
+            embedded.append(chunk["id"])
+            outfile.write(json.dumps({
+                "id": chunk["id"], "embedding": [float(len(chunk["text"]))],
+                "text": chunk["text"], "metadata": chunk.get("metadata", {}),
+            }) + "\n")
+            count += 1
+        return count, None
+
+    monkeypatch.setattr(ingest, "embed_chunks", fake_embed_chunks)
+    return embedded
+
+
+def _write_chunks(path, texts):
+    with open(path, "w", encoding="utf-8") as f:
+        for cid, text in texts.items():
+            f.write(json.dumps({"id": cid, "text": text, "metadata": {}}) + "\n")
+
+
+def test_second_run_only_touches_diff(tmp_path, fake_embed):
+    chunks = str(tmp_path / "chunks.jsonl")
+    embeddings = str(tmp_path / "emb.jsonl")
+    manifest = str(tmp_path / "manifest.json")
+    index = InMemoryIndex()
+
+    _write_chunks(chunks, {"bmw-0": "X5 2022", "bmw-1": "i8 2013", "bmw-2": "M3 2020"})
+    first = ingest.run(chunks, embeddings, manifest, index=index)
+    assert len(first["added"]) == 3 and set(index.vectors) == {"bmw-0", "bmw-1", "bmw-2"}
+
+    fake_embed.clear()
+    _write_chunks(chunks, {"bmw-0": "X5 2022", "bmw-1": "i8 2014", "bmw-3": "X1 2021"})
+    second = ingest.run(chunks, embeddings, manifest, index=index)
+
+    assert second["added"] == ["bmw-3"]
+    assert second["changed"] == ["bmw-1"]
+    assert second["removed"] == ["bmw-2"]
+    assert second["unchanged"] == ["bmw-0"]
+    assert sorted(fake_embed) == ["bmw-1", "bmw-3"]          # only the diff is embedded
+    assert set(index.vectors) == {"bmw-0", "bmw-1", "bmw-3"}
+    assert index.vectors["bmw-1"][1]["text"] == "i8 2014"
+
+    merged = [json.loads(l) for l in open(embeddings)]
+    assert [r["id"] for r in merged] == ["bmw-0", "bmw-1", "bmw-3"]
+    assert merged[1]["text"] == "i8 2014"
+
+
+def test_no_pinecone_run_leaves_index_sync_pending(tmp_path, fake_embed):
+    chunks = str(tmp_path / "chunks.jsonl")
+    embeddings = str(tmp_path / "emb.jsonl")
+    manifest = str(tmp_path / "manifest.json")
+    index = InMemoryIndex()
+
+    _write_chunks(chunks, {"bmw-0": "X5 2022", "bmw-1": "i8 2013", "bmw-2": "M3 2020"})
+    ingest.run(chunks, embeddings, manifest, index=index)
+
+    _write_chunks(chunks, {"bmw-0": "X5 2022", "bmw-1": "i8 2014"})
+    offline = ingest.run(chunks, embeddings, manifest, index=None)
+    assert offline["changed"] == ["bmw-1"] and offline["upserted"] == []
+
+    fake_embed.clear()
+    synced = ingest.run(chunks, embeddings, manifest, index=index)
+    assert synced["changed"] == [] and fake_embed == []           # already embedded locally
+    assert synced["upserted"] == ["bmw-1"] and synced["deleted"] == ["bmw-2"]
+    assert set(index.vectors) == {"bmw-0", "bmw-1"} and index.vectors["bmw-1"][1]["text"] == "i8 2014"
+
+
+def test_first_run_seeds_hashes_from_existing_embeddings(tmp_path, fake_embed):
+    chunks = str(tmp_path / "chunks.jsonl")
+    embeddings = str(tmp_path / "emb.jsonl")
+    _write_chunks(chunks, {"bmw-0": "X5 2022", "bmw-1": "i8 2013"})
+    ingest.run(chunks, embeddings, str(tmp_path / "old_manifest.json"))
+
+    fake_embed.clear()
+    _write_chunks(chunks, {"bmw-0": "X5 2022", "bmw-1": "i8 2014"})
+    diff = ingest.run(chunks, embeddings, str(tmp_path / "manifest.json"))
+    assert diff["unchanged"] == ["bmw-0"] and fake_embed == ["bmw-1"]
+
+
+def test_dry_run_changes_nothing(tmp_path, fake_embed):
+    chunks = str(tmp_path / "chunks.jsonl")
+    manifest = str(tmp_path / "manifest.json")
+    _write_chunks(chunks, {"bmw-0": "X5"})
+
+    diff = ingest.run(chunks, str(tmp_path / "emb.jsonl"), manifest, dry_run=True)
+
+    assert diff["added"] == ["bmw-0"]
+    assert fake_embed == []
+    assert not (tmp_path / "manifest.json").exists()
+
+
+def test_chunk_hash_covers_metadata():
+    base = {"id": "a", "text": "t", "metadata": {"Year": 2020}}
+    assert ingest.chunk_hash(base) != ingest.chunk_hash({**base, "metadata": {"Year": 2021}})
@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+import main
+from backend.services import vector_store
+from backend.services.lexical_index import BM25Index, rrf_fuse, query_terms
+
+ROWS = {
+    "bmw-0": "Model: X5; Year: 2022; Region: Asia; Fuel_Type: Diesel; Engine_Size_L: 3.0",
+    "bmw-1": "Model: X5; Year: 2021; Region: Europe; Fuel_Type: Petrol; Engine_Size_L: 2.0",
+    "bmw-2": "Model: i8; Year: 2022; Region: Asia; Fuel_Type: Hybrid; Engine_Size_L: 1.5",
+    "bmw-3": "Model: 5 Series; Year: 2016; Region: Asia; Fuel_Type: Petrol; Engine_Size_L: 3.5",
+}
+
+
+@pytest.fixture
+def index():
+    return BM25Index.build(list(ROWS), list(ROWS.values()))
+
+
+def test_bm25_ranks_rows_matching_more_terms_first(index):
+    results = index.search("X5 2022 Asia", top_k=3)
+    assert results[0]["id"] == "bmw-0" and results[0]["matched"] == 3
+    assert {r["id"] for r in results[1:]} == {"bmw-1", "bmw-2"}
+    assert index.search("engine 3.5", top_k=1)[0]["id"] == "bmw-3"
+    assert index.search("tesla", top_k=3) == []
+
+
+def test_require_all_only_returns_full_matches(index):
+    assert [r["id"] for r in index.search("x5 asia", top_k=5, require_all=True)] == ["bmw-0"]
+    # A term outside the vocabulary means no confident match at all
+    assert index.search("x5 asia cheapest", top_k=5, require_all=True) == []
+    assert query_terms("What is the X5 in Asia?") == ["x5", "asia"]
+
+
+def test_rrf_rewards_agreement_between_retrievers():
+    vector = [{"id": "a", "score": 0.9, "text": "A"}, {"id": "b", "score": 0.8, "text": "B"}]
+    lexical = [{"id": "b", "score": 7.1, "text": "B"}, {"id": "c", "score": 5.0, "text": "C"}]
+    fused = rrf_fuse([vector, lexical], top_k=3, k=60)
+    assert [m["id"] for m in fused] == ["b", "a", "c"]
+    assert fused[0]["score"] == round(1 / 62 + 1 / 61, 6)
+
+
+def test_hybrid_fast_path_skips_embedding(index, monkeypatch):
+    monkeypatch.setattr(vector_store, "_lexical_index", index)
+    monkeypatch.setattr(vector_store, "RETRIEVAL_MODE", "hybrid")
+    monkeypatch.setattr(main, "RETRIEVAL_MODE", "hybrid")
+    # "sold best" questions would otherwise go to the aggregate engine
+    monkeypatch.setattr(main, "ANALYTICS_ENABLED", False)
+    monkeypatch.setattr(main, "generate_answer", lambda model_id, question, context: "i8 in Asia.")
+    monkeypatch.setattr(main, "answer_cache", main.SemanticAnswerCache(max_entries=0))
+    embedded = []
+    monkeypatch.setattr(main, "get_query_embedding", lambda q: embedded.append(q) or [1.0, 0.0])
+    monkeypatch.setattr(main, "retrieve_top_k", lambda e, top_k=5, metadata_filter=None: [{"id": "bmw-3", "score": 0.9, "text": ROWS["bmw-3"]}])
+    client = TestClient(main.app)
+
+    fast = client.post("/api/ask", json={"query": "i8 2022 Asia", "k": 2}).json()
+    assert fast["retrieval"] == "lexical" and embedded == []
+    assert [m["id"] for m in fast["matches"]] == ["bmw-2"]
+
+    hybrid = client.post("/api/ask", json={"query": "Which hybrid sold best in Asia?", "k": 2}).json()
+    assert hybrid["retrieval"] == "hybrid" and len(embedded) == 1
+    assert hybrid["matches"][0]["id"] in {"bmw-2", "bmw-3"}
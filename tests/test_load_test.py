@@ -0,0 +1,75 @@
+import json
+import asyncio
+import urllib.request
+import boto3
+import pytest
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from scripts.fake_services import FakeBedrock, FakeVectorStore, parse_latency
+from scripts import load_test
+
+
+def _bedrock_client(url):
+    return boto3.client("bedrock-runtime", region_name="us-east-1", endpoint_url=url,
+                        aws_access_key_id="test", aws_secret_access_key="test",
+                        config=Config(retries={"mode": "standard", "total_max_attempts": 1}))
+
+
+def test_fake_bedrock_speaks_the_boto3_wire_format():
+    with FakeBedrock(embed_latency="fixed:1", generate_latency="uniform:1:2", dimension=8) as fake:
+        client = _bedrock_client(fake.url)
+        body = client.invoke_model(modelId="amazon.titan-embed-text-v1", body=json.dumps({"inputText": "X5"}))["body"]
+        assert len(json.loads(body.read())["embedding"]) == 8
+        body = client.invoke_model(modelId="mistral.mistral-7b-instruct-v0:1", body=json.dumps({"prompt": "q"}))["body"]
+        assert json.loads(body.read())["outputs"][0]["text"]
+
+        fake.throttle_rate = 1.0
+        with pytest.raises(ClientError) as error:
+            client.invoke_model(modelId="amazon.titan-embed-text-v1", body=json.dumps({"inputText": "X5"}))
+        assert error.value.response["Error"]["Code"] == "ThrottlingException"
+        assert (fake.calls, fake.throttled) == (3, 1)
+
+
+def test_fake_vector_store_answers_pinecone_queries():
+    with FakeVectorStore(latency="fixed:1", corpus_size=100) as fake:
+        request = urllib.request.Request(
+            fake.url + "/query", method="POST", headers={"Content-Type": "application/json"},
+            data=json.dumps({"vector": [0.1, 0.2], "topK": 3, "includeMetadata": True}).encode(),
+        )
+        first = json.loads(urllib.request.urlopen(request).read())["matches"]
+        again = json.loads(urllib.request.urlopen(request).read())["matches"]
+    assert len(first) == 3 and first == again
+    assert first[0]["metadata"]["text"].startswith("Model: ")
+
+
+def test_latency_specs_and_regression_check():
+    assert parse_latency("fixed:50")() == 0.05
+    assert 0.02 <= parse_latency("uniform:20:80")() <= 0.08
+    with pytest.raises(ValueError):
+        parse_latency("gaussian:10")
+
+    baseline = {"levels": {"8": {"rps": 100.0, "p95_ms": 200.0, "errors": {}}}}
+    ok = {"concurrency": 8, "rps": 90.0, "p95_ms": 230.0, "errors": {}}
+    assert load_test.check_regressions([ok], baseline, tolerance=0.2) == []
+    slow = {"concurrency": 8, "rps": 70.0, "p95_ms": 260.0, "errors": {"503": 2}}
+    assert len(load_test.check_regressions([slow], baseline, tolerance=0.2)) == 3
+    assert load_test.check_regressions([{**slow, "concurrency": 4}], baseline) == []
+
+
+def test_load_run_against_the_real_app(tmp_path):
+    with FakeBedrock(embed_latency="fixed:1", generate_latency="fixed:5") as bedrock, \
+         FakeVectorStore(latency="fixed:1") as vectors:
+        process, url = load_test.start_app(load_test.server_env(bedrock.url, vectors.url), load_test._free_port())
+        try:
+            result = asyncio.run(load_test.run_level(url, concurrency=4, requests=12))
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+    assert result["ok"] == 12 and result["errors"] == {}
+    assert result["rps"] > 0 and result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+    assert vectors.calls == 12 and bedrock.calls == 24          # one embedding + one answer each
+
+    path = str(tmp_path / "baseline.json")
+    load_test.save_baseline(path, [result], {"requests": 12})
+    assert load_test.check_regressions([result], load_test.load_baseline(path)) == []
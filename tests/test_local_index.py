@@ -0,0 +1,101 @@
+import json
+import numpy as np
+import pytest
+from backend.services.local_index import LocalVectorIndex, top_k_indices
+
+
+def _make_index(n=200, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    ids = [f"bmw-{i}" for i in range(n)]
+    texts = [f"row {i}" for i in range(n)]
+    return LocalVectorIndex(ids, vectors, texts), vectors
+
+
+def test_search_matches_bruteforce_cosine():
+    """Top-k from the index should equal a full sort of cosine scores."""
+    index, vectors = _make_index()
+    query = vectors[17] + 0.01
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(unit @ (query / np.linalg.norm(query))))[:5]
+
+    results = index.query(query.tolist(), top_k=5)
+
+    assert [r["id"] for r in results] == [f"bmw-{i}" for i in expected]
+    assert results[0]["id"] == "bmw-17"
+    assert all(set(r) == {"id", "score", "text"} for r in results)
+    assert results == sorted(results, key=lambda r: -r["score"])
+
+
+def test_batched_search_and_blocking(monkeypatch):
+    """Blocked scoring over large corpora must agree with a single matmul."""
+    index, vectors = _make_index(n=300)
+    queries = vectors[:4]
+
+    single = index.search(queries, top_k=7)
+    monkeypatch.setattr("backend.services.local_index.SCORE_BLOCK_ROWS", 64)
+    blocked = index.search(queries, top_k=7)
+
+    assert single == blocked
+    assert len(single) == 4 and all(len(r) == 7 for r in single)
+
+
+def test_top_k_larger_than_corpus():
+    scores = np.array([[0.1, 0.9, 0.5]], dtype=np.float32)
+    assert top_k_indices(scores, 10).tolist() == [[1, 2, 0]]
+
+
+def test_from_jsonl_and_retrieve_top_k_local_backend(tmp_path, monkeypatch):
+    """retrieve_top_k should route to the local index when configured."""
+    path = tmp_path / "embeddings.jsonl"
+    with open(path, "w") as f:
+        f.write(json.dumps({"id": "a", "embedding": [1.0, 0.0], "text": "Model: X5"}) + "\n")
+        f.write(json.dumps({"id": "b", "embedding": [0.0, 1.0], "text": "Model: i8"}) + "\n")
+
+    monkeypatch.setattr("backend.services.vector_store.VECTOR_BACKEND", "local")
+    monkeypatch.setattr("backend.services.vector_store.LOCAL_EMBEDDINGS_PATH", str(path))
+    monkeypatch.setattr("backend.services.vector_store._local_index", None)
+
+    from backend.services.vector_store import retrieve_top_k
+
+    results = retrieve_top_k([0.9, 0.1], top_k=1)
+    assert results == [{"id": "a", "score": pytest.approx(0.9939, abs=1e-4), "text": "Model: X5"}]
+
+    from backend.services.vector_store import retrieve_top_k_batch
+
+    batch = retrieve_top_k_batch([[0.9, 0.1], [0.1, 0.9]], top_k=1)
+    assert [r[0]["id"] for r in batch] == ["a", "b"]
+
+
+def test_concurrent_first_queries_load_the_index_once(monkeypatch):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from backend.services import local_index, vector_store
+
+    index, _ = _make_index(n=20, dim=4)
+    loads = []
+
+    def slow_load(path):
+        loads.append(path)
+        time.sleep(0.05)
+        return index
+
+    monkeypatch.setattr(vector_store, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(vector_store, "_local_index", None)
+    monkeypatch.setattr(local_index.LocalVectorIndex, "from_path", staticmethod(slow_load))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        found = list(pool.map(lambda _: vector_store._get_local_index(), range(8)))
+    assert len(loads) == 1 and all(f is index for f in found)
+
+
+def test_concurrent_batches_share_one_query_pool(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from backend.services import vector_store
+
+    monkeypatch.setattr(vector_store, "_query_pool", None)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        pools = list(pool.map(lambda _: vector_store._get_query_pool(), range(8)))
+    assert all(p is pools[0] for p in pools)
+    vector_store._query_pool.shutdown()
@@ -0,0 +1,73 @@
+import os
+import json
+import numpy as np
+from backend.services.log_sink import RequestLogSink
+from scripts import compact_logs
+
+
+def _entry(i, model="claude-haiku", query="Top model in 2022?", latency=100.0):
+    return {"timestamp": f"2026-01-01T00:00:{i % 60:02d}.123456", "model": model, "query": query, "k": 5,
+            "match_ids": ["bmw-1"], "scores": [0.8], "context_length": 10, "answer_length": 20,
+            "latency_ms": latency, "timings": {"generation": latency / 2}}
+
+
+def test_sink_batches_rotates_and_counts_drops(tmp_path):
+    path = str(tmp_path / "requests.jsonl")
+    # flush_interval=0: no writer thread, the test drains the queue itself
+    sink = RequestLogSink(path, max_queue=10, batch_size=4, flush_interval=0, rotate_bytes=1500, echo=False)
+
+    assert all(sink.write(_entry(i)) for i in range(10))
+    assert not sink.write(_entry(10)) and sink.dropped == 1
+    assert not os.path.exists(path)                # nothing written on the request path
+
+    sink.flush()
+    for i in range(11, 15):
+        sink.write(_entry(i))
+    sink.close()
+
+    files = compact_logs.log_files(path)
+    assert sink.rotations >= 1 and len(files) == sink.rotations + 1 and files[-1] == path
+    assert all(os.path.getsize(f) <= 1500 for f in files)
+    entries = list(compact_logs.read_entries(files))
+    assert sink.written == 14 and [e["timestamp"][17:19] for e in entries] == [f"{i:02d}" for i in range(15) if i != 10]
+
+
+def test_sink_writer_thread_flushes_in_background(tmp_path):
+    path = str(tmp_path / "logs" / "requests.jsonl")
+    sink = RequestLogSink(path, flush_interval=0.01, echo=False)
+    sink.write(_entry(1))
+    sink.close()
+    assert json.loads(open(path).read())["model"] == "claude-haiku"
+    assert sink.stats() == {"queued": 0, "written": 1, "dropped": 0, "rotations": 0}
+
+
+def test_compaction_report(tmp_path):
+    entries = (
+        [_entry(i, latency=1000.0 + i) for i in range(4)]
+        + [_entry(5, model="mistral", query="  top MODEL in 2022? ", latency=3000.0)]
+        + [_entry(6, model="mistral", query="Sales in Asia", latency=2000.0)]
+    )
+    columns = compact_logs.compact(entries)
+    compact_logs.save(columns, str(tmp_path / "log.npz"))
+    columns = compact_logs.load(str(tmp_path / "log.npz"))
+
+    assert columns["timestamp"].dtype == np.dtype("datetime64[ms]")
+    assert list(columns["model_values"]) == ["claude-haiku", "mistral"]
+    assert np.isnan(columns["timing_generation"]).sum() == 0
+
+    result = compact_logs.report(columns, top=5, min_repeats=3)
+    assert result["requests"] == 6
+    assert result["top_queries"][0] == {"query": "top model in 2022?", "count": 5, "mean_latency_ms": 1401.2}
+    assert result["latency_by_model"]["mistral"]["p50"] == 2500.0
+    assert result["latency_by_stage"]["generation"]["count"] == 6
+    assert result["cache_candidates"] == [{"query": "top model in 2022?", "count": 5, "saved_ms": 5604.8}]
+
+
+def test_lambda_default_does_not_write_to_the_package_dir():
+    import sys
+    import subprocess
+    env = {k: v for k, v in os.environ.items() if k != "LOG_FILE"}
+    env["AWS_LAMBDA_FUNCTION_NAME"] = "rag-search"
+    out = subprocess.run([sys.executable, "-c", "from backend.config.settings import LOG_FILE; print(repr(LOG_FILE))"],
+                         env=env, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "''"
@@ -0,0 +1,76 @@
+import json
+import asyncio
+import pytest
+from backend.services import concurrency
+from backend.services.metrics import MetricsBuffer, set_dimensions
+
+
+def _buffer():
+    lines = []
+    return MetricsBuffer(namespace="Test", flush_interval=0, emit=lines.append), lines
+
+
+def test_flush_emits_one_emf_document_per_dimension_set():
+    buf, lines = _buffer()
+    buf.record("embedding_ms", 12.5, Model="claude-haiku", K=5)
+    buf.record("embedding_ms", 7.5, Model="claude-haiku", K=5)
+    buf.increment("generation_errors", Model="claude-haiku", K=5)
+    buf.record("embedding_ms", 3.0, Model="mistral", K=3)
+    assert lines == []
+
+    buf.flush()
+    docs = {d["Model"]: d for d in map(json.loads, lines)}
+
+    haiku = docs["claude-haiku"]
+    assert haiku["embedding_ms"] == [12.5, 7.5]
+    assert haiku["generation_errors"] == 1
+    assert haiku["K"] == "5"
+    directive = haiku["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == "Test"
+    assert directive["Dimensions"] == [["K", "Model"]]
+    assert {"Name": "generation_errors", "Unit": "Count"} in directive["Metrics"]
+    assert docs["mistral"]["embedding_ms"] == [3.0]
+
+    buf.flush()
+    assert len(lines) == 2
+
+
+def test_full_metric_is_written_without_waiting_for_flush():
+    buf, lines = _buffer()
+    for i in range(100):
+        buf.record("retrieval_ms", float(i), Model="m", K=1)
+    assert len(lines) == 1 and len(json.loads(lines[0])["retrieval_ms"]) == 100
+
+
+def test_run_stage_records_latency_and_errors(monkeypatch):
+    buf, lines = _buffer()
+    monkeypatch.setattr(concurrency, "record_latency", lambda stage, ms: buf.record(f"{stage}_ms", ms))
+    monkeypatch.setattr(concurrency, "record_error", lambda stage: buf.increment(f"{stage}_errors"))
+
+    def boom():
+        raise RuntimeError("bedrock down")
+
+    async def scenario():
+        set_dimensions("claude-haiku", 5)
+        await concurrency.run_stage("retrieval", lambda: "ok", timeout=5)
+        with pytest.raises(RuntimeError):
+            await concurrency.run_stage("generation", boom, timeout=5)
+
+    asyncio.run(scenario())
+    buf.flush()
+    doc = json.loads(lines[0])
+    assert doc["Model"] == "claude-haiku" and doc["K"] == "1-5"
+    assert len(doc["retrieval_ms"]) == 1
+    assert doc["generation_errors"] == 1
+
+
+def test_k_is_bucketed_and_lambda_invocations_flush(monkeypatch):
+    from backend.services.metrics import k_bucket
+    assert [k_bucket(k) for k in (1, 5, 6, 20, 500)] == ["1-5", "1-5", "6-10", "11-20", "21+"]
+
+    import main
+    flushed = []
+    monkeypatch.setattr(main, "_mangum", lambda event, context: {"statusCode": 200})
+    monkeypatch.setattr(main.metrics, "flush", lambda: flushed.append("metrics"))
+    monkeypatch.setattr(main.request_log, "flush", lambda: flushed.append("request_log"))
+    assert main.handler({}, None) == {"statusCode": 200} and flushed == ["metrics", "request_log"]
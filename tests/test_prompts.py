@@ -0,0 +1,50 @@
+import os
+from backend.services import prompts
+from backend.services.generate import build_prompt
+
+TITAN = "amazon.titan-text-lite-v1"
+
+
+def test_template_compiled_once_and_reloaded_on_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(prompts, "RELOAD_CHECK_SECONDS", 0)
+    path = tmp_path / "tpl.txt"
+    path.write_text("C={{CONTEXT}} Q={{QUESTION}} {{OTHER}}")
+
+    first = prompts.get_template(str(path))
+    assert prompts.get_template(str(path)) is first
+    assert first.render(CONTEXT="ctx", QUESTION="q?") == "C=ctx Q=q? {{OTHER}}"
+
+    path.write_text("Q={{QUESTION}}")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+    assert prompts.get_template(str(path)).render(QUESTION="q?") == "Q=q?"
+
+
+def test_default_template_resolves_independent_of_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    prompt = build_prompt("Which model sold most?", "X5: 100 units")
+    assert "X5: 100 units" in prompt and "Which model sold most?" in prompt
+    assert "{{" not in prompt
+
+
+def test_build_context_drops_lowest_scoring_matches(monkeypatch):
+    monkeypatch.setattr(prompts, "PROMPT_TOKEN_BUDGET", 10**6)
+    budget = prompts.input_token_budget(TITAN) - prompts.get_template().static_tokens
+    big = "x" * (budget * prompts.CHARS_PER_TOKEN // 2)
+    matches = [
+        {"text": "low " + big, "score": 0.1},
+        {"text": "high " + big, "score": 0.9},
+        {"text": "mid " + big, "score": 0.5},
+    ]
+
+    context = prompts.build_context(TITAN, matches)
+
+    assert context.startswith("high ")
+    assert "low " not in context
+    assert prompts.estimate_tokens(context) <= budget
+
+
+def test_budget_uses_model_window_and_global_cap(monkeypatch):
+    monkeypatch.setattr(prompts, "PROMPT_TOKEN_BUDGET", 10**6)
+    assert prompts.input_token_budget(TITAN) == 4096 - prompts.MAX_TOKENS
+    monkeypatch.setattr(prompts, "PROMPT_TOKEN_BUDGET", 1000)
+    assert prompts.input_token_budget("anthropic.claude-3-haiku-20240307-v1:0") == 1000
@@ -0,0 +1,62 @@
+from scripts import push_embeddings_to_pinecone as push
+
+
+def _chunks(n, text="X5 2022", dim=4):
+    return [{"id": f"bmw-{i}", "embedding": [0.1] * dim, "text": text, "metadata": {"row_number": i}}
+            for i in range(n)]
+
+
+def test_batches_bounded_by_count_and_bytes():
+    vectors = [push.to_vector(c) for c in _chunks(10, text="x" * 1000)]
+    by_count = list(push.iter_batches(vectors, max_count=3, max_bytes=10**9))
+    assert [len(b) for b in by_count] == [3, 3, 3, 1]
+
+    one = push.estimate_bytes(vectors[0])
+    by_bytes = list(push.iter_batches(vectors, max_count=100, max_bytes=one * 2 + 1))
+    assert all(len(b) <= 2 for b in by_bytes)
+    assert sum(len(b) for b in by_bytes) == 10
+
+
+def test_oversized_text_metadata_is_trimmed():
+    vector = push.to_vector(_chunks(1, text="é" * push.MAX_METADATA_TEXT_BYTES)[0])
+    assert len(vector[2]["text"].encode("utf-8")) <= push.MAX_METADATA_TEXT_BYTES
+    assert vector[2]["row_number"] == 0
+
+
+def test_upload_concurrent_with_retries(monkeypatch):
+    monkeypatch.setattr(push, "BACKOFF_BASE_SECONDS", 0)
+    target = push.InMemoryTarget(latency=0.001, fail_every=4)
+
+    stats = push.batch_upload(_chunks(250), target=target, max_count=10,
+                              concurrency=4, show_progress=False)
+
+    assert set(target.vectors) == {f"bmw-{i}" for i in range(250)}
+    assert target.vectors["bmw-7"][1] == {"text": "X5 2022", "row_number": 7}
+    assert stats["vectors"] == 250 and stats["batches"] == 25
+    assert stats["retries"] > 0 and stats["failed_batches"] == 0
+
+
+class DownTarget(push.InMemoryTarget):
+    def upsert(self, vectors):
+        with self._lock:
+            self.requests += 1
+        raise ConnectionError("service unavailable")
+
+
+def test_upload_reports_batches_that_exhaust_retries(monkeypatch):
+    monkeypatch.setattr(push, "BACKOFF_BASE_SECONDS", 0)
+    target = DownTarget()
+
+    stats = push.batch_upload(_chunks(5), target=target, max_count=2,
+                              max_retries=1, show_progress=False)
+
+    assert stats["failed_batches"] == 3 and stats["vectors"] == 0
+    assert target.requests == 6 and not target.vectors
+
+
+def test_cli_exits_nonzero_when_batches_fail(monkeypatch):
+    monkeypatch.setattr(push, "BACKOFF_BASE_SECONDS", 0)
+    monkeypatch.setattr(push, "load_embeddings", lambda path: _chunks(3))
+    monkeypatch.setattr(push, "pinecone_target", lambda: DownTarget())
+    assert push.main(["emb.jsonl", "--concurrency", "1"]) == 1
+    assert push.main(["emb.jsonl", "--target", "memory"]) == 0
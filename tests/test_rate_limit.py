@@ -0,0 +1,115 @@
+import asyncio
+from backend import security
+from backend.security import MemoryStore, RedisStore, SlidingWindowLimiter
+
+
+class FakeRedis:
+    """Just enough of redis-py for RedisStore (TTLs are recorded, not enforced)."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttl = {}
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def decr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) - 1
+        return self.data[key]
+
+    def expire(self, key, seconds):
+        self.ttl[key] = seconds
+        return True
+
+    def get(self, key):
+        value = self.data.get(key)
+        return None if value is None else str(value).encode()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.calls = redis, []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+def _drain(limiter, key, now, n):
+    return [limiter.check(key, now=now)[0] for _ in range(n)]
+
+
+def test_limit_enforced_and_denials_not_counted():
+    limiter = SlidingWindowLimiter(MemoryStore(window_seconds=60), max_requests=3, window_seconds=60)
+    assert _drain(limiter, "1.2.3.4", 600.0, 5) == [True, True, True, False, False]
+    allowed, retry_after = limiter.check("1.2.3.4", now=630.0)
+    assert not allowed and retry_after == 30
+    assert limiter.check("5.6.7.8", now=600.0)[0]
+
+
+def test_previous_window_is_weighted_by_overlap():
+    limiter = SlidingWindowLimiter(MemoryStore(window_seconds=60), max_requests=4, window_seconds=60)
+    _drain(limiter, "ip", 600.0, 4)
+    # 3/4 into the next window: 4 * 0.25 = 1 carried over → 3 more allowed
+    assert _drain(limiter, "ip", 705.0, 4) == [True, True, True, False]
+    # two windows later nothing carries over
+    assert _drain(limiter, "ip", 840.0, 4) == [True] * 4
+
+
+def test_idle_keys_are_evicted_and_key_count_is_capped():
+    store = MemoryStore(window_seconds=60, max_keys=100)
+    limiter = SlidingWindowLimiter(store, max_requests=5, window_seconds=60)
+    for i in range(1000):
+        limiter.check(f"10.0.{i // 256}.{i % 256}", now=600.0)
+    assert len(store) == 100
+
+    limiter.check("late", now=600.0 + 121)
+    assert len(store) == 1
+
+
+def test_redis_store_shares_counts_between_limiters():
+    redis = FakeRedis()
+    a = SlidingWindowLimiter(RedisStore(redis, window_seconds=60), max_requests=2, window_seconds=60)
+    b = SlidingWindowLimiter(RedisStore(redis, window_seconds=60), max_requests=2, window_seconds=60)
+
+    assert a.check("ip", now=600.0)[0]
+    assert b.check("ip", now=601.0)[0]
+    assert not a.check("ip", now=602.0)[0]
+    assert redis.data["rl:ip:10"] == 2 and redis.ttl["rl:ip:10"] == 120
+
+
+def test_store_failure_fails_open(monkeypatch):
+    class Broken:
+        store = None
+
+        def check(self, key):
+            raise ConnectionError("redis down")
+
+    class FakeRequest:
+        headers = {"x-forwarded-for": "9.9.9.9"}
+
+    monkeypatch.setattr(security, "limiter", Broken())
+    assert asyncio.run(security.enforce_rate_limit(FakeRequest())) is None
+
+
+def test_redis_checks_run_off_the_event_loop(monkeypatch):
+    import threading
+
+    class RecordingRedis(FakeRedis):
+        def pipeline(self, transaction=True):
+            threads.append(threading.current_thread())
+            return super().pipeline(transaction)
+
+    class FakeRequest:
+        headers = {"x-forwarded-for": "8.8.8.8"}
+
+    threads = []
+    monkeypatch.setattr(security, "limiter", SlidingWindowLimiter(RedisStore(RecordingRedis()), max_requests=5))
+    assert asyncio.run(security.enforce_rate_limit(FakeRequest())) is None
+    assert threads and threads[0] is not threading.main_thread()
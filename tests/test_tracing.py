@@ -0,0 +1,64 @@
+import time
+from fastapi.testclient import TestClient
+import main
+from backend.config.settings import DEFAULT_MODEL
+from backend.services import tracing
+from backend.services.tracing import LatencyHistograms
+
+client = TestClient(main.app)
+
+
+def test_spans_accumulate_and_feed_histograms(monkeypatch):
+    hist = LatencyHistograms()
+    monkeypatch.setattr(tracing, "histograms", hist)
+
+    tracing.start_trace("claude-haiku")
+    with tracing.span("embedding"):
+        time.sleep(0.01)
+    tracing.add_span("retrieval", 2.0)
+    tracing.add_span("retrieval", 3.0)
+    timings = tracing.finish_trace()
+
+    assert timings["embedding"] >= 10
+    assert timings["retrieval"] == 5.0
+    assert timings["request"] >= timings["embedding"]
+    assert tracing.current_trace() is None
+    assert hist.quantiles("retrieval", "claude-haiku") == {0.5: 5.0, 0.95: 5.0, 0.99: 5.0}
+
+    tracing.add_span("generation", 1.0)    # no active trace: ignored
+
+
+def test_quantiles_over_window():
+    hist = LatencyHistograms(window=100)
+    for ms in range(1, 201):
+        hist.observe("generation", "mistral", float(ms))
+    q = hist.quantiles("generation", "mistral")
+    assert q[0.5] == 151.0 and q[0.99] == 200.0
+    text = hist.render()
+    assert 'rag_stage_latency_ms_count{stage="generation",model="mistral"} 200' in text
+
+
+def test_ask_returns_timings_and_metrics_route_exposes_them(monkeypatch):
+    monkeypatch.setattr(tracing, "histograms", LatencyHistograms())
+    monkeypatch.setattr(main, "histograms", tracing.histograms)
+    monkeypatch.setattr(main, "get_query_embedding", lambda q: [0.3, 0.7])
+    monkeypatch.setattr(main, "retrieve_top_k", lambda e, top_k=5, metadata_filter=None: [{"id": "bmw-1", "score": 0.9, "text": "X5"}])
+    monkeypatch.setattr(main, "generate_answer", lambda model_id, question, context: "The X5.")
+    monkeypatch.setattr(main, "answer_cache", main.SemanticAnswerCache(max_entries=0))
+
+    body = {"query": "Best seller?", "model": "claude-haiku", "include_timings": True}
+    data = client.post("/api/ask", json=body).json()
+
+    assert {"auth", "rate_limit", "embedding", "retrieval", "prompt", "generation",
+            "logging", "request"} <= set(data["timings"])
+    # Client-supplied model strings never become label values
+    assert "timings" not in client.post("/api/ask", json={"query": "Best seller?", "model": "gpt-4"}).json()
+
+    monkeypatch.setattr(main, "retrieve_top_k_batch", lambda e, top_k=5, metadata_filters=None: [[{"id": "bmw-1", "score": 0.9, "text": "X5"}]] * len(e))
+    client.post("/api/ask/batch", json={"queries": ["X5?", "i8?"], "model": "claude-haiku"})
+
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert 'rag_stage_latency_ms{stage="generation",model="claude-haiku",quantile="0.95"}' in metrics.text
+    assert 'rag_stage_latency_ms{stage="batch_generation",model="claude-haiku",quantile="0.95"}' in metrics.text
+    assert 'model="gpt-4"' not in metrics.text and f'model="{DEFAULT_MODEL}"' in metrics.text